@@ -0,0 +1,151 @@
+# trekbikes.com'da olmadığı kanıtlanmış SKU'lar için kalıcı Bloom filtresi
+# Bu SKU'lar tekrar yüklenen faturalarda web aramasına gönderilmez (OpenAI analizi yine
+# yapılır); OpenAI tanımlayamazsa doğrudan pattern/genel bilgiye düşer. Sadece 404 veya
+# "sonuç yok" diyen arama sayfası kesin sayılır - bot engeli (401/403/429) SKU'yu eklemez. Bloom filtresi yanlış negatif vermez, yanlış pozitif oranı
+# ABSENT_FILTER_BITS ve eklenen SKU sayısına bağlıdır (2^20 bit, 10.000 SKU için ~%0.1).
+#
+# Dosya tüm worker'larca paylaşılır: yazarken diskteki bitlerle OR'lanır (flock ile),
+# okurken dosya değiştiyse yeniden yüklenir. Filtre ABSENT_FILTER_MAX_AGE'den eskiyse
+# sıfırlanır - sitede sonradan yayınlanan ürünler böylece tekrar aranır.
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+ABSENT_FILTER_PATH = os.getenv('ABSENT_FILTER_PATH', 'absent_skus.bloom')          # Boş = kapalı
+ABSENT_FILTER_BITS = int(os.getenv('ABSENT_FILTER_BITS', str(1 << 20)))
+ABSENT_FILTER_MAX_AGE = int(os.getenv('ABSENT_FILTER_MAX_AGE', str(30 * 24 * 3600)))  # Saniye
+HASH_COUNT = 7
+
+_MAGIC = b'TAB1'
+_HEADER_SIZE = len(_MAGIC) + 8  # magic + uint64 oluşturulma zamanı
+
+_LOCK = threading.Lock()
+_STATE = {'bits': None, 'created': 0.0, 'mtime': None}
+_STATS = {'checks': 0, 'positives': 0, 'added': 0}
+
+
+def is_enabled():
+    """Yol boşsa filtre tamamen devre dışı"""
+    return bool(ABSENT_FILTER_PATH)
+
+
+def _positions(sku):
+    """SKU'nun filtredeki bit pozisyonları (çift hash: h1 + i*h2)"""
+    digest = hashlib.blake2b(str(sku).encode('utf-8'), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:], 'little') | 1
+    return [(h1 + i * h2) % ABSENT_FILTER_BITS for i in range(HASH_COUNT)]
+
+
+def _empty_bits():
+    return bytearray((ABSENT_FILTER_BITS + 7) // 8)
+
+
+def _read_file():
+    """Diskteki filtre - (bitler, oluşturulma zamanı, mtime) veya None"""
+    try:
+        with open(ABSENT_FILTER_PATH, 'rb') as f:
+            mtime = os.fstat(f.fileno()).st_mtime
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) != _HEADER_SIZE + len(_empty_bits()) or not data.startswith(_MAGIC):
+        return None
+    created = int.from_bytes(data[len(_MAGIC):_HEADER_SIZE], 'little')
+    if time.time() - created > ABSENT_FILTER_MAX_AGE:
+        return None
+    return bytearray(data[_HEADER_SIZE:]), float(created), mtime
+
+
+def _load():
+    """Filtreyi gerekirse diskten (yeniden) yükle - _LOCK altında çağrılır"""
+    try:
+        mtime = os.stat(ABSENT_FILTER_PATH).st_mtime
+    except OSError:
+        mtime = None
+    if _STATE['bits'] is not None and mtime == _STATE['mtime'] and \
+            time.time() - _STATE['created'] <= ABSENT_FILTER_MAX_AGE:
+        return
+    loaded = _read_file() if mtime is not None else None
+    if loaded is None:
+        _STATE.update(bits=_empty_bits(), created=float(int(time.time())), mtime=None)
+    else:
+        _STATE['bits'], _STATE['created'], _STATE['mtime'] = loaded
+
+
+def _write():
+    """Filtreyi diskteki bitlerle birleştirip atomik olarak yaz - _LOCK altında çağrılır"""
+    directory = os.path.dirname(ABSENT_FILTER_PATH) or '.'
+    lock_file = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        lock_file = open(ABSENT_FILTER_PATH + '.lock', 'a')
+        try:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except ImportError:
+            pass
+
+        # Başka worker'ın eklediği bitleri kaybetme
+        on_disk = _read_file()
+        if on_disk is not None:
+            disk_bits, disk_created, _ = on_disk
+            merged = int.from_bytes(_STATE['bits'], 'little') | int.from_bytes(disk_bits, 'little')
+            _STATE['bits'] = bytearray(merged.to_bytes(len(disk_bits), 'little'))
+            _STATE['created'] = min(_STATE['created'], disk_created)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(int(_STATE['created']).to_bytes(8, 'little'))
+            f.write(_STATE['bits'])
+        os.replace(temp_path, ABSENT_FILTER_PATH)
+        _STATE['mtime'] = os.stat(ABSENT_FILTER_PATH).st_mtime
+    except OSError as e:
+        print(f"Olmayan SKU filtresi yazma hatası: {e}")
+    finally:
+        if lock_file is not None:
+            lock_file.close()
+
+
+def might_be_absent(sku):
+    """SKU'nun sitede olmadığı daha önce kanıtlandı mı (Bloom: nadiren yanlış pozitif)"""
+    if not is_enabled():
+        return False
+    with _LOCK:
+        _load()
+        bits = _STATE['bits']
+        found = all(bits[position >> 3] & (1 << (position & 7)) for position in _positions(sku))
+        _STATS['checks'] += 1
+        if found:
+            _STATS['positives'] += 1
+    return found
+
+
+def mark_absent(sku):
+    """SKU'yu sitede olmayanlar filtresine ekle ve diske yaz"""
+    if not is_enabled():
+        return
+    with _LOCK:
+        _load()
+        bits = _STATE['bits']
+        for position in _positions(sku):
+            bits[position >> 3] |= 1 << (position & 7)
+        _STATS['added'] += 1
+        _write()
+
+
+def get_stats():
+    """Kontrol/pozitif/eklenen sayaçları ve filtre doluluğu"""
+    with _LOCK:
+        stats = dict(_STATS)
+        bits = _STATE['bits']
+        if bits is not None:
+            set_bits = bin(int.from_bytes(bits, 'little')).count('1')
+            stats['fill_ratio'] = round(set_bits / ABSENT_FILTER_BITS, 5)
+            stats['age_seconds'] = int(time.time() - _STATE['created'])
+    stats['enabled'] = is_enabled()
+    return stats
@@ -3,11 +3,25 @@ import pandas as pd
 import os
 from werkzeug.utils import secure_filename
 import json
+import hashlib
 from datetime import datetime
-import pdfplumber
 import re
 import time
-from trek_sku_database import get_trek_product_info
+from concurrent.futures import ThreadPoolExecutor
+from trek_sku_database import (get_trek_product_info, get_trek_product_info_local, get_trek_product_info_many,
+                               get_cache_stats)
+from pdf_parser import (PDF_WORKERS, get_tier_stats, iter_document_pages, iter_page_ranges, iter_pdf_pages,
+                        read_first_page_text)
+from invoice_splitter import normalize_invoice_number, page_invoice_number
+import pdf_watchdog
+import cache_warmup
+from host_limiter import get_host_stats
+from supplier_templates import extract_invoice_number_with_template, get_template, learn_template
+from line_items import (new_line_item_table, line_item_count, append_line_item, find_value_columns, row_values,
+                        sku_totals, aggregate_by_sku, concat_line_items, to_columns, amount_or_none)
+from sku_confidence import score_candidate, is_confident
+from sku_scanner import (build_sku_automaton, find_skus, is_valid_item_number, filter_valid_item_numbers,
+                         ITEM_HEADER_KEYWORDS, TEXT_ITEM_SCANNER)
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
@@ -17,136 +31,167 @@ app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 os.makedirs('uploads', exist_ok=True)
 os.makedirs('templates', exist_ok=True)
 
-def extract_item_numbers_from_pdf(file_path):
-    """PDF dosyasından item number'ları çıkar - gelişmiş algoritma"""
-    all_text = []
-    tables_data = []
+# Aynı anda çözümlenen sayfa (toplu SKU araması) sayısı - host başına sınır host_limiter'da
+SKU_RESOLVE_WORKERS = int(os.getenv('SKU_RESOLVE_WORKERS', '8'))
+
+# Açılışta son faturalardaki SKU'larla ürün cache'ini arka planda ısıt (cache_warmup)
+if os.getenv('CACHE_WARMUP_ON_START', '0') == '1':
+    cache_warmup.start_background(app.config['UPLOAD_FOLDER'])
+
+def extract_item_numbers_from_pdf(file_path, document=None, candidates=None):
+    """PDF dosyasından item number'ları çıkar - gelişmiş algoritma
+
+    Sayfalar sırayla işlenir ve sadece sonraki aşamalar için gereken küçük sonuçlar
+    tutulur: başlıklı tablo item'ı bulunduktan sonra fallback'ler için hücre ve
+    metin biriktirilmez. candidates sözlüğü verilirse her item için bulunduğu kaynak
+    ('column', 'cell', 'labeled_text', 'text') ve geçme sayısı yazılır (güven skoru için).
+    """
+    header_items = []  # 1. Tablolarda item number sütunu
+    cell_items = []    # 2. Tablolarda sayısal değerler (sütun başlığı yoksa)
+    all_text = []      # 3. Düz metin
     
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page_num, page in enumerate(pdf.pages, 1):
-                # Sayfa metnini al
-                text = page.extract_text()
-                if text:
-                    all_text.append(text)
+        # Ayrıştırılmış doküman verilmişse PDF tekrar açılmaz, yoksa sayfalar akış halinde gelir
+        for page_info in iter_document_pages(file_path, document):
+            for table_idx, table in enumerate(page_info['tables']):
+                # Sütun düzeni biliniyorsa doğrudan o sütun
+                layout = _table_layout(page_info, table_idx)
+                if layout:
+                    header_items.extend(extract_items_from_layout_table(table, layout))
+                else:
+                    header_items.extend(extract_items_from_header_table(table))
                 
-                # Tabloları çıkar
-                tables = page.extract_tables()
-                for table in tables:
-                    if table:
-                        tables_data.append({
-                            'page': page_num,
-                            'data': table
-                        })
+                if not header_items:
+                    cells = [cell for row in table if row for cell in row]
+                    cell_items.extend(filter_valid_item_numbers(cells))
+            
+            if header_items:
+                # Fallback'ler artık gerekmez - biriktirilenleri bırak
+                cell_items = []
+                all_text = []
+            elif not cell_items and page_info['text']:
+                all_text.append(page_info['text'])
+            elif cell_items:
+                all_text = []
     except Exception as e:
         print(f"PDF okuma hatası: {e}")
         return []
     
-    item_numbers = []
-    
-    # 1. Tablolarda item number sütunu ara
-    for table_info in tables_data:
-        table = table_info['data']
-        if not table:
-            continue
-            
-        # Başlık satırını ve item sütununu bul
-        item_col_idx = -1
-        for row_idx, row in enumerate(table):
-            if not row:
-                continue
-            for col_idx, cell in enumerate(row):
-                if cell:
-                    cell_lower = str(cell).lower()
-                    # Item number başlığı ara
-                    if any(keyword in cell_lower for keyword in [
-                        'item number', 'item #', 'item#', 'item no', 'item code',
-                        'product code', 'sku', 'code', 'model', 'part number'
-                    ]):
-                        item_col_idx = col_idx
-                        # Bu satırdan sonraki satırları işle
-                        for data_row_idx in range(row_idx + 1, len(table)):
-                            data_row = table[data_row_idx]
-                            if data_row and len(data_row) > item_col_idx and data_row[item_col_idx]:
-                                item_candidate = str(data_row[item_col_idx]).strip()
-                                if is_valid_item_number(item_candidate):
-                                    item_numbers.append(item_candidate)
-                        break
-            if item_col_idx >= 0:
-                break
-    
-    # 2. Tablolarda sayısal değerleri kontrol et (sütun başlığı yoksa)
-    if not item_numbers:
-        for table_info in tables_data:
-            table = table_info['data']
-            for row in table:
-                if row:
-                    for cell in row:
-                        if cell:
-                            cell_str = str(cell).strip()
-                            if is_valid_item_number(cell_str):
-                                item_numbers.append(cell_str)
+    item_numbers = header_items or cell_items
+    sources = {}
+    text_counts = {}
+    if candidates is not None and item_numbers:
+        source = 'column' if header_items else 'cell'
+        sources = {item: source for item in item_numbers}
     
-    # 3. Düz metinde item pattern'leri ara
+    # 3. Düz metinde item pattern'leri ara - önceden derlenmiş pattern'lerle
     if not item_numbers:
         full_text = '\n'.join(all_text)
-        patterns = [
-            r'(?:Item\s*(?:Number|#|No\.?)?[:]?\s*)([A-Z0-9]{4,8})',
-            r'(?:SKU[:]?\s*)([A-Z0-9]{4,8})',
-            r'(?:Code[:]?\s*)([A-Z0-9]{4,8})',
-            r'\b([A-Z0-9]{5,7})\b',  # 5-7 karakter alfanümerik
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, full_text, re.IGNORECASE)
-            for match in matches:
+        # Son pattern etiketsiz 5-7 karakterlik kelimedir, öncekiler Item/SKU/Code etiketli
+        for pattern_idx, regex in enumerate(TEXT_ITEM_SCANNER):
+            source = 'text' if pattern_idx == len(TEXT_ITEM_SCANNER) - 1 else 'labeled_text'
+            pattern_counts = {}
+            for match in regex.findall(full_text):
                 if is_valid_item_number(match):
                     item_numbers.append(match)
+                    sources.setdefault(match, source)
+                    pattern_counts[match] = pattern_counts.get(match, 0) + 1
+            # Aynı geçiş birden fazla pattern'e uyabilir - tekrar sayısı pattern bazında
+            for match, count in pattern_counts.items():
+                text_counts[match] = max(text_counts.get(match, 0), count)
     
     # Benzersiz item'ları döndür
     unique_items = []
     seen = set()
     for item in item_numbers:
+        if candidates is not None and len(item) >= 4:
+            if item not in candidates:
+                candidates[item] = {'source': sources.get(item, 'text'), 'count': text_counts.get(item, 0)}
+            if item not in text_counts:
+                candidates[item]['count'] += 1
         if item not in seen and len(item) >= 4:
             seen.add(item)
             unique_items.append(item)
     
     return unique_items  # Tüm itemler
 
-def is_valid_item_number(candidate):
-    """Geçerli bir item number olup olmadığını kontrol et"""
-    if not candidate or len(candidate) < 4 or len(candidate) > 10:
-        return False
-    
-    # Yaygın kelimeler değil
-    invalid_words = [
-        'SEARCH', 'ITEM', 'TOTAL', 'DISCOUNT', 'TAX', 'SHIPPING', 'INVOICE',
-        'DATE', 'CUSTOMER', 'ADDRESS', 'PHONE', 'EMAIL', 'QUANTITY', 'PRICE',
-        'AMOUNT', 'SUBTOTAL', 'PAYMENT', 'DESCRIPTION', 'UNIT', 'QTY',
-        'AUTHORIZED', 'REGULATIONS', 'CONTROLLED', 'PERCENTAGE', 'BISIKLET',
-        'ISTANBUL', 'TREKBIKES', 'AQUAMARINE', 'COMPANY', 'STREET', 'CITY',
-        'STATE', 'ORDER', 'BILL', 'SHIP', 'FROM', 'NAME', 'LINE'
-    ]
-    
-    if candidate.upper() in invalid_words:
-        return False
-    
-    # En az bir rakam içermeli
-    if not any(c.isdigit() for c in candidate):
-        return False
-    
-    # Sadece harf ve rakam içermeli
-    if not re.match(r'^[A-Z0-9]+$', candidate, re.IGNORECASE):
-        return False
-    
-    # Çok yaygın pattern'leri filtrele
-    if re.match(r'^\d{1,3}$', candidate):  # 1-3 rakam (muhtemelen miktar)
-        return False
-    
-    if re.match(r'^\d{4}$', candidate) and int(candidate) > 2000 and int(candidate) < 2030:  # Yıl
-        return False
+def _table_layout(page_info, table_idx):
+    """Tablo, ayrıştırma sırasında sütun düzeni bulunan item tablosuysa düzeni döndür"""
+    layout = page_info.get('layout')
+    if layout and layout['table'] == table_idx:
+        return layout
+    return None
+
+def extract_items_from_layout_table(table, layout):
+    """Sütun düzeni bilinen item tablosundan item number'ları al - başlık araması yapılmaz"""
+    item_col = layout['item_col']
+    column_cells = [row[item_col] for row in table[layout['header_row'] + 1:] if row and len(row) > item_col]
+    return filter_valid_item_numbers(column_cells)
+
+def _find_item_header_cell(table):
+    """Tabloda item number başlık hücresini bul - (satır, sütun) veya None"""
+    for row_idx, row in enumerate(table):
+        if not row:
+            continue
+        for col_idx, cell in enumerate(row):
+            # Item number başlığı ara
+            if cell and any(keyword in str(cell).lower() for keyword in ITEM_HEADER_KEYWORDS):
+                return row_idx, col_idx
+    return None
+
+def extract_items_from_header_table(table):
+    """Başlık satırında item sütunu olan tablodan geçerli item number'ları al"""
+    if not table:
+        return []
+        
+    # Başlık satırını ve item sütununu bul
+    header = _find_item_header_cell(table)
+    if header is None:
+        return []
+    row_idx, item_col_idx = header
+    # Bu satırdan sonraki satırların item sütununu toplu doğrula
+    column_cells = [data_row[item_col_idx] for data_row in table[row_idx + 1:]
+                    if data_row and len(data_row) > item_col_idx]
+    return filter_valid_item_numbers(column_cells)
+
+def extract_line_items_from_table(table, layout, page_num, line_items):
+    """Item tablosunun her satırını SKU, açıklama, miktar, fiyat ve tutarla line_items'a ekle
+
+    Sütun düzeni biliniyorsa doğrudan kullanılır, yoksa başlık hücresi aranır.
+    Tekrar eden SKU'lar ayrı satır olarak eklenir. Eklenen satır sayısını döndürür.
+    """
+    if not table:
+        return 0
+    if layout:
+        header_row, item_col = layout['header_row'], layout['item_col']
+        description_col = layout['description_col']
+        header_cells = layout['header']
+    else:
+        header = _find_item_header_cell(table)
+        if header is None:
+            return 0
+        header_row, item_col = header
+        description_col = None
+        header_cells = table[header_row]
+    value_columns = find_value_columns(header_cells, item_col)
     
-    return True
+    added = 0
+    for row_idx in range(header_row + 1, len(table)):
+        row = table[row_idx]
+        if not row or len(row) <= item_col or not row[item_col]:
+            continue
+        item_num = str(row[item_col]).strip()
+        if not is_valid_item_number(item_num):
+            continue
+        description = None
+        if description_col is not None and description_col < len(row):
+            description = _clean_description(row[description_col])
+        if description is None:
+            description = _find_row_description(row, item_col)
+        qty, unit_price, line_total = row_values(row, value_columns)
+        append_line_item(line_items, item_num, description, qty, unit_price, line_total, page_num, row_idx)
+        added += 1
+    return added
 
 def analyze_product_name_for_category(sku, product_name):
     """Fatura ürün isminden otomatik kategori belirle"""
@@ -283,75 +328,139 @@ def analyze_product_name_for_category(sku, product_name):
     
     return None
 
-def extract_product_names_from_pdf(file_path, item_numbers):
+def extract_product_names_from_pdf(file_path, item_numbers, document=None):
     """PDF'den item number'lara karşılık gelen ürün adlarını çıkar - Geliştirilmiş"""
     product_names = {}
     
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                # Hem text hem de tablolardan al
-                text = page.extract_text()
-                tables = page.extract_tables()
-                
-                # Tablolardan ürün adı ara
-                for table in tables:
-                    if table:
-                        for row in table:
-                            if row:
-                                row_text = ' '.join([str(cell) if cell else '' for cell in row])
-                                for item_num in item_numbers:
-                                    if item_num in row_text:
-                                        # SKU'dan sonra gelen hücreleri kontrol et
-                                        for i, cell in enumerate(row):
-                                            if cell and item_num in str(cell):
-                                                # Sonraki hücrelerde açıklama ara
-                                                for j in range(i+1, len(row)):
-                                                    if row[j] and len(str(row[j])) > 3:
-                                                        desc = str(row[j]).strip()
-                                                        # Sayı değilse ve makul uzunluktaysa
-                                                        if not desc.replace('.','').replace(',','').isdigit() and len(desc) < 100:
-                                                            product_names[item_num] = desc
-                                                            break
-                                                break
-                
-                # Text'ten de ara (tablo bulunamazsa)
-                if text:
-                    lines = text.split('\n')
-                    for line in lines:
-                        line_clean = line.strip()
-                        for item_num in item_numbers:
-                            if item_num in line_clean and item_num not in product_names:
-                                # Satırı boşluklarla böl
-                                parts = line_clean.split()
-                                # SKU'nun pozisyonunu bul
-                                try:
-                                    sku_index = parts.index(item_num)
-                                    # SKU'dan sonraki parçaları al
-                                    if sku_index < len(parts) - 1:
-                                        # Sonraki parçaları birleştir (sayısal olmayan ilk 5 kelime)
-                                        desc_parts = []
-                                        for part in parts[sku_index + 1:]:
-                                            # Sayısal değilse ekle
-                                            if not part.replace('.','').replace(',','').isdigit():
-                                                desc_parts.append(part)
-                                                if len(desc_parts) >= 5:  # Max 5 kelime
-                                                    break
-                                        
-                                        if desc_parts:
-                                            product_name = ' '.join(desc_parts)
-                                            if len(product_name) > 3:
-                                                product_names[item_num] = product_name
-                                except ValueError:
-                                    continue
-                                    
+        # SKU indeksini doküman başına bir kez kur
+        automaton = build_sku_automaton(item_numbers)
+        sku_set = set(item_numbers)
+        for page_info in iter_document_pages(file_path, document):
+            extract_product_names_from_page(page_info, item_numbers, product_names, automaton, sku_set)
     except Exception as e:
         print(f"Ürün adı çıkarma hatası: {e}")
     
     return product_names
 
-def extract_invoice_number(file_path):
-    """Dosya adından veya PDF içeriğinden fatura numarasını çıkar"""
+def extract_product_names_from_page(page_info, item_numbers, product_names, automaton=None, sku_set=None):
+    """Tek bir sayfanın tablo ve metninden ürün adlarını product_names'e yaz
+
+    Her satır/hücre bir kez taranır: tablo hücrelerindeki SKU'lar Aho-Corasick
+    otomatı ile (alt dize eşleşmesi), metin satırlarındaki SKU'lar kelime
+    bazında hash lookup ile bulunur.
+    """
+    if automaton is None:
+        automaton = build_sku_automaton(item_numbers)
+    if sku_set is None:
+        sku_set = set(item_numbers)
+    
+    # Hem text hem de tablolardan al
+    text = page_info['text']
+    tables = page_info['tables']
+    
+    # Tablolardan ürün adı ara
+    for table_idx, table in enumerate(tables):
+        layout = _table_layout(page_info, table_idx)
+        if layout:
+            _extract_names_from_layout_table(table, layout, sku_set, product_names)
+            continue
+        if table:
+            for row in table:
+                if row:
+                    # Her SKU'nun geçtiği ilk hücre
+                    first_cells = {}
+                    for i, cell in enumerate(row):
+                        if cell:
+                            for item_num in find_skus(automaton, str(cell)):
+                                if item_num not in first_cells:
+                                    first_cells[item_num] = i
+                    
+                    descriptions = {}
+                    for item_num, i in first_cells.items():
+                        if i not in descriptions:
+                            descriptions[i] = _find_row_description(row, i)
+                        if descriptions[i] is not None:
+                            product_names[item_num] = descriptions[i]
+    
+    # Text'ten de ara (tablo bulunamazsa)
+    _extract_names_from_text(text, sku_set, product_names)
+    
+    return product_names
+
+def _extract_names_from_text(text, sku_set, product_names):
+    """Metin satırlarında SKU'dan sonraki kelimeleri ürün adı olarak al (adı olmayan SKU'lar için)"""
+    if text:
+        lines = text.split('\n')
+        for line in lines:
+            # Satırı boşluklarla böl
+            parts = line.split()
+            # SKU'ların satırdaki ilk pozisyonu
+            sku_positions = {}
+            for index, part in enumerate(parts):
+                if part in sku_set and part not in sku_positions:
+                    sku_positions[part] = index
+            
+            for item_num, sku_index in sku_positions.items():
+                if item_num in product_names:
+                    continue
+                # SKU'dan sonraki parçaları al
+                if sku_index < len(parts) - 1:
+                    # Sonraki parçaları birleştir (sayısal olmayan ilk 5 kelime)
+                    desc_parts = []
+                    for part in parts[sku_index + 1:]:
+                        # Sayısal değilse ekle
+                        if not part.replace('.','').replace(',','').isdigit():
+                            desc_parts.append(part)
+                            if len(desc_parts) >= 5:  # Max 5 kelime
+                                break
+                    
+                    if desc_parts:
+                        product_name = ' '.join(desc_parts)
+                        if len(product_name) > 3:
+                            product_names[item_num] = product_name
+
+def _extract_names_from_layout_table(table, layout, sku_set, product_names):
+    """Sütun düzeni bilinen tabloda açıklamayı doğrudan açıklama sütunundan al"""
+    item_col = layout['item_col']
+    description_col = layout['description_col']
+    for row in table[layout['header_row'] + 1:]:
+        if not row or len(row) <= item_col or not row[item_col]:
+            continue
+        item_num = str(row[item_col]).strip()
+        if item_num not in sku_set:
+            continue
+        description = None
+        if description_col is not None and description_col < len(row):
+            description = _clean_description(row[description_col])
+        if description is None:
+            description = _find_row_description(row, item_col)
+        if description is not None:
+            product_names[item_num] = description
+
+def _clean_description(cell):
+    """Hücre açıklama olabilecek bir metinse temizlenmiş halini döndür"""
+    if cell and len(str(cell)) > 3:
+        desc = str(cell).strip()
+        # Sayı değilse ve makul uzunluktaysa
+        if not desc.replace('.','').replace(',','').isdigit() and len(desc) < 100:
+            return desc
+    return None
+
+def _find_row_description(row, sku_cell_idx):
+    """SKU hücresinden sonraki ilk açıklama hücresini bul"""
+    # Sonraki hücrelerde açıklama ara
+    for j in range(sku_cell_idx + 1, len(row)):
+        desc = _clean_description(row[j])
+        if desc is not None:
+            return desc
+    return None
+
+def extract_invoice_number(file_path, document=None):
+    """Dosya adından veya PDF içeriğinden fatura numarasını çıkar
+
+    Numaralar alt fatura bölme ile aynı biçimdedir (invoice_splitter.normalize_invoice_number).
+    """
     # Önce dosya adından dene
     filename = os.path.basename(file_path)
     
@@ -374,80 +483,488 @@ def extract_invoice_number(file_path):
     
     # PDF içeriğinden dene
     try:
-        with pdfplumber.open(file_path) as pdf:
-            first_page_text = pdf.pages[0].extract_text()
-            if first_page_text:
-                for pattern in invoice_patterns:
-                    match = re.search(pattern, first_page_text, re.IGNORECASE)
-                    if match:
-                        return match.group(1) if match.groups() else match.group(0)
+        if document is not None:
+            # Ayrıştırılmış dokümandaki ilk sayfa metnini kullan
+            first_page_text = document['pages'][0]['text']
+        else:
+            first_page_text = read_first_page_text(file_path)
+        if first_page_text:
+            # Tedarikçi şablonu varsa fatura numarası etiketinden doğrudan alınır
+            template_number = extract_invoice_number_with_template(first_page_text, _document_template(document))
+            if template_number:
+                return normalize_invoice_number(template_number)
+            # Etiketli numara - alt fatura bölmedeki pattern'lerle aynı
+            labeled_number = page_invoice_number(first_page_text)
+            if labeled_number:
+                return normalize_invoice_number(labeled_number)
+            for pattern in invoice_patterns:
+                match = re.search(pattern, first_page_text, re.IGNORECASE)
+                if match:
+                    return match.group(1) if match.groups() else match.group(0)
     except:
         pass
     
     # Son çare olarak dosya adını kullan
     return filename_clean
 
-def process_pdf_invoice(file_path):
-    """PDF faturayı işle ve 5 sütun halinde sonuç döndür"""
-    # PDF'den item number'ları çıkar
-    item_numbers = extract_item_numbers_from_pdf(file_path)
-    
-    if not item_numbers:
-        return None, "Faturada geçerli item number bulunamadı"
+def _document_template(document):
+    """Dokümanın ayrıştırma sırasında bulunan parmak izine ait tedarikçi şablonu"""
+    if document is None:
+        return None
+    for page_info in document['pages']:
+        layout = page_info.get('layout')
+        if layout and layout.get('fingerprint'):
+            return get_template(layout['fingerprint'])
+    return None
+
+def iter_line_items(file_path, pages=None, line_items=None, with_confidence=False):
+    """PDF'i sayfa sayfa işle ve (sku, fatura_ismi, sayfa) satırlarını hemen üret
+
+    Item tabloları tek geçişte okunur: her satır (tekrar eden SKU'lar dahil) miktar,
+    birim fiyat ve tutarıyla line_items sütun tablosuna eklenir, her SKU ise ilk
+    görüldüğü sayfada bir kez üretilir. Ürün adı o sayfadaki açıklama sütunundan,
+    yoksa sayfa metninden alınır. Hiç başlıklı tablo bulunamazsa doküman sonunda
+    toplu extraction fallback'leri çalıştırılır; bu yüzden sayfalar sadece ilk item
+    bulunana kadar tutulur.
+    Her satırın güven skoru line_items'ın confidence sütununa yazılır; with_confidence
+    verilirse (sku, fatura_ismi, sayfa, güven) üretilir.
+    """
+    if pages is None:
+        pages = iter_pdf_pages(file_path)
+    if line_items is None:
+        line_items = new_line_item_table()
     
-    print(f"Bulunan item number'lar: {item_numbers}")
+    seen = set()
+    parsed_pages = []
     
-    # Fatura numarasını çıkar
-    invoice_number = extract_invoice_number(file_path)
+    for page_info in pages:
+        if not seen:
+            parsed_pages.append(page_info)
+        
+        start = line_item_count(line_items)
+        for table_idx, table in enumerate(page_info['tables']):
+            extract_line_items_from_table(table, _table_layout(page_info, table_idx), page_info['page'], line_items)
+        end = line_item_count(line_items)
+        if end == start:
+            continue
+        
+        # Fallback çalışmayacak - biriktirilen sayfaları bırak
+        parsed_pages = []
+        skus = line_items['sku']
+        descriptions = line_items['description']
+        page_names = {}
+        page_items = []
+        for index in range(start, end):
+            item = skus[index]
+            if descriptions[index]:
+                page_names[item] = descriptions[index]
+            if item not in seen:
+                seen.add(item)
+                page_items.append(item)
+        
+        # Açıklama sütunu boş kalan SKU'lar için sayfa metni
+        missing = {item for item in skus[start:end] if item not in page_names}
+        if missing:
+            _extract_names_from_text(page_info['text'], missing, page_names)
+            for index in range(start, end):
+                if not descriptions[index]:
+                    descriptions[index] = page_names.get(skus[index], '')
+        
+        # Güven skoru: item sütunu + açıklama + biçim, sayfada tekrar ediyorsa ek puan
+        counts = {}
+        for item in skus[start:end]:
+            counts[item] = counts.get(item, 0) + 1
+        confidences = line_items['confidence']
+        page_confidence = {}
+        for index in range(start, end):
+            item = skus[index]
+            confidences[index] = score_candidate(item, 'column', descriptions[index], counts[item])
+            page_confidence[item] = max(page_confidence.get(item, 0.0), confidences[index])
+        
+        for item in page_items:
+            if with_confidence:
+                yield item, page_names.get(item, ''), page_info['page'], page_confidence[item]
+            else:
+                yield item, page_names.get(item, ''), page_info['page']
     
-    # Ürün adlarını çıkar
-    product_names = extract_product_names_from_pdf(file_path, item_numbers)
+    if seen:
+        return
     
-    # Her item number için ürün bilgisi al
-    products = []
-    for item_num in item_numbers:
+    # Başlıklı tablo yoksa tüm doküman üzerinden eski fallback'leri çalıştır
+    document = {'file_path': file_path, 'pages': parsed_pages}
+    candidates = {}
+    item_numbers = extract_item_numbers_from_pdf(file_path, document=document, candidates=candidates)
+    product_names = extract_product_names_from_pdf(file_path, item_numbers, document=document)
+    for item in item_numbers:
+        page_num = _find_item_page(parsed_pages, item)
+        name = product_names.get(item, '')
+        candidate = candidates.get(item, {'source': 'text', 'count': 1})
+        line = _find_item_line(parsed_pages, item) if candidate['source'] == 'text' else None
+        confidence = score_candidate(item, candidate['source'], name, candidate['count'], line)
+        append_line_item(line_items, item, name, page=page_num, confidence=confidence)
+        if with_confidence:
+            yield item, name, page_num, confidence
+        else:
+            yield item, name, page_num
+
+def _find_item_line(pages, item_num):
+    """Item number'ın kelime olarak geçtiği ilk metin satırı (kalem satırı kontrolü için)"""
+    for page_info in pages:
+        for line in page_info['text'].split('\n'):
+            if item_num in line.split():
+                return line
+    return None
+
+def _find_item_page(pages, item_num):
+    """Item number'ın ilk geçtiği sayfa numarasını bul"""
+    for page_info in pages:
+        if item_num in page_info['text']:
+            return page_info['page']
+        for table in page_info['tables']:
+            for row in table:
+                if row and any(cell and item_num in str(cell) for cell in row):
+                    return page_info['page']
+    return None
+
+def resolve_line_item(item_num, invoice_name, confidence=None):
+    """Tek bir satır için ürün bilgisini bul - (product_info, is_defined)"""
+    return resolve_line_items([(item_num, invoice_name, confidence)])[0]
+
+def resolve_line_items(rows):
+    """Satırları toplu çözümle - [(item_num, invoice_name, confidence), ...] sırasıyla
+    [(product_info, is_defined), ...]
+
+    Fatura isminden kategori bulunamayan güvenli adaylar tek get_trek_product_info_many
+    çağrısıyla çözümlenir (tekrarlar tek arama, OpenAI toplu prompt). Güven skoru
+    eşiğin altındaki adaylar (posta kodu, vergi no gibi) OpenAI ve trekbikes.com
+    aramalarına gönderilmez; sadece yerel veritabanı ve SKU biçimine bakılır.
+    """
+    results = [None] * len(rows)
+    lookups = []
+    for index, (item_num, invoice_name, confidence) in enumerate(rows):
         # Önce fatura isminden analiz dene
-        invoice_name = product_names.get(item_num, '')
         auto_category = analyze_product_name_for_category(item_num, invoice_name)
-        
         if auto_category:
             # Fatura isminden belirlendi
-            product_info = auto_category
-            is_defined = True
+            results[index] = (auto_category, True)
+        elif is_confident(confidence):
+            lookups.append(index)
         else:
-            # Trek veritabanından bilgi al - FAT URA İSMİNİ DE GÖNDER
-            product_info = get_trek_product_info(item_num, invoice_name)
-            
-            # Tanımlanabilir mi kontrol et
-            is_defined = False
-            if product_info:
-                # Eğer gerçek bilgi varsa (genel "Trek Ürünü" değilse)
-                if (product_info.get('name', '').startswith('Trek Ürünü #') == False and 
-                    product_info.get('category', '') != 'Trek Ürünü'):
-                    is_defined = True
+            print(f"Düşük güvenli aday ({confidence:.2f}), yavaş aramalar atlandı: {item_num}")
+            product_info = get_trek_product_info_local(item_num)
+            results[index] = (product_info, _is_defined(product_info))
+    
+    if lookups:
+        # Trek veritabanından bilgi al - FATURA İSMİNİ DE GÖNDER
+        pairs = [(rows[index][0], rows[index][1]) for index in lookups]
+        cache_warmup.record_skus(pairs)  # Sonraki deploy'larda cache ısıtma için
+        found = get_trek_product_info_many(pairs)
+        for index, pair in zip(lookups, pairs):
+            product_info = found[pair]['info']
+            results[index] = (product_info, _is_defined(product_info))
+    return results
+
+def _is_defined(product_info):
+    """Gerçek ürün bilgisi mi (genel "Trek Ürünü" değilse)"""
+    if not product_info:
+        return False
+    return (product_info.get('name', '').startswith('Trek Ürünü #') == False and 
+            product_info.get('category', '') != 'Trek Ürünü')
+
+def process_pdf_invoice(file_path, file_hash=None):
+    """PDF faturayı işle ve 5 sütun halinde sonuç döndür
+
+    Sayfalar ayrıştırıldıkça bulunan satırlar hemen çözümleme pool'una verilir;
+    böylece PDF CPU işi ile ağ bekleyen ürün aramaları üst üste biner. Her sayfanın
+    SKU'ları tek toplu aramadır; SKU_RESOLVE_WORKERS sayfa aynı anda çözümlenir,
+    sonuç sırası satır sırasıdır.
+    Birden fazla fatura içeren PDF'ler (ay sonu toplu taramaları) alt faturalara
+    bölünür ve process_multi_invoice ile işlenir. Sınır ön taraması da watchdog
+    altındadır ve ayrıştırmayla aynı doküman bütçesini kullanır.
+    """
+    deadline = pdf_watchdog.document_deadline()
+    try:
+        segments = pdf_watchdog.detect_invoice_segments(file_path, deadline=deadline)
+    except Exception as e:
+        print(f"Fatura sınırı tespit hatası: {e}")
+        segments = []
+    if len(segments) > 1:
+        return process_multi_invoice(file_path, segments, deadline=deadline)
+    
+    start_time = time.perf_counter()
+    timings = {'first_item': None, 'first_row': None}
+    
+    # Sadece fatura numarası ve şablon öğrenme için gereken sayfalar tutulur:
+    # ilk sayfa ve item tablosu sütun düzeninin bulunduğu ilk sayfa
+    pages = []
+    line_items = []
+    # Tüm fatura satırları (tekrar eden SKU'lar dahil) - miktar/tutar toplamları buradan
+    invoice_lines = new_line_item_table()
+    # Ayrıştırma watchdog altında child process'te - süre aşılırsa gelen sayfalarla devam edilir
+    parse_job = {}
+    
+    def _collect_pages():
+        layout_seen = False
+        for page_info in pdf_watchdog.iter_supervised_pages(file_path, file_hash=file_hash, job=parse_job,
+                                                            deadline=deadline):
+            if not pages:
+                pages.append(page_info)
+                layout_seen = bool(page_info.get('layout'))
+            elif not layout_seen and page_info.get('layout'):
+                pages.append(page_info)
+                layout_seen = True
+            yield page_info
+    
+    with ThreadPoolExecutor(max_workers=SKU_RESOLVE_WORKERS, thread_name_prefix='sku-resolve') as resolver:
+        try:
+            _submit_line_items(resolver, timings, start_time, line_items,
+                               iter_line_items(file_path, _collect_pages(), invoice_lines, with_confidence=True))
+        except Exception as e:
+            print(f"PDF okuma hatası: {e}")
+        
+        if not line_items:
+            if parse_job.get('truncated'):
+                return None, f"PDF ayrıştırma süre sınırını aştı ({parse_job['reason']}), item number bulunamadı"
+            return None, "Faturada geçerli item number bulunamadı"
+        
+        print(f"Bulunan item number'lar: {[item for item, _, _, _ in line_items]}")
+        
+        # Fatura numarasını çıkar
+        invoice_number = extract_invoice_number(file_path, document={'file_path': file_path, 'pages': pages})
+        
+        # Bilinmeyen tedarikçi düzenini sonraki faturalar için öğren
+        _learn_template(pages, invoice_number)
+        
+        gtip_by_sku = {}
+        products = _invoice_products(invoice_number, line_items, invoice_lines, gtip_by_sku)
+    
+    return _products_frame(products, timings, start_time, to_columns(invoice_lines),
+                           gtip_value_summary(invoice_lines, gtip_by_sku), parse_job)
+
+def process_multi_invoice(file_path, segments, workers=None, deadline=None):
+    """Alt faturalara bölünmüş PDF'i işle - her satır kendi faturasının numarasını taşır
+
+    Alt faturaların sayfa aralıkları process pool'da aynı anda ayrıştırılır (uzun
+    alt faturalar worker sayısına göre parçalanır); bir alt faturanın tüm parçaları
+    gelince satırları çıkarılıp çözümleme pool'una verilir. Watchdog açıksa pool
+    sayfa ve doküman bütçesiyle (deadline, time.monotonic) sınırlanır.
+    """
+    start_time = time.perf_counter()
+    timings = {'first_item': None, 'first_row': None}
+    print(f"Çok faturalı PDF: {len(segments)} fatura {[segment['invoice_number'] for segment in segments]}")
+    
+    ranges = _segment_page_ranges(segments, workers or PDF_WORKERS)
+    chunk_pages = [None] * len(ranges)
+    remaining = [0] * len(segments)
+    for segment_idx, _, _ in ranges:
+        remaining[segment_idx] += 1
+    results = [None] * len(segments)
+    template_learned = False
+    parse_job = {'pages': 0, 'truncated': False, 'reason': None}
+    timeout = page_timeout = None
+    if pdf_watchdog.PDF_WATCHDOG:
+        timeout = max((deadline or pdf_watchdog.document_deadline()) - time.monotonic(), 0)
+        page_timeout = pdf_watchdog.PDF_PAGE_TIMEOUT
+    
+    with ThreadPoolExecutor(max_workers=SKU_RESOLVE_WORKERS, thread_name_prefix='sku-resolve') as resolver:
+        try:
+            for range_idx, range_pages in iter_page_ranges(file_path, [(start, end) for _, start, end in ranges],
+                                                           workers, timeout=timeout, page_timeout=page_timeout,
+                                                           job=parse_job):
+                parse_job['pages'] += len(range_pages)
+                segment_idx = ranges[range_idx][0]
+                chunk_pages[range_idx] = range_pages
+                remaining[segment_idx] -= 1
+                if remaining[segment_idx]:
+                    continue
+                
+                # Alt faturanın tüm parçaları hazır - sayfa sırasıyla birleştir, parçaları bırak
+                pages = []
+                for idx, (range_segment, _, _) in enumerate(ranges):
+                    if range_segment == segment_idx:
+                        pages.extend(chunk_pages[idx])
+                        chunk_pages[idx] = None
+                
+                invoice_lines = new_line_item_table()
+                line_items = []
+                _submit_line_items(resolver, timings, start_time, line_items,
+                                   iter_line_items(file_path, pages, invoice_lines, with_confidence=True))
+                
+                invoice_number = segments[segment_idx]['invoice_number']
+                if not invoice_number:
+                    invoice_number = extract_invoice_number(file_path, document={'file_path': file_path, 'pages': pages})
+                print(f"Fatura {invoice_number}: {len(line_items)} item (sayfa {pages[0]['page']}-{pages[-1]['page']})")
+                if line_items and not template_learned:
+                    _learn_template(pages, invoice_number)
+                    template_learned = True
+                results[segment_idx] = (invoice_number, line_items, invoice_lines)
+        except TimeoutError as e:
+            # Süresi dolan aralıkların worker'ları öldürüldü - tamamlanan alt faturalarla devam
+            print(f"PDF watchdog: {e}")
+            parse_job.update(truncated=True, reason=parse_job['reason'] or 'document')
+            pdf_watchdog.record_timeout(file_path, parse_job['pages'], time.perf_counter() - start_time,
+                                        parse_job['reason'])
+        except Exception as e:
+            print(f"PDF okuma hatası: {e}")
+        
+        if not any(result and result[1] for result in results):
+            if parse_job['truncated']:
+                return None, f"PDF ayrıştırma süre sınırını aştı ({parse_job['reason']}), item number bulunamadı"
+            return None, "Faturada geçerli item number bulunamadı"
+        
+        products = []
+        gtip_by_sku = {}
+        tables = []
+        invoice_column = []
+        for result in results:
+            if not result:
+                continue
+            invoice_number, line_items, invoice_lines = result
+            products.extend(_invoice_products(invoice_number, line_items, invoice_lines, gtip_by_sku))
+            tables.append(invoice_lines)
+            invoice_column.extend([invoice_number] * line_item_count(invoice_lines))
+    
+    all_lines = concat_line_items(tables)
+    line_columns = {'invoice': invoice_column}
+    line_columns.update(to_columns(all_lines))
+    return _products_frame(products, timings, start_time, line_columns, gtip_value_summary(all_lines, gtip_by_sku),
+                           parse_job)
+
+def _segment_page_ranges(segments, workers):
+    """Alt fatura aralıklarını worker sayısına göre parçala - [(alt fatura, start, end), ...]
+
+    Parça boyu toplam sayfa / worker sayısıdır; böylece tek uzun fatura da tüm
+    çekirdeklere yayılır.
+    """
+    total_pages = sum(segment['end'] - segment['start'] for segment in segments)
+    chunk_size = max(1, -(-total_pages // max(workers, 1)))
+    ranges = []
+    for segment_idx, segment in enumerate(segments):
+        for start in range(segment['start'], segment['end'], chunk_size):
+            ranges.append((segment_idx, start, min(start + chunk_size, segment['end'])))
+    return ranges
+
+def _submit_line_items(resolver, timings, start_time, line_items, rows):
+    """iter_line_items satırlarını sayfa sayfa toplu çözümleme pool'una ver
+
+    Her sayfanın satırları tek resolve_line_items işidir; line_items'a
+    (item, fatura ismi, future, işteki sıra) eklenir. Satır üretimi hata ile
+    kesilse de o ana kadar toplanan satırlar gönderilir.
+    """
+    batch = []
+    batch_page = None
+    
+    def _flush():
+        if batch:
+            future = resolver.submit(_resolve_timed, timings, start_time, list(batch))
+            for position, (item_num, invoice_name, _) in enumerate(batch):
+                line_items.append((item_num, invoice_name, future, position))
+            batch.clear()
+    
+    try:
+        for item_num, invoice_name, page_num, confidence in rows:
+            if timings['first_item'] is None:
+                timings['first_item'] = time.perf_counter() - start_time
+            if page_num != batch_page:
+                _flush()
+                batch_page = page_num
+            batch.append((item_num, invoice_name, confidence))
+    finally:
+        _flush()
+
+def _resolve_timed(timings, start_time, rows):
+    """Çözümleme pool'u: sayfanın satırlarını çözümle, ilk çözümlenen satırın zamanını kaydet"""
+    results = resolve_line_items(rows)
+    if timings['first_row'] is None:
+        timings['first_row'] = time.perf_counter() - start_time
+    return results
+
+def _learn_template(pages, invoice_number):
+    """Bilinmeyen tedarikçi düzenini sonraki faturalar için öğren"""
+    try:
+        learn_template(pages, invoice_number)
+    except Exception as e:
+        print(f"Şablon öğrenme hatası: {e}")
+
+def _invoice_products(invoice_number, line_items, invoice_lines, gtip_by_sku):
+    """Çözümlenmiş satırlardan sonuç satırlarını kur, SKU'ların GTİP tanımını gtip_by_sku'ya yaz"""
+    totals = sku_totals(invoice_lines)
+    products = []
+    for item_num, invoice_name, future, position in line_items:
+        product_info, is_defined = future.result()[position]
+        qty, line_total = totals.get(item_num, (None, None))
+        gtip_description = product_info.get('gtip_description', product_info.get('turkish', '')) if product_info else 'Tanımlanamadı'
+        gtip_by_sku[item_num] = gtip_description
         
         products.append({
             'Fatura Numarası': invoice_number,
             'SKU': item_num,
             'Faturadaki İsmi': invoice_name,
             'Türkçe Tanım': product_info.get('turkish', '') if product_info else 'Tanımlanamadı',
-            'GTİP Tanımı': product_info.get('gtip_description', product_info.get('turkish', '')) if product_info else 'Tanımlanamadı',
-            'Tanımlandı': is_defined
+            'GTİP Tanımı': gtip_description,
+            'Tanımlandı': is_defined,
+            'Miktar': _rounded(qty),
+            'Tutar': _rounded(line_total)
         })
-        
-        time.sleep(0.05)  # Daha kısa bekleme
+    return products
+
+def _products_frame(products, timings, start_time, line_columns, gtip_summary, parse_job=None):
+    """Sonuç satırlarından DataFrame kur - süreler, fatura satırları ve GTİP özeti attrs'ta
+
+    Ayrıştırma watchdog tarafından kesildiyse (kısmi sonuç) iş bilgisi de eklenir.
+    """
+    timings['total'] = time.perf_counter() - start_time
+    print(f"⏱️ İlk satır: {timings['first_item']:.2f}s (çözümlenmiş: {timings['first_row']:.2f}s), toplam: {timings['total']:.2f}s")
     
     if products:
         df = pd.DataFrame(products)
+        df.attrs['timings'] = timings
+        df.attrs['line_items'] = line_columns
+        df.attrs['gtip_summary'] = gtip_summary
+        if parse_job and parse_job.get('truncated'):
+            df.attrs['watchdog'] = dict(parse_job)
         return df, None
     else:
         return None, "Faturada tanımlanabilir ürün bulunamadı"
 
-def process_invoice(file_path):
+def _rounded(value):
+    """Tutar/miktarı 2 haneye yuvarla, değer yoksa None"""
+    value = amount_or_none(value)
+    return round(value, 2) if value is not None else None
+
+def gtip_value_summary(invoice_lines, gtip_by_sku):
+    """Fatura satırlarını GTİP tanımına göre topla - Excel ve JSON özeti için"""
+    summary = []
+    for gtip_description, values in aggregate_by_sku(invoice_lines, gtip_by_sku).items():
+        summary.append({
+            'GTİP Tanımı': gtip_description,
+            'Satır': values['rows'],
+            'Miktar': _rounded(values['qty']),
+            'Tutar': _rounded(values['line_total'])
+        })
+    return summary
+
+def export_excel(df, output_path):
+    """Sonuçları Excel'e yaz - PDF faturalarda fatura satırları ve GTİP özeti ayrı sayfalarda"""
+    line_items = df.attrs.get('line_items')
+    gtip_summary = df.attrs.get('gtip_summary')
+    if not line_items:
+        df.to_excel(output_path, index=False)
+        return
+    with pd.ExcelWriter(output_path) as writer:
+        df.to_excel(writer, sheet_name='Ürünler', index=False)
+        pd.DataFrame(line_items).rename(columns={
+            'invoice': 'Fatura Numarası', 'sku': 'SKU', 'description': 'Faturadaki İsmi', 'qty': 'Miktar', 'unit_price': 'Birim Fiyat',
+            'line_total': 'Tutar', 'page': 'Sayfa', 'row': 'Satır', 'confidence': 'Güven'
+        }).to_excel(writer, sheet_name='Fatura Satırları', index=False)
+        if gtip_summary:
+            pd.DataFrame(gtip_summary).to_excel(writer, sheet_name='GTİP Özeti', index=False)
+
+def process_invoice(file_path, file_hash=None):
     """Invoice dosyasını işle (PDF, CSV veya Excel)"""
     try:
         if file_path.endswith('.pdf'):
-            return process_pdf_invoice(file_path)
+            return process_pdf_invoice(file_path, file_hash=file_hash)
         elif file_path.endswith('.csv'):
             df = pd.read_csv(file_path)
             return df, None
@@ -459,6 +976,15 @@ def process_invoice(file_path):
     except Exception as e:
         return None, str(e)
 
+def save_upload(file, filepath):
+    """Yüklenen dosyayı diske yazarken SHA-256 hash'ini hesapla"""
+    digest = hashlib.sha256()
+    with open(filepath, 'wb') as f:
+        for chunk in iter(lambda: file.stream.read(1024 * 1024), b''):
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
 @app.route('/')
 def index():
     return render_template('index_final.html')
@@ -477,10 +1003,10 @@ def upload_file():
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{timestamp}_{filename}"
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        file_hash = save_upload(file, filepath)
         
         # Invoice'i işle
-        df, error = process_invoice(filepath)
+        df, error = process_invoice(filepath, file_hash=file_hash)
         
         if error:
             return jsonify({'error': f'Dosya işlenirken hata: {error}'}), 500
@@ -493,18 +1019,40 @@ def upload_file():
             'filename': filename,
             'total_rows': len(df),
             'columns': list(df.columns),
-            'data': df.to_dict('records'),
+            # Okunamayan miktar/tutar NaN yerine null olarak döner
+            'data': df.astype(object).where(df.notna(), None).to_dict('records'),
             'file_type': 'PDF' if filename.endswith('.pdf') else 'Excel/CSV'
         }
+        if df.attrs.get('timings'):
+            result['timings'] = df.attrs['timings']
+        if df.attrs.get('gtip_summary'):
+            result['gtip_summary'] = df.attrs['gtip_summary']
+        if df.attrs.get('watchdog'):
+            # Kısmi sonuç: ayrıştırma süre sınırında kesildi
+            result['watchdog'] = df.attrs['watchdog']
         
         # İşlenmiş dosyayı kaydet
         output_filename = f"translated_{filename.split('.')[-2]}.xlsx"
         output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
-        df.to_excel(output_path, index=False)
+        export_excel(df, output_path)
         result['output_file'] = output_filename
         
         return jsonify(result)
 
+def get_extraction_stats():
+    """PDF extraction metrikleri: katman istatistikleri, watchdog olayları, ürün cache'i (ve ısıtması), host istek sınırları"""
+    return {
+        'tiers': get_tier_stats(),
+        'watchdog': pdf_watchdog.get_watchdog_stats(),
+        'product_cache': get_cache_stats(),
+        'cache_warmup': cache_warmup.get_stats(),
+        'hosts': get_host_stats(),
+    }
+
+@app.route('/stats')
+def stats():
+    return jsonify(get_extraction_stats())
+
 @app.route('/download/<filename>')
 def download_file(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename, as_attachment=True)
@@ -9,6 +9,7 @@ import re
 import requests
 from bs4 import BeautifulSoup
 import time
+from sku_scanner import build_pattern_scanner, scan_patterns
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
@@ -151,31 +152,30 @@ def extract_text_from_pdf(file_path):
     
     return '\n'.join(text_content), tables_data
 
+SKU_PATTERNS = [
+    r'\b\d{6,10}\b',  # 6-10 haneli sayılar
+    r'\b[A-Z]{2,4}[-\s]?\d{4,8}\b',  # Harf-sayı kombinasyonları
+    r'\bSKU[:\s]+([A-Z0-9-]+)\b',  # SKU: ile başlayanlar
+    r'\bItem[:\s]+([A-Z0-9-]+)\b',  # Item: ile başlayanlar
+    r'\bCode[:\s]+([A-Z0-9-]+)\b',  # Code: ile başlayanlar
+    r'\b[A-Z0-9]{8,12}\b',  # Büyük harf ve sayı karışımı
+]
+SKU_SCANNER = build_pattern_scanner(SKU_PATTERNS, re.IGNORECASE)
+
 def extract_sku_from_text(text):
     """Metinden SKU kodlarını çıkar"""
-    sku_patterns = [
-        r'\b\d{6,10}\b',  # 6-10 haneli sayılar
-        r'\b[A-Z]{2,4}[-\s]?\d{4,8}\b',  # Harf-sayı kombinasyonları
-        r'\bSKU[:\s]+([A-Z0-9-]+)\b',  # SKU: ile başlayanlar
-        r'\bItem[:\s]+([A-Z0-9-]+)\b',  # Item: ile başlayanlar
-        r'\bCode[:\s]+([A-Z0-9-]+)\b',  # Code: ile başlayanlar
-        r'\b[A-Z0-9]{8,12}\b',  # Büyük harf ve sayı karışımı
-    ]
-    
-    skus = []
-    for pattern in sku_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        skus.extend(matches)
+    # Modül yüklenirken derlenmiş pattern'ler
+    skus = scan_patterns(SKU_SCANNER, text)
     
     # Tekrar edenleri kaldır ve temizle
     unique_skus = []
+    seen = set()
     for sku in skus:
-        if isinstance(sku, tuple):
-            sku = sku[0]
         sku = sku.strip()
-        if sku and sku not in unique_skus and len(sku) >= 5:
+        if sku and sku not in seen and len(sku) >= 5:
             # Sadece sayı olan ve 5 haneden küçük olanları filtele (fiyat olabilir)
             if not (sku.isdigit() and len(sku) < 6):
+                seen.add(sku)
                 unique_skus.append(sku)
     
     return unique_skus
@@ -9,6 +9,7 @@ import re
 import requests
 from bs4 import BeautifulSoup
 import time
+from sku_scanner import INVALID_ITEM_WORDS, ITEM_SHAPE_RE, build_pattern_scanner, scan_patterns
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
@@ -124,6 +125,8 @@ TREK_CATEGORIES = {
     'dual sport': 'Dual Sport Serisi'
 }
 
+ITEM_LABEL_SCANNER = build_pattern_scanner([r'(?:Item\s*(?:Number|#|No\.?)?[:]\s*)([0-9]{5,10})'], re.IGNORECASE)
+
 def extract_item_numbers_from_pdf(file_path):
     """PDF dosyasından sadece item number'ları çıkar"""
     all_text = []
@@ -180,14 +183,9 @@ def extract_item_numbers_from_pdf(file_path):
                     # En az 5 karakter ve en fazla 10 karakter
                     if item and 5 <= len(item) <= 10:
                         # Sadece sayı veya sayı+harf kombinasyonu
-                        if re.match(r'^[A-Z0-9]+$', item, re.IGNORECASE):
+                        if ITEM_SHAPE_RE.match(item):
                             # Yaygın kelimeler değilse ekle
-                            common_words = ['SEARCH', 'ITEM', 'TOTAL', 'DISCOUNT', 'TAX', 'SHIPPING', 'INVOICE', 
-                                          'DATE', 'CUSTOMER', 'ADDRESS', 'PHONE', 'EMAIL', 'QUANTITY', 'PRICE',
-                                          'AMOUNT', 'SUBTOTAL', 'PAYMENT', 'DESCRIPTION', 'UNIT', 'QTY',
-                                          'authorized', 'regulations', 'controlled', 'percentage', 'Bisiklet',
-                                          'Istanbul', 'trekbikes', 'AQUAMARINE']
-                            if not any(word.upper() == item.upper() for word in common_words):
+                            if item.upper() not in INVALID_ITEM_WORDS:
                                 # En az 1 sayı içermeli
                                 if any(c.isdigit() for c in item):
                                     item_numbers.append(item)
@@ -196,9 +194,7 @@ def extract_item_numbers_from_pdf(file_path):
     if not item_numbers:
         full_text = '\n'.join(all_text)
         # Item Number: 1234567 formatını ara
-        pattern = r'(?:Item\s*(?:Number|#|No\.?)?[:]\s*)([0-9]{5,10})'
-        matches = re.findall(pattern, full_text, re.IGNORECASE)
-        item_numbers.extend(matches)
+        item_numbers.extend(scan_patterns(ITEM_LABEL_SCANNER, full_text))
     
     # Tekrar edenleri kaldır
     unique_items = []
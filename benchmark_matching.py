@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+SKU eşleştirme benchmark'ı - PDF gerektirmez, sentetik fatura dokümanı üretir
+
+Kullanım:
+    python benchmark_matching.py names [--sizes 50,500,5000]
+    python benchmark_matching.py scanner [--cells 100000]
+
+names: extract_product_names_from_pdf'in eski (satır × SKU taraması) ve yeni
+(Aho-Corasick + hash indeks) hallerini karşılaştırır, çıktıların birebir aynı
+olduğunu doğrular.
+
+scanner: hücre doğrulama (liste stop-list + derlenmemiş regex vs frozenset +
+derlenmiş regex, toplu) ve düz metin fallback taramasını (her çağrıda derlenen
+pattern'ler vs önceden derlenmiş tarayıcı) sentetik 100k hücreli faturada ölçer.
+"""
+
+import argparse
+import random
+import re
+import time
+
+
+def make_document(line_items, rows_per_page=40, seed=42):
+    """Sentetik fatura dokümanı: tablo satırları + aynı satırların metin hali"""
+    rng = random.Random(seed)
+    names = ['SADDLE Verse Comp', 'CHN Shimano 11s', 'TIRE Bontrager R3 700x25', 'Fuel EXe 9.8 XT L',
+             'HBR Pro IsoZone', 'Ion 200 RT Light', 'Derailleur hanger universal', 'Brake pad set road']
+
+    skus = []
+    for index in range(line_items):
+        if index % 3 == 0:
+            skus.append(f"W5{rng.randint(100000, 999999)}")
+        elif index % 3 == 1:
+            skus.append(str(rng.randint(5200000, 5339999)))
+        else:
+            skus.append(str(rng.randint(100000, 999999)))
+
+    pages = []
+    for page_start in range(0, line_items, rows_per_page):
+        table = [['Item Number', 'Description', 'Qty', 'Unit Price', 'Total']]
+        text_lines = ['Trek Bicycle Corporation Invoice 90012345', 'Item Number Description Qty Unit Price Total']
+        for sku in skus[page_start:page_start + rows_per_page]:
+            qty = rng.randint(1, 9)
+            price = rng.uniform(5, 900)
+            name = rng.choice(names)
+            table.append([sku, name, str(qty), f"{price:.2f}", f"{qty * price:.2f}"])
+            text_lines.append(f"{sku} {name} {qty} {price:.2f} {qty * price:.2f}")
+        pages.append({'page': len(pages) + 1, 'text': '\n'.join(text_lines), 'tables': [table]})
+
+    return {'file_path': 'synthetic.pdf', 'pages': pages}, list(dict.fromkeys(skus))
+
+
+def legacy_extract_product_names(document, item_numbers):
+    """Eski extract_product_names_from_pdf mantığı (referans, O(satır × SKU))"""
+    product_names = {}
+    for page_info in document['pages']:
+        text = page_info['text']
+        for table in page_info['tables']:
+            if table:
+                for row in table:
+                    if row:
+                        row_text = ' '.join([str(cell) if cell else '' for cell in row])
+                        for item_num in item_numbers:
+                            if item_num in row_text:
+                                for i, cell in enumerate(row):
+                                    if cell and item_num in str(cell):
+                                        for j in range(i + 1, len(row)):
+                                            if row[j] and len(str(row[j])) > 3:
+                                                desc = str(row[j]).strip()
+                                                if not desc.replace('.', '').replace(',', '').isdigit() and len(desc) < 100:
+                                                    product_names[item_num] = desc
+                                                    break
+                                        break
+        if text:
+            for line in text.split('\n'):
+                line_clean = line.strip()
+                for item_num in item_numbers:
+                    if item_num in line_clean and item_num not in product_names:
+                        parts = line_clean.split()
+                        try:
+                            sku_index = parts.index(item_num)
+                            if sku_index < len(parts) - 1:
+                                desc_parts = []
+                                for part in parts[sku_index + 1:]:
+                                    if not part.replace('.', '').replace(',', '').isdigit():
+                                        desc_parts.append(part)
+                                        if len(desc_parts) >= 5:
+                                            break
+                                if desc_parts:
+                                    product_name = ' '.join(desc_parts)
+                                    if len(product_name) > 3:
+                                        product_names[item_num] = product_name
+                        except ValueError:
+                            continue
+    return product_names
+
+
+def legacy_is_valid_item_number(candidate):
+    """Eski is_valid_item_number (referans): her çağrıda liste + derlenmemiş regex"""
+    if not candidate or len(candidate) < 4 or len(candidate) > 10:
+        return False
+    invalid_words = [
+        'SEARCH', 'ITEM', 'TOTAL', 'DISCOUNT', 'TAX', 'SHIPPING', 'INVOICE',
+        'DATE', 'CUSTOMER', 'ADDRESS', 'PHONE', 'EMAIL', 'QUANTITY', 'PRICE',
+        'AMOUNT', 'SUBTOTAL', 'PAYMENT', 'DESCRIPTION', 'UNIT', 'QTY',
+        'AUTHORIZED', 'REGULATIONS', 'CONTROLLED', 'PERCENTAGE', 'BISIKLET',
+        'ISTANBUL', 'TREKBIKES', 'AQUAMARINE', 'COMPANY', 'STREET', 'CITY',
+        'STATE', 'ORDER', 'BILL', 'SHIP', 'FROM', 'NAME', 'LINE'
+    ]
+    if candidate.upper() in invalid_words:
+        return False
+    if not any(c.isdigit() for c in candidate):
+        return False
+    if not re.match(r'^[A-Z0-9]+$', candidate, re.IGNORECASE):
+        return False
+    if re.match(r'^\d{1,3}$', candidate):
+        return False
+    if re.match(r'^\d{4}$', candidate) and int(candidate) > 2000 and int(candidate) < 2030:
+        return False
+    return True
+
+
+def legacy_scan_text(full_text):
+    """Eski düz metin fallback'i (referans): her pattern için ayrı findall"""
+    patterns = [
+        r'(?:Item\s*(?:Number|#|No\.?)?[:]?\s*)([A-Z0-9]{4,8})',
+        r'(?:SKU[:]?\s*)([A-Z0-9]{4,8})',
+        r'(?:Code[:]?\s*)([A-Z0-9]{4,8})',
+        r'\b([A-Z0-9]{5,7})\b',
+    ]
+    found = []
+    for pattern in patterns:
+        for match in re.findall(pattern, full_text, re.IGNORECASE):
+            if legacy_is_valid_item_number(match):
+                found.append(match)
+    return found
+
+
+def make_cells(cell_count, seed=7):
+    """Sentetik fatura hücreleri: SKU, açıklama, miktar, fiyat, toplam karışımı"""
+    document, _ = make_document(cell_count // 5, seed=seed)
+    cells = []
+    for page_info in document['pages']:
+        for table in page_info['tables']:
+            for row in table:
+                cells.extend(row)
+    return cells, '\n'.join(page_info['text'] for page_info in document['pages'])
+
+
+def _best_time(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_names(sizes, repeat):
+    """Ürün adı eşleştirme: eski vs yeni, 50/500/5000 satır"""
+    from app_final import extract_product_names_from_pdf
+
+    print(f"{'Satır':>8} {'Eski (s)':>10} {'Yeni (s)':>10} {'Hızlanma':>10}  Aynı çıktı")
+    print("-" * 54)
+    for size in sizes:
+        document, item_numbers = make_document(size)
+        legacy_time, legacy_result = _best_time(lambda: legacy_extract_product_names(document, item_numbers), repeat)
+        new_time, new_result = _best_time(
+            lambda: extract_product_names_from_pdf(document['file_path'], item_numbers, document=document), repeat)
+        same = 'evet' if legacy_result == new_result else 'HAYIR'
+        print(f"{size:>8} {legacy_time:>10.4f} {new_time:>10.4f} {legacy_time / new_time:>9.1f}x  {same}")
+
+
+def bench_scanner(cell_count, repeat):
+    """Hücre doğrulama ve metin tarama: eski vs paylaşılan sku_scanner"""
+    from sku_scanner import filter_valid_item_numbers, is_valid_item_number, scan_patterns, TEXT_ITEM_SCANNER
+
+    cells, full_text = make_cells(cell_count)
+    print(f"{len(cells)} hücre, {len(full_text)} karakter metin")
+    print(f"{'Ölçüm':<22} {'Eski (s)':>10} {'Yeni (s)':>10} {'Hızlanma':>10}  Aynı çıktı")
+    print("-" * 68)
+
+    def legacy_cells():
+        return [str(cell).strip() for cell in cells if cell and legacy_is_valid_item_number(str(cell).strip())]
+
+    legacy_time, legacy_result = _best_time(legacy_cells, repeat)
+    new_time, new_result = _best_time(lambda: filter_valid_item_numbers(cells), repeat)
+    same = 'evet' if legacy_result == new_result else 'HAYIR'
+    print(f"{'hücre doğrulama':<22} {legacy_time:>10.4f} {new_time:>10.4f} {legacy_time / new_time:>9.1f}x  {same}")
+
+    def new_scan():
+        return [match for match in scan_patterns(TEXT_ITEM_SCANNER, full_text) if is_valid_item_number(match)]
+
+    legacy_time, legacy_result = _best_time(lambda: legacy_scan_text(full_text), repeat)
+    new_time, new_result = _best_time(new_scan, repeat)
+    same = 'evet' if legacy_result == new_result else 'HAYIR'
+    print(f"{'metin fallback':<22} {legacy_time:>10.4f} {new_time:>10.4f} {legacy_time / new_time:>9.1f}x  {same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SKU eşleştirme benchmark')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    names_parser = subparsers.add_parser('names', help='Ürün adı eşleştirme ölçeklenmesi')
+    names_parser.add_argument('--sizes', default='50,500,5000', help='Virgülle ayrılmış satır sayıları')
+    names_parser.add_argument('--repeat', type=int, default=3)
+
+    scanner_parser = subparsers.add_parser('scanner', help='Hücre doğrulama ve metin tarama')
+    scanner_parser.add_argument('--cells', type=int, default=100000, help='Sentetik hücre sayısı')
+    scanner_parser.add_argument('--repeat', type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.command == 'names':
+        bench_names([int(size) for size in args.sizes.split(',')], args.repeat)
+    elif args.command == 'scanner':
+        bench_scanner(args.cells, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
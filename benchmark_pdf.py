@@ -0,0 +1,627 @@
+#!/usr/bin/env python3
+"""
+PDF extraction benchmark - wall time ve peak RSS ölçümü
+
+Kullanım:
+    python benchmark_pdf.py fatura.pdf [fatura2.pdf ...] [--repeat 3]
+    python benchmark_pdf.py fatura.pdf --scenario parallel --workers 1,2,4,8
+    python benchmark_pdf.py fatura.pdf --scenario parse_once --scenario streaming
+    python benchmark_pdf.py fatura.pdf --scenario parse_once --scenario cached
+    python benchmark_pdf.py fatura.pdf --scenario full_tables --scenario words_first --scenario parse_once
+    python benchmark_pdf.py fatura.pdf --scenario all_pages --scenario parse_once
+    python benchmark_pdf.py fatura.pdf --scenario parse_once --scenario pypdfium2
+    python benchmark_pdf.py fatura.pdf --scenario low_memory --pages 50,200,400
+    python benchmark_pdf.py fatura.pdf --scenario parse_once --scenario numpy_tables
+    python benchmark_pdf.py fatura.pdf --compare-tables [--pages 50,200,400]
+
+--pages verilirse kaynak PDF'in sayfaları tekrarlanarak istenen sayfa
+sayılarında geçici PDF'ler üretilir (pypdfium2, pdfplumber ile birlikte gelir);
+peak RSS'in sayfa sayısıyla nasıl büyüdüğü bu şekilde ölçülür.
+
+"Çıktı" sütunu SKU listesi ve ürün adlarının özetidir: backend'ler (parse_once =
+pdfplumber, pypdfium2) aynı değeri gösteriyorsa doğrulukları birebir aynıdır.
+
+--compare-tables senaryoları çalıştırmaz; her sayfada item tablosunu pdfplumber
+(find_tables) ve numpy_table ile kurar, karakterler önceden yüklenmiş olarak iki
+motorun süresini ölçer ve çıktıların birebir aynı olup olmadığını yazdırır.
+
+Her senaryo ayrı bir process'te çalışır, böylece peak RSS değerleri
+birbirini etkilemez. "İlk satır" sütunu ilk line item'ın elde edildiği anı
+gösterir; toplu senaryolarda bu toplam süreye eşittir.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import time
+
+import pdfplumber
+
+
+def _peak_rss_mb():
+    """Bu process'in peak RSS değeri (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux KB, macOS byte döndürür
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _summary(item_numbers, product_names, invoice_number, first_item=None, elapsed=None):
+    """Senaryo sonucunu ortak formata çevir
+
+    digest, bulunan SKU listesi ve ürün adlarının özetidir; aynı digest'e sahip
+    senaryolar (ör. farklı backend'ler) birebir aynı çıktıyı üretmiştir.
+    """
+    payload = json.dumps([list(item_numbers), sorted(product_names.items())], ensure_ascii=False)
+    return {
+        'items': len(item_numbers),
+        'names': len(product_names),
+        'digest': hashlib.sha1(payload.encode('utf-8')).hexdigest()[:8],
+        'invoice_number': invoice_number,
+        'first_item': first_item,
+        'elapsed': elapsed,
+    }
+
+
+# Eski akışın referans kopyası (ilk sürümdeki app_final) - her aşama PDF'i pdfplumber ile
+# kendisi açar ve tüm sayfalarda extract_tables çalıştırır. app_final'deki fonksiyonlar artık
+# doküman verilmezse de yeni akışı kullandığından "before" ölçümü bu kopyayla yapılır.
+
+
+def legacy_extract_item_numbers_from_pdf(file_path):
+    """PDF dosyasından item number'ları çıkar - gelişmiş algoritma"""
+    all_text = []
+    tables_data = []
+    
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            for page_num, page in enumerate(pdf.pages, 1):
+                # Sayfa metnini al
+                text = page.extract_text()
+                if text:
+                    all_text.append(text)
+                
+                # Tabloları çıkar
+                tables = page.extract_tables()
+                for table in tables:
+                    if table:
+                        tables_data.append({
+                            'page': page_num,
+                            'data': table
+                        })
+    except Exception as e:
+        print(f"PDF okuma hatası: {e}")
+        return []
+    
+    item_numbers = []
+    
+    # 1. Tablolarda item number sütunu ara
+    for table_info in tables_data:
+        table = table_info['data']
+        if not table:
+            continue
+            
+        # Başlık satırını ve item sütununu bul
+        item_col_idx = -1
+        for row_idx, row in enumerate(table):
+            if not row:
+                continue
+            for col_idx, cell in enumerate(row):
+                if cell:
+                    cell_lower = str(cell).lower()
+                    # Item number başlığı ara
+                    if any(keyword in cell_lower for keyword in [
+                        'item number', 'item #', 'item#', 'item no', 'item code',
+                        'product code', 'sku', 'code', 'model', 'part number'
+                    ]):
+                        item_col_idx = col_idx
+                        # Bu satırdan sonraki satırları işle
+                        for data_row_idx in range(row_idx + 1, len(table)):
+                            data_row = table[data_row_idx]
+                            if data_row and len(data_row) > item_col_idx and data_row[item_col_idx]:
+                                item_candidate = str(data_row[item_col_idx]).strip()
+                                if legacy_is_valid_item_number(item_candidate):
+                                    item_numbers.append(item_candidate)
+                        break
+            if item_col_idx >= 0:
+                break
+    
+    # 2. Tablolarda sayısal değerleri kontrol et (sütun başlığı yoksa)
+    if not item_numbers:
+        for table_info in tables_data:
+            table = table_info['data']
+            for row in table:
+                if row:
+                    for cell in row:
+                        if cell:
+                            cell_str = str(cell).strip()
+                            if legacy_is_valid_item_number(cell_str):
+                                item_numbers.append(cell_str)
+    
+    # 3. Düz metinde item pattern'leri ara
+    if not item_numbers:
+        full_text = '\n'.join(all_text)
+        patterns = [
+            r'(?:Item\s*(?:Number|#|No\.?)?[:]?\s*)([A-Z0-9]{4,8})',
+            r'(?:SKU[:]?\s*)([A-Z0-9]{4,8})',
+            r'(?:Code[:]?\s*)([A-Z0-9]{4,8})',
+            r'\b([A-Z0-9]{5,7})\b',  # 5-7 karakter alfanümerik
+        ]
+        
+        for pattern in patterns:
+            matches = re.findall(pattern, full_text, re.IGNORECASE)
+            for match in matches:
+                if legacy_is_valid_item_number(match):
+                    item_numbers.append(match)
+    
+    # Benzersiz item'ları döndür
+    unique_items = []
+    seen = set()
+    for item in item_numbers:
+        if item not in seen and len(item) >= 4:
+            seen.add(item)
+            unique_items.append(item)
+    
+    return unique_items  # Tüm itemler
+
+
+def legacy_is_valid_item_number(candidate):
+    """Geçerli bir item number olup olmadığını kontrol et"""
+    if not candidate or len(candidate) < 4 or len(candidate) > 10:
+        return False
+    
+    # Yaygın kelimeler değil
+    invalid_words = [
+        'SEARCH', 'ITEM', 'TOTAL', 'DISCOUNT', 'TAX', 'SHIPPING', 'INVOICE',
+        'DATE', 'CUSTOMER', 'ADDRESS', 'PHONE', 'EMAIL', 'QUANTITY', 'PRICE',
+        'AMOUNT', 'SUBTOTAL', 'PAYMENT', 'DESCRIPTION', 'UNIT', 'QTY',
+        'AUTHORIZED', 'REGULATIONS', 'CONTROLLED', 'PERCENTAGE', 'BISIKLET',
+        'ISTANBUL', 'TREKBIKES', 'AQUAMARINE', 'COMPANY', 'STREET', 'CITY',
+        'STATE', 'ORDER', 'BILL', 'SHIP', 'FROM', 'NAME', 'LINE'
+    ]
+    
+    if candidate.upper() in invalid_words:
+        return False
+    
+    # En az bir rakam içermeli
+    if not any(c.isdigit() for c in candidate):
+        return False
+    
+    # Sadece harf ve rakam içermeli
+    if not re.match(r'^[A-Z0-9]+$', candidate, re.IGNORECASE):
+        return False
+    
+    # Çok yaygın pattern'leri filtrele
+    if re.match(r'^\d{1,3}$', candidate):  # 1-3 rakam (muhtemelen miktar)
+        return False
+    
+    if re.match(r'^\d{4}$', candidate) and int(candidate) > 2000 and int(candidate) < 2030:  # Yıl
+        return False
+    
+    return True
+
+
+def legacy_extract_product_names_from_pdf(file_path, item_numbers):
+    """PDF'den item number'lara karşılık gelen ürün adlarını çıkar - Geliştirilmiş"""
+    product_names = {}
+    
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            for page in pdf.pages:
+                # Hem text hem de tablolardan al
+                text = page.extract_text()
+                tables = page.extract_tables()
+                
+                # Tablolardan ürün adı ara
+                for table in tables:
+                    if table:
+                        for row in table:
+                            if row:
+                                row_text = ' '.join([str(cell) if cell else '' for cell in row])
+                                for item_num in item_numbers:
+                                    if item_num in row_text:
+                                        # SKU'dan sonra gelen hücreleri kontrol et
+                                        for i, cell in enumerate(row):
+                                            if cell and item_num in str(cell):
+                                                # Sonraki hücrelerde açıklama ara
+                                                for j in range(i+1, len(row)):
+                                                    if row[j] and len(str(row[j])) > 3:
+                                                        desc = str(row[j]).strip()
+                                                        # Sayı değilse ve makul uzunluktaysa
+                                                        if not desc.replace('.','').replace(',','').isdigit() and len(desc) < 100:
+                                                            product_names[item_num] = desc
+                                                            break
+                                                break
+                
+                # Text'ten de ara (tablo bulunamazsa)
+                if text:
+                    lines = text.split('\n')
+                    for line in lines:
+                        line_clean = line.strip()
+                        for item_num in item_numbers:
+                            if item_num in line_clean and item_num not in product_names:
+                                # Satırı boşluklarla böl
+                                parts = line_clean.split()
+                                # SKU'nun pozisyonunu bul
+                                try:
+                                    sku_index = parts.index(item_num)
+                                    # SKU'dan sonraki parçaları al
+                                    if sku_index < len(parts) - 1:
+                                        # Sonraki parçaları birleştir (sayısal olmayan ilk 5 kelime)
+                                        desc_parts = []
+                                        for part in parts[sku_index + 1:]:
+                                            # Sayısal değilse ekle
+                                            if not part.replace('.','').replace(',','').isdigit():
+                                                desc_parts.append(part)
+                                                if len(desc_parts) >= 5:  # Max 5 kelime
+                                                    break
+                                        
+                                        if desc_parts:
+                                            product_name = ' '.join(desc_parts)
+                                            if len(product_name) > 3:
+                                                product_names[item_num] = product_name
+                                except ValueError:
+                                    continue
+                                    
+    except Exception as e:
+        print(f"Ürün adı çıkarma hatası: {e}")
+    
+    return product_names
+
+
+def legacy_extract_invoice_number(file_path):
+    """Dosya adından veya PDF içeriğinden fatura numarasını çıkar"""
+    # Önce dosya adından dene
+    filename = os.path.basename(file_path)
+    
+    # Dosya adındaki timestamp'i kaldır
+    filename_clean = re.sub(r'^\d{8}_\d{6}_', '', filename)
+    filename_clean = re.sub(r'\.(pdf|PDF)$', '', filename_clean)
+    
+    # Yaygın fatura numarası pattern'leri
+    invoice_patterns = [
+        r'Invoice[_\s#-]*(\d+)',
+        r'INV[_\s#-]*(\d+)',
+        r'Fatura[_\s#-]*(\d+)',
+        r'(\d{6,})',  # 6+ haneli rakam
+    ]
+    
+    for pattern in invoice_patterns:
+        match = re.search(pattern, filename_clean, re.IGNORECASE)
+        if match:
+            return match.group(1) if match.groups() else match.group(0)
+    
+    # PDF içeriğinden dene
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            first_page_text = pdf.pages[0].extract_text()
+            if first_page_text:
+                for pattern in invoice_patterns:
+                    match = re.search(pattern, first_page_text, re.IGNORECASE)
+                    if match:
+                        return match.group(1) if match.groups() else match.group(0)
+    except:
+        pass
+    
+    # Son çare olarak dosya adını kullan
+    return filename_clean
+
+
+def scenario_before(file_path, workers):
+    """Eski akış: her extraction aşaması PDF'i kendisi açar (legacy_* referans kopyası)
+
+    Eski SKU/isim algoritması farklı olduğundan "Çıktı" özeti yeni akışlardan farklı olabilir.
+    """
+    item_numbers = legacy_extract_item_numbers_from_pdf(file_path)
+    product_names = legacy_extract_product_names_from_pdf(file_path, item_numbers)
+    invoice_number = legacy_extract_invoice_number(file_path)
+    return _summary(item_numbers, product_names, invoice_number)
+
+
+def scenario_parse_once(file_path, workers):
+    """Yeni akış: PDF bir kez ayrıştırılır, doküman paylaşılır"""
+    from app_final import extract_item_numbers_from_pdf, extract_product_names_from_pdf, extract_invoice_number
+    from pdf_parser import parse_pdf
+
+    document = parse_pdf(file_path, workers=1)
+    item_numbers = extract_item_numbers_from_pdf(file_path, document=document)
+    product_names = extract_product_names_from_pdf(file_path, item_numbers, document=document)
+    invoice_number = extract_invoice_number(file_path, document=document)
+    return _summary(item_numbers, product_names, invoice_number)
+
+
+def scenario_full_tables(file_path, workers):
+    """Tablo düzeni tekrar kullanılmadan: her sayfada tam tablo algılaması"""
+    import pdf_parser
+
+    pdf_parser.PDF_LAYOUT_REUSE = False
+    return scenario_parse_once(file_path, workers)
+
+
+def scenario_words_first(file_path, workers):
+    """Metin katmanı kapalı: tekrar kullanılan düzen sadece kırpılmış extract_words ile"""
+    import pdf_parser
+
+    pdf_parser.PDF_TEXT_FIRST = False
+    return scenario_parse_once(file_path, workers)
+
+
+def scenario_all_pages(file_path, workers):
+    """Sayfa sınıflandırıcı kapalı: şartlar/koşullar sayfaları da ayrıştırılır"""
+    import page_classifier
+
+    page_classifier.PAGE_CLASSIFIER = False
+    return scenario_parse_once(file_path, workers)
+
+
+def scenario_pypdfium2(file_path, workers):
+    """pypdfium2 metin backend'i: sayfa metni PDFium'dan, tablo algılaması pdfplumber'dan"""
+    import pdf_backends
+
+    pdf_backends.PDF_BACKEND = 'pypdfium2'
+    return scenario_parse_once(file_path, workers)
+
+
+def scenario_numpy_tables(file_path, workers):
+    """Tam tablo algılaması numpy_table ile (kurulamayan sayfalarda pdfplumber)"""
+    import table_layout
+
+    table_layout.PDF_TABLE_ENGINE = 'numpy'
+    return scenario_parse_once(file_path, workers)
+
+
+def scenario_parallel(file_path, workers):
+    """Sayfa-paralel akış: sayfalar process pool'a bölünür"""
+    from app_final import extract_item_numbers_from_pdf, extract_product_names_from_pdf, extract_invoice_number
+    import pdf_parser
+
+    # Küçük benchmark dosyalarında da pool'un devreye girmesi için eşiği kaldır
+    pdf_parser.PDF_PARALLEL_MIN_PAGES = 2
+    document = pdf_parser.parse_pdf(file_path, workers=workers)
+    pdf_parser.shutdown_executor()
+    item_numbers = extract_item_numbers_from_pdf(file_path, document=document)
+    product_names = extract_product_names_from_pdf(file_path, item_numbers, document=document)
+    invoice_number = extract_invoice_number(file_path, document=document)
+    return _summary(item_numbers, product_names, invoice_number)
+
+
+def scenario_streaming(file_path, workers):
+    """Streaming akış: satırlar sayfa ayrıştırıldıkça üretilir"""
+    from app_final import iter_line_items, extract_invoice_number
+    from pdf_parser import iter_pdf_pages
+
+    start = time.perf_counter()
+    first_item = None
+    pages = []
+    item_numbers = []
+    product_names = {}
+
+    def _collect_pages():
+        # process_pdf_invoice gibi fatura numarası için sadece ilk sayfa tutulur
+        for page_info in iter_pdf_pages(file_path, workers=1):
+            if not pages:
+                pages.append(page_info)
+            yield page_info
+
+    for item_num, invoice_name, _page in iter_line_items(file_path, _collect_pages()):
+        if first_item is None:
+            first_item = time.perf_counter() - start
+        item_numbers.append(item_num)
+        if invoice_name:
+            product_names[item_num] = invoice_name
+
+    invoice_number = extract_invoice_number(file_path, document={'file_path': file_path, 'pages': pages})
+    return _summary(item_numbers, product_names, invoice_number, first_item)
+
+
+def scenario_low_memory(file_path, workers):
+    """Düşük bellek modu: streaming akış, worker ve cache tamponu olmadan"""
+    import pdf_parser
+
+    pdf_parser.PDF_LOW_MEMORY = True
+    return scenario_streaming(file_path, workers)
+
+
+def scenario_cached(file_path, workers):
+    """Tekrar yükleme: sayfalar içerik-adresli disk cache'ten okunur"""
+    import tempfile
+    from app_final import extract_item_numbers_from_pdf, extract_product_names_from_pdf, extract_invoice_number
+    import pdf_cache
+    import pdf_parser
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        pdf_cache.PDF_CACHE_DIR = cache_dir
+        pdf_cache.PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024
+        # İlk yükleme cache'i doldurur, ölçüm ikinci yüklemeden başlar
+        pdf_parser.parse_pdf(file_path, workers=1)
+
+        start = time.perf_counter()
+        document = pdf_parser.parse_pdf(file_path, workers=1)
+        item_numbers = extract_item_numbers_from_pdf(file_path, document=document)
+        product_names = extract_product_names_from_pdf(file_path, item_numbers, document=document)
+        invoice_number = extract_invoice_number(file_path, document=document)
+        elapsed = time.perf_counter() - start
+    return _summary(item_numbers, product_names, invoice_number, elapsed=elapsed)
+
+
+SCENARIOS = {
+    'before': scenario_before,
+    'parse_once': scenario_parse_once,
+    'full_tables': scenario_full_tables,
+    'words_first': scenario_words_first,
+    'all_pages': scenario_all_pages,
+    'pypdfium2': scenario_pypdfium2,
+    'numpy_tables': scenario_numpy_tables,
+    'parallel': scenario_parallel,
+    'streaming': scenario_streaming,
+    'low_memory': scenario_low_memory,
+    'cached': scenario_cached,
+}
+
+# Worker sayısına göre tekrarlanan senaryolar
+SCALING_SCENARIOS = {'parallel'}
+
+
+def _run_scenario(name, file_path, workers, result_queue):
+    """Senaryoyu çalıştır ve ölçümleri kuyruğa yaz (child process içinde)"""
+    import pdf_cache
+    import pdf_parser
+
+    # Disk cache sadece 'cached' senaryosunda açılır, diğerleri her seferinde ayrıştırır
+    pdf_cache.PDF_CACHE_MAX_BYTES = 0
+
+    start = time.perf_counter()
+    result = SCENARIOS[name](file_path, workers)
+    if result['elapsed'] is None:
+        result['elapsed'] = time.perf_counter() - start
+    result['peak_rss_mb'] = _peak_rss_mb()
+    # Paralel senaryoda worker process'lerin katmanları burada sayılmaz
+    result['tiers'] = pdf_parser.get_tier_stats()
+    if result['first_item'] is None:
+        result['first_item'] = result['elapsed']
+    result_queue.put(result)
+
+
+def run_isolated(name, file_path, workers=1):
+    """Senaryoyu temiz bir process'te çalıştır
+
+    Peak RSS sadece ana benchmark process'ini kapsar; paralel senaryoda
+    worker process'lerin belleği ayrıca sayılmaz.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    result_queue = ctx.Queue()
+    # Pool yerine Process: paralel senaryonun kendi worker'larını açabilmesi gerekir
+    process = ctx.Process(target=_run_scenario, args=(name, file_path, workers, result_queue))
+    process.start()
+    result = result_queue.get()
+    process.join()
+    return result
+
+
+def build_scaled_pdf(file_path, page_count, output_dir):
+    """Kaynak PDF'in sayfalarını tekrarlayarak page_count sayfalık PDF üret"""
+    import os
+    import pypdfium2 as pdfium
+
+    source = pdfium.PdfDocument(file_path)
+    target = pdfium.PdfDocument.new()
+    source_pages = len(source)
+    while len(target) < page_count:
+        target.import_pages(source, list(range(min(source_pages, page_count - len(target)))))
+
+    output_path = os.path.join(output_dir, f"{page_count}p_{os.path.basename(file_path)}")
+    target.save(output_path)
+    target.close()
+    source.close()
+    return output_path
+
+
+def _format_tiers(tiers):
+    """Katman başına kullanılan sayfa/deneme, süre ve yükseltme oranı"""
+    parts = [f"{name} {tiers[name]['pages']}/{tiers[name]['attempts']} sayfa {tiers[name]['seconds']:.2f}s"
+             for name in ('text', 'words', 'tables')]
+    skipped = tiers['skipped']
+    return (f"extract_text {tiers['text_seconds']:.2f}s | " + ' | '.join(parts) +
+            f" | yükseltme %{tiers['escalation_rate'] * 100:.0f}"
+            f" | atlanan {skipped['pages']} sayfa ({skipped['seconds']:.2f}s, ~{skipped['saved_seconds']:.2f}s kazanç)")
+
+
+def run_file(file_path, scenarios, worker_counts, repeat):
+    """Tek bir PDF için seçili senaryoları çalıştır ve tabloyu yazdır"""
+    print(f"\n📄 {file_path}")
+    print(f"{'Senaryo':<14} {'Süre (s)':>10} {'İlk satır (s)':>14} {'Peak RSS (MB)':>14} {'SKU':>6} {'İsim':>6} {'Çıktı':>9}  Fatura No")
+    print("-" * 95)
+    for name in scenarios:
+        for workers in (worker_counts if name in SCALING_SCENARIOS else [1]):
+            label = f"{name}[{workers}]" if name in SCALING_SCENARIOS else name
+            runs = [run_isolated(name, file_path, workers) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r['elapsed'])
+            peak = max(r['peak_rss_mb'] for r in runs)
+            print(f"{label:<14} {best['elapsed']:>10.3f} {best['first_item']:>14.3f} {peak:>14.1f} "
+                  f"{best['items']:>6} {best['names']:>6} {best['digest']:>9}  {best['invoice_number']}")
+            print(f"{'':<14} {_format_tiers(best['tiers'])}")
+
+
+def compare_tables(file_path):
+    """Her sayfada item tablosunu pdfplumber ve numpy_table ile kur, süre ve eşitliği yazdır"""
+    import pdfplumber
+    import numpy_table
+    import table_layout
+
+    print(f"\n📄 {file_path}")
+    counts = {'same': 0, 'different': 0, 'fallback': 0, 'no_table': 0}
+    seconds = {'pdfplumber': 0.0, 'numpy': 0.0}
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages:
+            chars = page.chars  # Karakter listesi iki motor için de önceden kurulur
+
+            start = time.perf_counter()
+            tables, layout = table_layout.detect_layout(page)
+            seconds['pdfplumber'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = numpy_table.extract_item_table(chars)
+            seconds['numpy'] += time.perf_counter() - start
+
+            if layout is None:
+                counts['no_table' if result is None else 'different'] += 1
+            elif result is None:
+                counts['fallback'] += 1
+            else:
+                expected = [[(cell or '').replace('\n', ' ') for cell in row]
+                            for row in tables[layout['table']][layout['header_row']:]]
+                if result[0] == expected:
+                    counts['same'] += 1
+                else:
+                    counts['different'] += 1
+                    print(f"  Sayfa {page.page_number}: tablolar farklı")
+            page.close()
+
+    speedup = seconds['pdfplumber'] / seconds['numpy'] if seconds['numpy'] else 0.0
+    print(f"pdfplumber {seconds['pdfplumber']:.3f}s | numpy {seconds['numpy']:.3f}s | x{speedup:.1f}")
+    print(f"aynı {counts['same']} | farklı {counts['different']} | pdfplumber'a düşen {counts['fallback']} "
+          f"| item tablosu yok {counts['no_table']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF extraction benchmark')
+    parser.add_argument('files', nargs='+', help='Ölçülecek PDF faturalar')
+    parser.add_argument('--repeat', type=int, default=3, help='Her senaryo için tekrar sayısı')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Sadece seçilen senaryoları çalıştır')
+    parser.add_argument('--workers', default=str(multiprocessing.cpu_count()),
+                        help='Paralel senaryo için virgülle ayrılmış worker sayıları (örn. 1,2,4)')
+    parser.add_argument('--pages', help='Kaynak sayfaları tekrarlanarak üretilecek sayfa sayıları (örn. 50,200,400)')
+    parser.add_argument('--compare-tables', action='store_true',
+                        help='Senaryolar yerine pdfplumber ve numpy tablo kurmayı sayfa sayfa karşılaştır')
+    args = parser.parse_args()
+
+    scenarios = args.scenario or list(SCENARIOS)
+    worker_counts = [int(count) for count in args.workers.split(',')]
+
+    def _run(file_path):
+        if args.compare_tables:
+            compare_tables(file_path)
+        else:
+            run_file(file_path, scenarios, worker_counts, args.repeat)
+
+    if not args.pages:
+        for file_path in args.files:
+            _run(file_path)
+        return
+
+    import tempfile
+    with tempfile.TemporaryDirectory() as output_dir:
+        for file_path in args.files:
+            for page_count in [int(count) for count in args.pages.split(',')]:
+                _run(build_scaled_pdf(file_path, page_count, output_dir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Ürün cache'ini ısıtma - son faturalardaki SKU'ları önceden çözümleyip kalıcı cache'e yazar
+
+Deploy sonrası ilk yükleme tüm OpenAI ve trekbikes.com aramalarını kendisi ödüyordu.
+Bu iş son faturalarda görülen SKU'ları toplar:
+  - SKU geçmişi (SKU_HISTORY_PATH): app_final'in aradığı her güvenli SKU/isim çifti
+  - uploads klasöründeki translated_*.xlsx çıktılarının 'Fatura Satırları' sayfası
+TREK_SKU_DATABASE'de olmayan ve taze cache kaydı bulunmayanları, en sık görülenden
+başlayarak get_trek_product_info_many ile toplu çözümler. Süre (saniye) ve maliyet
+(yavaş katmana giden SKU sayısı) bütçesi dolunca durur; ilerleme ve bütçe kullanımı
+yazdırılır, son rapor get_stats ile /stats'ta görünür.
+
+Kullanım:
+    python cache_warmup.py [--max-seconds 300] [--max-lookups 200] [--lookback-days 30] [--dry-run]
+
+Mesai dışı çalıştırmak için cron örneği (her gece 03:00):
+    0 3 * * * cd /app && python cache_warmup.py --max-seconds 1800 --max-lookups 1000
+
+app_final CACHE_WARMUP_ON_START=1 ile açılışta arka planda çalıştırır; worker'lardan
+sadece biri ısıtır (product_cache kilidi).
+"""
+
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import product_cache
+from host_limiter import get_host_stats
+from sku_confidence import is_confident
+from trek_sku_database import (OPENAI_BATCH_SIZE, TREK_SKU_DATABASE, canonical_sku, get_trek_product_info_many,
+                               has_fresh_cache, normalize_invoice_name)
+
+SKU_HISTORY_PATH = os.getenv('SKU_HISTORY_PATH', 'sku_history.jsonl')          # Boş = geçmiş tutulmaz
+WARMUP_MAX_SECONDS = float(os.getenv('WARMUP_MAX_SECONDS', '300'))
+WARMUP_MAX_LOOKUPS = int(os.getenv('WARMUP_MAX_LOOKUPS', '200'))              # Yavaş katmana giden SKU sayısı
+WARMUP_LOOKBACK_DAYS = float(os.getenv('WARMUP_LOOKBACK_DAYS', '30'))
+_LEASE_KEY = 'cache_warmup'
+
+_LOCK = threading.Lock()
+_STATE = {'running': False, 'last_report': None}
+
+
+@contextmanager
+def _history_lock():
+    """Geçmiş dosyası için process'ler arası kilit (flock) - ekleme ve yeniden yazma birlikte kilitlenir
+
+    Kilit ayrı .lock dosyasındadır: os.replace geçmiş dosyasının inode'unu değiştirdiği için
+    dosyanın kendisi kilitlenirse eski inode'da bekleyen worker'ın eklediği satır kaybolurdu.
+    """
+    with _LOCK, open(SKU_HISTORY_PATH + '.lock', 'a') as lock_file:
+        try:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except ImportError:
+            pass
+        yield
+
+
+def record_skus(pairs):
+    """Aranan (sku, fatura ismi) çiftlerini SKU geçmişine ekle"""
+    if not SKU_HISTORY_PATH or not pairs:
+        return
+    line = json.dumps({'time': int(time.time()), 'items': [[sku, name or ''] for sku, name in pairs]},
+                      ensure_ascii=False)
+    try:
+        with _history_lock(), open(SKU_HISTORY_PATH, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+    except OSError as e:
+        print(f"SKU geçmişi yazma hatası: {e}")
+
+
+def _history_pairs(since):
+    """Geçmişteki since'ten yeni çiftler - eski satırlar dosyadan atılır"""
+    if not SKU_HISTORY_PATH:
+        return []
+    pairs = []
+    kept = []
+    try:
+        with _history_lock():
+            with open(SKU_HISTORY_PATH, encoding='utf-8') as f:
+                lines = f.readlines()
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get('time', 0) < since:
+                    continue
+                kept.append(line)
+                pairs.extend((sku, name) for sku, name in entry.get('items', []))
+            # Geçmiş sadece bakış penceresi kadar tutulur
+            if len(kept) < len(lines):
+                temp_path = SKU_HISTORY_PATH + '.tmp'
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    f.writelines(kept)
+                os.replace(temp_path, SKU_HISTORY_PATH)
+    except OSError:
+        return pairs
+    return pairs
+
+
+def _upload_pairs(uploads_dir, since):
+    """uploads klasöründeki since'ten yeni Excel çıktılarının güvenli SKU/isim çiftleri"""
+    if not uploads_dir or not os.path.isdir(uploads_dir):
+        return []
+    import pandas as pd
+
+    pairs = []
+    for filename in sorted(os.listdir(uploads_dir)):
+        path = os.path.join(uploads_dir, filename)
+        if not (filename.startswith('translated_') and filename.endswith('.xlsx')) or os.path.getmtime(path) < since:
+            continue
+        try:
+            rows = pd.read_excel(path, sheet_name='Fatura Satırları', dtype={'SKU': str})
+        except Exception as e:
+            # Eski çıktılarda satır sayfası yok
+            print(f"Cache ısıtma: {filename} okunamadı ({e})")
+            continue
+        for row in rows.to_dict('records'):
+            confidence = row.get('Güven')
+            if not row.get('SKU') or (pd.notna(confidence) and not is_confident(confidence)):
+                continue
+            name = row.get('Faturadaki İsmi')
+            pairs.append((str(row['SKU']), name if isinstance(name, str) else ''))
+    return pairs
+
+
+def collect_candidates(uploads_dir=None, lookback_days=None):
+    """Son faturalardaki tekil (sku, isim) çiftleri - en sık görülen önce"""
+    lookback_days = WARMUP_LOOKBACK_DAYS if lookback_days is None else lookback_days
+    since = time.time() - lookback_days * 24 * 3600
+    counts = Counter()
+    first_pair = {}
+    for sku, name in _history_pairs(since) + _upload_pairs(uploads_dir, since):
+        key = (canonical_sku(sku), normalize_invoice_name(name))
+        counts[key] += 1
+        first_pair.setdefault(key, (str(sku).strip(), name))
+    return [first_pair[key] for key, _ in counts.most_common()]
+
+
+def warm_up(uploads_dir=None, max_seconds=None, max_lookups=None, lookback_days=None, dry_run=False):
+    """Cache'te olmayan son SKU'ları bütçe dahilinde çözümle - rapor sözlüğü döner
+
+    Süre bütçesi toplu aramalar arasında kontrol edilir (devam eden toplu arama kesilmez).
+    """
+    max_seconds = WARMUP_MAX_SECONDS if max_seconds is None else max_seconds
+    max_lookups = WARMUP_MAX_LOOKUPS if max_lookups is None else max_lookups
+    started = time.perf_counter()
+    hosts_before = get_host_stats()['hosts']
+
+    candidates = collect_candidates(uploads_dir, lookback_days)
+    report = {
+        'candidates': len(candidates),
+        'skipped_database': 0,
+        'skipped_cached': 0,
+        'pending': 0,
+        'resolved': 0,
+        'sources': {},
+        'lookups_used': 0,
+        'max_lookups': max_lookups,
+        'max_seconds': max_seconds,
+        'stopped': None,
+    }
+    pending = []
+    for sku, name in candidates:
+        if sku in TREK_SKU_DATABASE:
+            report['skipped_database'] += 1
+        elif has_fresh_cache(sku, name):
+            report['skipped_cached'] += 1
+        else:
+            pending.append((sku, name))
+    report['pending'] = len(pending)
+    print(f"Cache ısıtma: {len(candidates)} SKU, {report['skipped_database']} veritabanında, "
+          f"{report['skipped_cached']} cache'te, {len(pending)} çözümlenecek")
+
+    sources = Counter()
+    position = 0
+    while position < len(pending) and not dry_run:
+        elapsed = time.perf_counter() - started
+        if elapsed >= max_seconds:
+            report['stopped'] = 'time_budget'
+            break
+        batch_size = min(OPENAI_BATCH_SIZE, max_lookups - report['lookups_used'])
+        if batch_size <= 0:
+            report['stopped'] = 'lookup_budget'
+            break
+        batch = pending[position:position + batch_size]
+        found = get_trek_product_info_many(batch)
+        sources.update(found[pair]['source'] for pair in batch)
+        position += len(batch)
+        report['lookups_used'] += len(batch)
+        report['resolved'] = position
+        print(f"Cache ısıtma: {position}/{len(pending)} SKU, "
+              f"{time.perf_counter() - started:.0f}/{max_seconds:.0f}s, "
+              f"{report['lookups_used']}/{max_lookups} arama")
+
+    hosts_after = get_host_stats()['hosts']
+    report['sources'] = dict(sources)
+    report['host_requests'] = {host: count - hosts_before.get(host, 0) for host, count in hosts_after.items()
+                               if count > hosts_before.get(host, 0)}
+    report['seconds'] = round(time.perf_counter() - started, 2)
+    report['finished'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    with _LOCK:
+        _STATE['last_report'] = report
+    print(f"Cache ısıtma bitti: {report['resolved']}/{len(pending)} SKU, {report['seconds']}s, "
+          f"istekler {report['host_requests']}" + (f" (bütçe doldu: {report['stopped']})" if report['stopped'] else ""))
+    return report
+
+
+def start_background(uploads_dir=None, **budget):
+    """Isıtmayı daemon thread'de başlat - başka worker ısıtıyorsa (kilit) çalışmaz"""
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    lease_seconds = (WARMUP_MAX_SECONDS if budget.get('max_seconds') is None else budget['max_seconds']) + 60
+
+    def _run():
+        if not product_cache.acquire_lease(_LEASE_KEY, owner, lease_seconds):
+            print("Cache ısıtma başka worker'da çalışıyor, atlandı")
+            return
+        with _LOCK:
+            _STATE['running'] = True
+        try:
+            warm_up(uploads_dir, **budget)
+        except Exception as e:
+            print(f"Cache ısıtma hatası: {e}")
+        finally:
+            with _LOCK:
+                _STATE['running'] = False
+            product_cache.release_lease(_LEASE_KEY, owner)
+
+    thread = threading.Thread(target=_run, name='cache-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def get_stats():
+    """Çalışıyor mu ve son ısıtmanın raporu"""
+    with _LOCK:
+        return {'running': _STATE['running'], 'last_report': _STATE['last_report']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Son faturalardaki SKU'larla ürün cache'ini ısıt")
+    parser.add_argument('--uploads', default='uploads', help="Excel çıktılarının okunacağı klasör")
+    parser.add_argument('--max-seconds', type=float, default=None, help="Süre bütçesi (saniye)")
+    parser.add_argument('--max-lookups', type=int, default=None, help="Yavaş katmana gönderilecek en fazla SKU")
+    parser.add_argument('--lookback-days', type=float, default=None, help="Kaç günlük faturalara bakılacak")
+    parser.add_argument('--dry-run', action='store_true', help="Sadece aday sayılarını göster, arama yapma")
+    args = parser.parse_args()
+    report = warm_up(args.uploads, args.max_seconds, args.max_lookups, args.lookback_days, args.dry_run)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# Host başına istek sınırı - SKU çözümlemesi paralel thread'lerde çalışırken aynı siteye
+# (trekbikes.com, OpenAI API) giden istekleri sınırlar:
+#   - eşzamanlılık: host başına aynı anda en fazla HOST_MAX_CONCURRENCY istek
+#   - aralık: aynı host'a iki isteğin başlangıcı arasında en az HOST_MIN_INTERVAL saniye
+#   - 429 cevabında host tüm thread'ler için bir süre bekletilir (penalize)
+# Sabit time.sleep beklemelerinin yerine geçer; bekleme sadece gerektiğinde yapılır.
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+HOST_MAX_CONCURRENCY = int(os.getenv('HOST_MAX_CONCURRENCY', '2'))
+HOST_MIN_INTERVAL = float(os.getenv('HOST_MIN_INTERVAL', '0.5'))   # Saniye
+
+# Host'a özel sınırlar: (eşzamanlılık, aralık) - listede olmayan host'lar varsayılanı kullanır
+HOST_LIMITS = {
+    'api.openai.com': (int(os.getenv('OPENAI_MAX_CONCURRENCY', '4')), 0.0),
+}
+
+_LOCK = threading.Lock()
+_HOSTS = {}
+_STATS = {'requests': 0, 'waits': 0, 'wait_seconds': 0.0, 'penalties': 0}
+
+
+def host_of(url):
+    """URL'nin host'u - URL değilse değerin kendisi host sayılır"""
+    if '://' not in url:
+        return url
+    return urlsplit(url).hostname or url
+
+
+def _host_state(host):
+    """Host'un semaphore ve zamanlama durumu (ilk kullanımda oluşturulur)"""
+    with _LOCK:
+        state = _HOSTS.get(host)
+        if state is None:
+            concurrency, interval = HOST_LIMITS.get(host, (HOST_MAX_CONCURRENCY, HOST_MIN_INTERVAL))
+            state = {
+                'semaphore': threading.BoundedSemaphore(max(concurrency, 1)),
+                'interval': interval,
+                'next_start': 0.0,
+                'requests': 0,
+            }
+            _HOSTS[host] = state
+        return state
+
+
+@contextmanager
+def host_slot(url):
+    """Host için istek hakkı al - eşzamanlılık ve aralık sınırı dolana kadar bekler
+
+        with host_slot(url):
+            response = session.get(url, timeout=5)
+    """
+    host = host_of(url)
+    state = _host_state(host)
+    with state['semaphore']:
+        with _LOCK:
+            now = time.monotonic()
+            start = max(now, state['next_start'])
+            state['next_start'] = start + state['interval']
+            state['requests'] += 1
+            _STATS['requests'] += 1
+            wait = start - now
+            if wait > 0:
+                _STATS['waits'] += 1
+                _STATS['wait_seconds'] += wait
+        if wait > 0:
+            time.sleep(wait)
+        yield
+
+
+def penalize(url, seconds):
+    """Host'a gelecek istekleri ertele (429 Too Many Requests gibi durumlarda)"""
+    state = _host_state(host_of(url))
+    with _LOCK:
+        state['next_start'] = max(state['next_start'], time.monotonic() + seconds)
+        _STATS['penalties'] += 1
+
+
+def get_host_stats():
+    """İstek ve bekleme sayaçları, host başına istek sayısı"""
+    with _LOCK:
+        stats = dict(_STATS)
+        stats['wait_seconds'] = round(stats['wait_seconds'], 2)
+        stats['hosts'] = {host: state['requests'] for host, state in _HOSTS.items()}
+    return stats
@@ -0,0 +1,118 @@
+# Çok faturalı PDF'lerin (ay sonu toplu taramaları) alt faturalara bölünmesi
+# Sınırlar sayfa metninden bulunur:
+#   - sayfadaki fatura numarası bir önceki sayfanınkinden farklıysa yeni fatura başlar
+#   - numara okunamıyorsa, 'Page 1' / 'Sayfa 1' ile başlayan tekrar eden başlık yeni faturadır
+# Numarası ve sayfa işareti olmayan sayfalar (şartlar/koşullar, devam sayfaları) önceki faturaya aittir.
+# Metin PDFium'dan (pdf_backends) alınır; pdfplumber ayrıştırmasından önce çalışır, böylece
+# alt faturalar ayrı process'lerde aynı anda ayrıştırılabilir.
+
+import os
+import re
+
+import pdf_backends
+
+INVOICE_SPLIT = os.getenv('INVOICE_SPLIT', '1') != '0'
+
+# Sayfa başlığındaki fatura numarası - etiketli olmalı, serbest 6+ haneli sayılar sınır sayılmaz
+PAGE_INVOICE_PATTERNS = [
+    re.compile(r'\bInvoice\s*(?:Number|No\.?|#)?[\s#:.-]*([A-Z0-9-]*\d[A-Z0-9-]*)', re.IGNORECASE),
+    re.compile(r'\bFatura\s*(?:Numarası|No\.?|#)?[\s#:.-]*([A-Z0-9-]*\d[A-Z0-9-]*)', re.IGNORECASE),
+    re.compile(r'\bINV[\s#:.-]*(\d[A-Z0-9-]*)'),
+]
+MIN_INVOICE_NUMBER_LENGTH = 4
+PAGE_NUMBER_RE = re.compile(r'\b(?:Page|Sayfa)\s*(\d+)\b', re.IGNORECASE)
+
+
+def normalize_invoice_number(number):
+    """Fatura numarasının tek biçimi: sadece rakamlar ('INV700001' -> '700001', '2024-00123' -> '202400123')
+
+    Tek faturalı yol (app_final.extract_invoice_number) ve alt fatura bölme aynı biçimi
+    kullanır; şablonlar, Excel çıktı adları ve geçmiş numaraya göre eşleşir. Rakam yoksa
+    değer olduğu gibi döner.
+    """
+    if not number:
+        return number
+    digits = ''.join(re.findall(r'\d+', str(number)))
+    return digits or number
+
+
+def page_invoice_number(text):
+    """Sayfa metnindeki etiketli fatura numarası, yoksa None"""
+    if not text:
+        return None
+    for pattern in PAGE_INVOICE_PATTERNS:
+        for match in pattern.finditer(text):
+            number = match.group(1).strip('-')
+            # 'invoice 30 days' gibi kısa sayılar fatura numarası değildir
+            if len(number) >= MIN_INVOICE_NUMBER_LENGTH:
+                return number
+    return None
+
+
+def _page_marker(text):
+    """Sayfadaki 'Page N' işaretinin numarası, yoksa None"""
+    match = PAGE_NUMBER_RE.search(text or '')
+    return int(match.group(1)) if match else None
+
+
+def split_page_texts(texts):
+    """Sayfa metinlerini alt faturalara böl
+
+    Dönen değer sayfa sırasıyla [{'invoice_number': str|None, 'start': 0, 'end': 3}, ...]
+    listesidir (end hariç, 0 tabanlı sayfa indeksleri). Sınırlar ham numaralarla bulunur,
+    dönen numaralar normalize_invoice_number biçimindedir.
+    """
+    segments = []
+    for index, text in enumerate(texts):
+        number = page_invoice_number(text)
+        current = segments[-1] if segments else None
+
+        if current is None:
+            segments.append({'invoice_number': number, 'start': index, 'end': index + 1})
+            continue
+
+        if number and current['invoice_number'] and number != current['invoice_number']:
+            new_invoice = True
+        elif number is None and _page_marker(text) == 1:
+            # Numara okunamadı ama başlık 'Page 1' ile yeniden başlıyor
+            new_invoice = True
+        else:
+            new_invoice = False
+
+        if new_invoice:
+            segments.append({'invoice_number': number, 'start': index, 'end': index + 1})
+        else:
+            if current['invoice_number'] is None:
+                current['invoice_number'] = number
+            current['end'] = index + 1
+    for segment in segments:
+        segment['invoice_number'] = normalize_invoice_number(segment['invoice_number'])
+    return segments
+
+
+def iter_page_texts(file_path, page_count):
+    """Sayfaların PDFium metni - okunamayan sayfa için None"""
+    for page_data in pdf_backends.iter_pdfium_pages(file_path, 0, page_count):
+        yield None if page_data is None else page_data['text']
+
+
+def detect_invoice_segments(file_path, page_count=None, texts=None):
+    """PDF'i PDFium metniyle tara ve alt fatura aralıklarını döndür
+
+    texts verilirse sayfa metinleri oradan okunur (pdf_watchdog child process'i).
+    Bölme kapalıysa veya PDFium metni okunamazsa tek aralık döner.
+    """
+    if page_count is None:
+        page_count = pdf_backends.page_count(file_path)
+    single = [{'invoice_number': None, 'start': 0, 'end': page_count}]
+    if not INVOICE_SPLIT or page_count < 2:
+        return single
+
+    page_texts = []
+    for text in iter_page_texts(file_path, page_count) if texts is None else texts:
+        if text is None:
+            return single
+        page_texts.append(text)
+    if len(page_texts) < page_count:
+        return single
+    return split_page_texts(page_texts)
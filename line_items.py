@@ -0,0 +1,171 @@
+# Faturadaki line item'ların sütun bazlı (columnar) tablosu
+# PDF bir kez taranır; her item satırı (tekrar eden SKU'lar dahil) sütun dizilerine eklenir:
+#   sku, description: str listeleri
+#   qty, unit_price, line_total: array('d') - değer okunamadıysa NaN
+#   page, row: array('i') - satırın sayfası ve tablodaki satır indeksi
+#   confidence: array('d') - SKU adayının güven skoru (sku_confidence), yoksa NaN
+# Satır başına sözlük tutulmaz; Excel çıktısı ve GTİP bazlı toplamlar doğrudan bu
+# sütunlardan okunur.
+
+import math
+import re
+from array import array
+
+COLUMNS = ('sku', 'description', 'qty', 'unit_price', 'line_total', 'page', 'row', 'confidence')
+
+# Değer sütunlarını işaret eden başlık kelimeleri - sıra önemli: 'unit price' birim fiyat,
+# diğer 'price'/'total'/'amount' başlıkları satır tutarıdır
+QUANTITY_HEADER_KEYWORDS = ('qty', 'quantity', 'miktar', 'adet')
+UNIT_PRICE_HEADER_KEYWORDS = ('unit price', 'unit cost', 'birim fiyat', 'price each')
+LINE_TOTAL_HEADER_KEYWORDS = ('total', 'amount', 'extended', 'tutar', 'toplam', 'price')
+
+_AMOUNT_RE = re.compile(r'-?\d[\d.,]*')
+
+
+def new_line_item_table():
+    """Boş line item tablosu"""
+    return {
+        'sku': [],
+        'description': [],
+        'qty': array('d'),
+        'unit_price': array('d'),
+        'line_total': array('d'),
+        'page': array('i'),
+        'row': array('i'),
+        'confidence': array('d'),
+    }
+
+
+def line_item_count(table):
+    """Tablodaki satır sayısı"""
+    return len(table['sku'])
+
+
+def append_line_item(table, sku, description='', qty=None, unit_price=None, line_total=None, page=None, row=None,
+                     confidence=None):
+    """Tabloya bir satır ekle - eksik sayısal değerler NaN, eksik sayfa/satır -1"""
+    table['sku'].append(sku)
+    table['description'].append(description or '')
+    table['qty'].append(math.nan if qty is None else qty)
+    table['unit_price'].append(math.nan if unit_price is None else unit_price)
+    table['line_total'].append(math.nan if line_total is None else line_total)
+    table['page'].append(-1 if page is None else page)
+    table['row'].append(-1 if row is None else row)
+    table['confidence'].append(math.nan if confidence is None else confidence)
+
+
+def parse_amount(cell):
+    """Hücredeki miktar/tutarı sayıya çevir - '1,234.56', '1.234,56', '12' biçimleri; okunamazsa None"""
+    if cell is None:
+        return None
+    match = _AMOUNT_RE.search(str(cell).replace(' ', ''))
+    if not match:
+        return None
+    text = match.group(0).rstrip('.,')
+    last_dot = text.rfind('.')
+    last_comma = text.rfind(',')
+    if last_dot >= 0 and last_comma >= 0:
+        # Sondaki ayırıcı ondalık, diğeri binlik ayırıcı
+        if last_comma > last_dot:
+            text = text.replace('.', '').replace(',', '.')
+        else:
+            text = text.replace(',', '')
+    elif last_comma >= 0:
+        # Tek virgül ve arkasında 1-2 hane varsa ondalık, yoksa binlik ayırıcı
+        if text.count(',') == 1 and len(text) - last_comma - 1 in (1, 2):
+            text = text.replace(',', '.')
+        else:
+            text = text.replace(',', '')
+    elif text.count('.') > 1:
+        text = text.replace('.', '')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def find_value_columns(header_cells, item_col=None):
+    """Başlık hücrelerinden miktar, birim fiyat ve satır tutarı sütunlarını bul
+
+    Dönen değer {'qty': idx|None, 'unit_price': idx|None, 'line_total': idx|None}.
+    """
+    columns = {'qty': None, 'unit_price': None, 'line_total': None}
+    for col_idx, cell in enumerate(header_cells):
+        if col_idx == item_col or not cell:
+            continue
+        text = ' '.join(str(cell).lower().split())
+        if columns['unit_price'] is None and any(keyword in text for keyword in UNIT_PRICE_HEADER_KEYWORDS):
+            columns['unit_price'] = col_idx
+        elif columns['qty'] is None and any(keyword in text for keyword in QUANTITY_HEADER_KEYWORDS):
+            columns['qty'] = col_idx
+        elif columns['line_total'] is None and any(keyword in text for keyword in LINE_TOTAL_HEADER_KEYWORDS):
+            columns['line_total'] = col_idx
+    return columns
+
+
+def row_values(row, value_columns):
+    """Satırdan (qty, unit_price, line_total) - sütun yoksa veya okunamazsa None"""
+    values = []
+    for name in ('qty', 'unit_price', 'line_total'):
+        col_idx = value_columns[name]
+        values.append(parse_amount(row[col_idx]) if col_idx is not None and col_idx < len(row) else None)
+    qty, unit_price, line_total = values
+    # Tutar sütunu yoksa miktar × birim fiyat
+    if line_total is None and qty is not None and unit_price is not None:
+        line_total = round(qty * unit_price, 2)
+    return qty, unit_price, line_total
+
+
+def group_sums(keys, values):
+    """Anahtar listesine göre değerleri topla - NaN değerler atlanır
+
+    Dönen değer ilk görülme sırasında {anahtar: toplam}; hiç değeri olmayan
+    anahtarların toplamı NaN'dır.
+    """
+    sums = {}
+    for key, value in zip(keys, values):
+        if key not in sums:
+            sums[key] = math.nan
+        if not math.isnan(value):
+            sums[key] = value if math.isnan(sums[key]) else sums[key] + value
+    return sums
+
+
+def sku_totals(table):
+    """SKU başına toplam miktar ve tutar - {sku: (qty, line_total)}"""
+    qty = group_sums(table['sku'], table['qty'])
+    totals = group_sums(table['sku'], table['line_total'])
+    return {sku: (qty[sku], totals[sku]) for sku in qty}
+
+
+def aggregate_by_sku(table, key_by_sku):
+    """Satırları SKU'dan türetilen anahtara (örn. GTİP tanımı) göre topla
+
+    Dönen değer ilk görülme sırasında {anahtar: {'qty', 'line_total', 'rows'}}.
+    """
+    keys = [key_by_sku.get(sku, '') for sku in table['sku']]
+    qty = group_sums(keys, table['qty'])
+    totals = group_sums(keys, table['line_total'])
+    rows = {}
+    for key in keys:
+        rows[key] = rows.get(key, 0) + 1
+    return {key: {'qty': qty[key], 'line_total': totals[key], 'rows': rows[key]} for key in qty}
+
+
+def amount_or_none(value):
+    """NaN değeri None'a çevir (JSON çıktısı için)"""
+    return None if value is None or math.isnan(value) else value
+
+
+def concat_line_items(tables):
+    """Birden fazla line item tablosunu sırayla tek tabloda birleştir"""
+    combined = new_line_item_table()
+    for table in tables:
+        for name in COLUMNS:
+            combined[name].extend(table[name])
+    return combined
+
+
+def to_columns(table):
+    """pandas DataFrame / Excel için sütun sözlüğü (NaN değerler korunur)"""
+    return {name: list(table[name]) for name in COLUMNS}
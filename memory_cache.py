@@ -0,0 +1,155 @@
+# Process içi, bellek sınırlı LRU + TTL cache
+# trek_sku_database ve trek_sku_database_fixed'deki _WEB_CACHE sözlükleri sınırsız büyüyordu:
+# süresi dolan kayıt sadece aynı anahtar tekrar okununca siliniyordu. Burada her cache:
+#   - en fazla max_entries kayıt ve yaklaşık max_bytes bellek tutar (JSON boyutu üzerinden)
+#   - sınır aşılınca en uzun süredir kullanılmayan kayıt atılır (LRU)
+#   - süresi dolan kayıtlar arka plan thread'inde SWEEP_INTERVAL saniyede bir silinir
+# Cache durumu sözlüktür; tüm işlemler cache'in kilidi altında yapılır (thread-safe).
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MEMORY_CACHE_MAX_ENTRIES = int(os.getenv('MEMORY_CACHE_MAX_ENTRIES', '5000'))
+MEMORY_CACHE_MAX_BYTES = int(os.getenv('MEMORY_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+SWEEP_INTERVAL = float(os.getenv('MEMORY_CACHE_SWEEP_INTERVAL', '60'))  # Saniye, 0 = arka plan temizliği yok
+_ENTRY_OVERHEAD = 200  # Kayıt başına tuple/sözlük ek yükü tahmini (byte)
+
+_LOCK = threading.Lock()
+_CACHES = []
+_SWEEPER = {'thread': None, 'pid': None}
+
+
+def _size_of(key, value):
+    """Kaydın yaklaşık bellek boyutu - JSON uzunluğu + sabit ek yük"""
+    try:
+        size = len(json.dumps(value, ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        size = len(repr(value))
+    return size + len(key) + _ENTRY_OVERHEAD
+
+
+def create(name, max_entries=None, max_bytes=None):
+    """Yeni cache - sınırlar verilmezse MEMORY_CACHE_MAX_ENTRIES / MEMORY_CACHE_MAX_BYTES"""
+    cache = {
+        'name': name,
+        'lock': threading.Lock(),
+        'entries': OrderedDict(),  # anahtar -> (değer, bitiş zamanı, boyut); sonda en son kullanılan
+        'bytes': 0,
+        'max_entries': MEMORY_CACHE_MAX_ENTRIES if max_entries is None else max_entries,
+        'max_bytes': MEMORY_CACHE_MAX_BYTES if max_bytes is None else max_bytes,
+        'stats': {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0},
+    }
+    with _LOCK:
+        _CACHES.append(cache)
+    _ensure_sweeper()
+    return cache
+
+
+def _remove(cache, key):
+    """Kaydı sil - cache kilidi altında çağrılır"""
+    entry = cache['entries'].pop(key, None)
+    if entry is not None:
+        cache['bytes'] -= entry[2]
+    return entry
+
+
+def get(cache, key, now=None):
+    """Süresi dolmamış değer, yoksa None - okunan kayıt en son kullanılan olur"""
+    now = now or time.time()
+    with cache['lock']:
+        entry = cache['entries'].get(key)
+        if entry is None:
+            cache['stats']['misses'] += 1
+            return None
+        if entry[1] <= now:
+            _remove(cache, key)
+            cache['stats']['expirations'] += 1
+            cache['stats']['misses'] += 1
+            return None
+        cache['entries'].move_to_end(key)
+        cache['stats']['hits'] += 1
+        return entry[0]
+
+
+def put(cache, key, value, ttl, now=None):
+    """Değeri ttl saniyeliğine yaz - sınırlar aşılırsa en eski kullanılan kayıtlar atılır"""
+    now = now or time.time()
+    size = _size_of(key, value)
+    with cache['lock']:
+        _remove(cache, key)
+        if ttl <= 0 or size > cache['max_bytes'] or cache['max_entries'] <= 0:
+            return
+        cache['entries'][key] = (value, now + ttl, size)
+        cache['bytes'] += size
+        while len(cache['entries']) > cache['max_entries'] or cache['bytes'] > cache['max_bytes']:
+            oldest = next(iter(cache['entries']))
+            _remove(cache, oldest)
+            cache['stats']['evictions'] += 1
+    _ensure_sweeper()
+
+
+def delete(cache, key):
+    """Tek kaydı sil"""
+    with cache['lock']:
+        _remove(cache, key)
+
+
+def clear(cache, prefix=None):
+    """Kayıtları sil - prefix verilirse sadece o önekle başlayan anahtarlar; silinen sayısı döner"""
+    with cache['lock']:
+        if prefix is None:
+            removed = len(cache['entries'])
+            cache['entries'].clear()
+            cache['bytes'] = 0
+            return removed
+        keys = [key for key in cache['entries'] if key.startswith(prefix)]
+        for key in keys:
+            _remove(cache, key)
+        return len(keys)
+
+
+def expire(cache, now=None):
+    """Süresi dolan kayıtları sil - silinen sayısı döner"""
+    now = now or time.time()
+    with cache['lock']:
+        keys = [key for key, entry in cache['entries'].items() if entry[1] <= now]
+        for key in keys:
+            _remove(cache, key)
+        cache['stats']['expirations'] += len(keys)
+    return len(keys)
+
+
+def _sweep_loop():
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        with _LOCK:
+            caches = list(_CACHES)
+        for cache in caches:
+            expire(cache)
+
+
+def _ensure_sweeper():
+    """Arka plan temizlik thread'ini başlat - fork sonrası child'da yeniden başlatılır"""
+    if SWEEP_INTERVAL <= 0 or _SWEEPER['pid'] == os.getpid():
+        return
+    with _LOCK:
+        if _SWEEPER['pid'] == os.getpid():
+            return
+        thread = threading.Thread(target=_sweep_loop, name='memory-cache-sweeper', daemon=True)
+        thread.start()
+        _SWEEPER['thread'] = thread
+        _SWEEPER['pid'] = os.getpid()
+
+
+def get_stats(cache):
+    """Kayıt sayısı, kullanılan byte, sınırlar ve hit/miss/evictions/expirations sayaçları"""
+    with cache['lock']:
+        stats = dict(cache['stats'])
+        stats['entries'] = len(cache['entries'])
+        stats['bytes_used'] = cache['bytes']
+    stats['max_entries'] = cache['max_entries']
+    stats['max_bytes'] = cache['max_bytes']
+    return stats
@@ -0,0 +1,153 @@
+# Karakter koordinatlarından NumPy ile item tablosu kurma
+# pdfplumber extract_tables hücre grafiğini saf Python'da kurar; burada sayfanın chars
+# listesi dizilere (metin, x0, x1, top) çevrilir ve:
+#   - satırlar top değerlerinin sıralı farklarıyla (tolerans üstü fark = yeni satır)
+#   - kelimeler satır içindeki x boşluklarıyla
+#   - sütunlar kelime aralıklarının x ekseninde birleştirilmesiyle (boş x boşlukları = sütun sınırı)
+# vektörel olarak bulunur. Çıktı extract_tables ile aynı satır/hücre yapısıdır.
+#
+# Sadece başlıklı item tablosu kurulur; başlık bulunamazsa veya tablo yapısı belirsizse
+# (sarılmış hücreler, tek sütun) None döner ve çağıran pdfplumber'a düşer.
+
+import numpy as np
+
+from sku_scanner import ITEM_HEADER_KEYWORDS, is_valid_item_number
+
+ROW_TOLERANCE = 3.0   # Aynı satır sayılan karakterler arası en fazla top farkı (pt)
+WORD_GAP = 3.0        # pdfplumber x_tolerance ile aynı - bu boşluktan büyüğü yeni kelime
+COLUMN_GAP = 5.0      # Tüm satırlarda boş kalan bu genişlikte x aralığı sütun sınırıdır
+LOOKAHEAD_ROWS = 3    # Tablo bitti sanılan yerden sonra item satırı aranan satır sayısı
+
+
+def chars_to_arrays(chars):
+    """Dik karakterleri (metinler, boşluk maskesi, x0, x1, top) dizilerine çevir"""
+    kept = [char for char in chars if char.get('upright', True)]
+    texts = [char['text'] for char in kept]
+    spaces = np.fromiter((text.isspace() for text in texts), dtype=bool, count=len(kept))
+    x0 = np.fromiter((char['x0'] for char in kept), dtype=float, count=len(kept))
+    x1 = np.fromiter((char['x1'] for char in kept), dtype=float, count=len(kept))
+    top = np.fromiter((char['top'] for char in kept), dtype=float, count=len(kept))
+    return texts, spaces, x0, x1, top
+
+
+def group_words(texts, spaces, x0, x1, top):
+    """Karakterleri satır ve kelimelere ayır
+
+    Dönen değer satır listesidir; her satır (x0, x1, metin) kelime demetlerinin
+    x sırasına göre listesidir. Boşluk karakterleri extract_words'teki gibi kelime ayırır.
+    """
+    if not texts:
+        return []
+
+    # Satırlar: top'a göre sırala, ardışık fark toleransı aşınca yeni satır
+    order = np.argsort(top, kind='stable')
+    row_breaks = np.diff(top[order]) > ROW_TOLERANCE
+    row_ids = np.empty(len(order), dtype=np.int64)
+    row_ids[order] = np.concatenate(([0], np.cumsum(row_breaks)))
+
+    # Satır içinde x sırası; kelime sınırı = satır değişimi, boşluk karakteri veya x boşluğu
+    order = np.lexsort((x0, row_ids))
+    rows_sorted = row_ids[order]
+    spaces_sorted = spaces[order]
+    x0_sorted = x0[order]
+    x1_sorted = x1[order]
+    breaks = ((rows_sorted[1:] != rows_sorted[:-1])
+              | (x0_sorted[1:] - x1_sorted[:-1] > WORD_GAP)
+              | spaces_sorted[1:] | spaces_sorted[:-1])
+    word_starts = np.flatnonzero(np.concatenate(([True], breaks)))
+    word_ends = np.append(word_starts[1:], len(order))
+
+    # Kelime sınırları vektörel: başlangıç x0, kelime içindeki en büyük x1
+    word_x0 = x0_sorted[word_starts]
+    word_x1 = np.maximum.reduceat(x1_sorted, word_starts)
+    word_rows = rows_sorted[word_starts]
+    keep = ~spaces_sorted[word_starts]
+
+    lines = []
+    current_row = None
+    for start, end, wx0, wx1, row in zip(word_starts[keep], word_ends[keep], word_x0[keep],
+                                         word_x1[keep], word_rows[keep]):
+        if row != current_row:
+            lines.append([])
+            current_row = row
+        lines[-1].append((float(wx0), float(wx1), ''.join(texts[index] for index in order[start:end])))
+    return lines
+
+
+def find_columns(words):
+    """Kelime x aralıklarını birleştir, tüm satırlarda boş kalan boşluklardan sütunları çıkar
+
+    Dönen değer sütun x aralıklarıdır [[x0, x1], ...]; sınırlar boşlukların ortasıdır.
+    """
+    starts = np.array([word[0] for word in words])
+    ends = np.array([word[1] for word in words])
+    order = np.argsort(starts)
+    starts = starts[order]
+    ends = np.maximum.accumulate(ends[order])
+
+    # Bir önceki aralıkların en sağından COLUMN_GAP'ten uzak başlayan kelime yeni sütundur
+    column_breaks = np.flatnonzero(starts[1:] - ends[:-1] > COLUMN_GAP) + 1
+    group_starts = np.concatenate(([0], column_breaks))
+    group_x0 = starts[group_starts]
+    group_x1 = ends[np.append(column_breaks - 1, len(starts) - 1)]
+
+    edges = (group_x1[:-1] + group_x0[1:]) / 2
+    left = group_x0[0] - COLUMN_GAP / 2
+    right = group_x1[-1] + COLUMN_GAP / 2
+    bounds = np.concatenate(([left], edges, [right]))
+    return [[float(bounds[i]), float(bounds[i + 1])] for i in range(len(bounds) - 1)]
+
+
+def _assign_cells(line, columns):
+    """Satırdaki kelimeleri sütunlara dağıt (kelime merkezine göre)"""
+    edges = np.array([column[1] for column in columns[:-1]])
+    centers = np.array([(word[0] + word[1]) / 2 for word in line])
+    column_ids = np.searchsorted(edges, centers)
+    cells = [[] for _ in columns]
+    for column_id, word in zip(column_ids, line):
+        cells[column_id].append(word[2])
+    return [' '.join(parts) for parts in cells]
+
+
+def extract_item_table(chars):
+    """Sayfa karakterlerinden başlıklı item tablosunu kur - (satırlar, sütunlar) veya None"""
+    lines = group_words(*chars_to_arrays(chars))
+
+    header_index = None
+    for index, line in enumerate(lines):
+        line_text = ' '.join(word[2] for word in line).lower()
+        if any(keyword in line_text for keyword in ITEM_HEADER_KEYWORDS):
+            header_index = index
+            break
+    if header_index is None:
+        return None
+
+    # Item satırları: ilk kelimesi geçerli item number ve başlığın ilk sütunuyla hizalı
+    first_x0 = lines[header_index][0][0]
+    item_lines = []
+    index = header_index + 1
+    while index < len(lines):
+        line = lines[index]
+        if abs(line[0][0] - first_x0) <= COLUMN_GAP and is_valid_item_number(line[0][2]):
+            item_lines.append(line)
+            index += 1
+            continue
+        break
+
+    if not item_lines:
+        return None
+    # Kısa bir aradan sonra yine item satırı geliyorsa hücreler sarılmış - pdfplumber'a bırak
+    for line in lines[index + 1:index + 1 + LOOKAHEAD_ROWS]:
+        if abs(line[0][0] - first_x0) <= COLUMN_GAP and is_valid_item_number(line[0][2]):
+            return None
+
+    header = lines[header_index]
+    columns = find_columns([word for line in [header] + item_lines for word in line])
+    if len(columns) < 2:
+        return None
+
+    rows = [_assign_cells(line, columns) for line in [header] + item_lines]
+    # Her başlık hücresi dolu olmalı - aksi halde sütunlar başlıkla hizalı değil
+    if not all(rows[0]):
+        return None
+    return rows, columns
@@ -0,0 +1,87 @@
+# Line item içeremeyecek sayfaları (şartlar/koşullar, havale, ihracat kontrol metinleri)
+# pdfplumber çalışmadan önce eleyen ucuz sayfa sınıflandırıcı
+#
+# pdfplumber'ın chars listesini kurmak sayfa ayrıştırmanın en pahalı kısmıdır, bu yüzden
+# özellikler pdf_backends.iter_pdfium_pages (pypdfium2, C tabanlı) verisinden hesaplanır:
+#   - karakter yoğunluğu (boşluk olmayan karakter / sayfa alanı)
+#   - cetvel çizgileri (path nesneleri - tablo ızgarası)
+#   - rakam oranı (miktar/fiyat sütunları)
+#   - item başlık kelimeleri ve şartlar/koşullar kelimeleri
+#   - SKU biçimli kelimeler (Trek SKU aileleri)
+# SKU biçimli kelime veya yüksek rakam oranı olan sayfa skordan bağımsız her zaman ayrıştırılır:
+# başlık tekrarı ve çizgisi olmayan devam sayfaları ihracat kontrol dipnotu taşıyabilir.
+
+import os
+
+from sku_confidence import TREK_SKU_SHAPES
+from sku_scanner import ITEM_HEADER_KEYWORDS
+
+PAGE_CLASSIFIER = os.getenv('PAGE_CLASSIFIER', '1') != '0'
+# Atlama kuralları değiştiğinde artırılır - pdf_parser cache anahtarına girer, eski kararlar kullanılmaz
+CLASSIFIER_VERSION = 2
+
+MIN_DIGIT_RATIO = 0.15      # Line item sayfalarında rakamlar metnin belirgin bir kısmıdır
+MIN_RULING_LINES = 4        # Tablo ızgarası sayılacak en az path nesnesi
+DENSE_CHARS_PER_KPT2 = 6.0  # 1000 pt² başına bu kadar karakterden yoğun sayfa düz metindir
+BOILERPLATE_MIN_SHARE = 0.6  # Şartlar metni sayılması için rakamsız satırların en az payı
+
+# Şartlar/koşullar ve ihracat kontrol sayfalarında geçen kelimeler
+BOILERPLATE_KEYWORDS = ('terms and conditions', 'authorized', 'regulations', 'controlled', 'remittance')
+
+
+def page_features(text, path_count, width, height):
+    """Sayfa metni ve path sayısından sınıflandırma özelliklerini hesapla"""
+    chars = [char for char in text if not char.isspace()]
+    char_count = len(chars)
+    digits = sum(1 for char in chars if char.isdigit())
+    lower_text = text.lower()
+    area = max(width * height, 1.0)
+    lines = [line for line in text.splitlines() if line.strip()]
+    prose_lines = sum(1 for line in lines if not any(char.isdigit() for char in line))
+    tokens = (token.strip('.,;:()[]#') for token in text.upper().split())
+    sku_tokens = sum(1 for token in tokens if any(shape.match(token) for shape in TREK_SKU_SHAPES))
+
+    return {
+        'chars': char_count,
+        'density': char_count / area * 1000,
+        'digit_ratio': digits / char_count if char_count else 0.0,
+        'ruling_lines': path_count,
+        'header': any(keyword in lower_text for keyword in ITEM_HEADER_KEYWORDS),
+        'sku_tokens': sku_tokens,
+        # Dipnottaki tek bir ihracat kontrol cümlesi sayılmaz - sayfanın çoğu düz metin olmalı
+        'boilerplate': any(keyword in lower_text for keyword in BOILERPLATE_KEYWORDS) and
+                       bool(lines) and prose_lines / len(lines) >= BOILERPLATE_MIN_SHARE,
+    }
+
+
+def score_page(features):
+    """Özelliklerden line item skoru - 0 ve altı sayfa atlanır"""
+    if not features['chars']:
+        return 0
+    score = 0
+    if features['digit_ratio'] >= MIN_DIGIT_RATIO:
+        score += 2
+    if features['header']:
+        score += 1
+    if features['ruling_lines'] >= MIN_RULING_LINES:
+        score += 1
+    if features['density'] >= DENSE_CHARS_PER_KPT2:
+        score -= 1
+    if features['boilerplate']:
+        score -= 1
+    return score
+
+
+def classify_page(page_data):
+    """PDFium sayfa verisinden (line item içerebilir mi, özellikler)
+
+    Sayfa verisi okunamadıysa (None), SKU biçimli kelime içeriyorsa veya rakam oranı
+    yüksekse sayfa her zaman ayrıştırılır.
+    """
+    if page_data is None:
+        return True, None
+    features = page_features(page_data['text'], page_data['path_count'], page_data['width'], page_data['height'])
+    features['score'] = score_page(features)
+    if features['sku_tokens'] or features['digit_ratio'] >= MIN_DIGIT_RATIO:
+        return True, features
+    return features['score'] > 0, features
@@ -0,0 +1,102 @@
+# PDF metin backend'leri - extraction aşamaları sayfa metnini buradan alır
+# - pdfplumber: varsayılan, pdfminer tabanlı (saf Python)
+# - pypdfium2: pdfplumber ile birlikte kurulan PDFium (C) metin çıkarımı, çok daha hızlı
+#
+# Tablo algılaması (kırpılmış extract_words / tam tablo algılama) her iki backend'de de
+# pdfplumber ile yapılır; pypdfium2 sayfa metnini ve sayfa sınıflandırıcının
+# özelliklerini sağlar, metin katmanı tutan sayfalarda pdfplumber karakterleri hiç kurulmaz.
+
+import os
+
+import pdfplumber
+
+BACKENDS = ('pdfplumber', 'pypdfium2')
+PDF_BACKEND = os.getenv('PDF_BACKEND', 'pdfplumber')
+
+MAX_PATH_OBJECTS = 200  # Çizgi sayımı bu sayıda durur
+
+
+def get_backend():
+    """Geçerli backend adı - bilinmeyen değerde pdfplumber"""
+    if PDF_BACKEND in BACKENDS:
+        return PDF_BACKEND
+    print(f"Bilinmeyen PDF_BACKEND '{PDF_BACKEND}', pdfplumber kullanılıyor")
+    return 'pdfplumber'
+
+
+def normalize_pdfium_text(text):
+    """PDFium metnini pdfplumber extract_text biçimine yaklaştır (satır sonları, boşluklar)"""
+    return '\n'.join(line.rstrip() for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n'))
+
+
+def iter_pdfium_pages(file_path, start, end):
+    """[start, end) sayfaları için PDFium ile metin, path sayısı ve sayfa boyutu üret
+
+    Her sayfa için {'text', 'path_count', 'width', 'height'} döner. PDF açılamazsa
+    veya sayfa okunamazsa o sayfalar için None döner; çağıran pdfplumber'a düşer.
+    """
+    try:
+        import pypdfium2 as pdfium
+        import pypdfium2.raw as pdfium_c
+        document = pdfium.PdfDocument(file_path)
+    except Exception as e:
+        print(f"PDFium açılamadı, sayfalar pdfplumber ile okunacak: {e}")
+        for _ in range(start, end):
+            yield None
+        return
+
+    try:
+        for index in range(start, end):
+            try:
+                page = document[index]
+                textpage = page.get_textpage()
+                try:
+                    text = textpage.get_text_range()
+                    path_count = 0
+                    for _ in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_PATH,)):
+                        path_count += 1
+                        if path_count >= MAX_PATH_OBJECTS:
+                            break
+                    width, height = page.get_size()
+                finally:
+                    textpage.close()
+                    page.close()
+            except Exception as e:
+                print(f"Sayfa {index + 1} PDFium ile okunamadı: {e}")
+                yield None
+                continue
+
+            yield {
+                'text': normalize_pdfium_text(text),
+                'path_count': path_count,
+                'width': width,
+                'height': height,
+            }
+    finally:
+        document.close()
+
+
+def page_count(file_path):
+    """PDF'in sayfa sayısı - PDFium ile, açılamazsa pdfplumber ile"""
+    try:
+        import pypdfium2 as pdfium
+        document = pdfium.PdfDocument(file_path)
+        try:
+            return len(document)
+        finally:
+            document.close()
+    except Exception:
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+
+
+def first_page_text(file_path, backend=None):
+    """Sadece ilk sayfanın metnini seçili backend ile oku"""
+    backend = backend or get_backend()
+    if backend == 'pypdfium2':
+        page_data = next(iter_pdfium_pages(file_path, 0, 1), None)
+        if page_data is not None:
+            return page_data['text']
+
+    with pdfplumber.open(file_path) as pdf:
+        return pdf.pages[0].extract_text() or ''
@@ -0,0 +1,142 @@
+# Ayrıştırılmış PDF sayfaları için içerik-adresli disk cache
+# Anahtar: yüklenen dosyanın SHA-256 hash'i - aynı fatura tekrar yüklendiğinde pdfplumber hiç çalışmaz
+#
+# Dosya formatı (her doküman için tek dosya, mmap ile okunur):
+#   4 byte magic | uint32 sayfa sayısı | sayfa başına (uint64 offset, uint32 uzunluk) | sayfa JSON blob'ları
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', 'pdf_cache')
+PDF_CACHE_MAX_BYTES = int(os.getenv('PDF_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))  # 0 = kapalı
+
+_MAGIC = b'TPC1'
+_HEADER = struct.Struct('<4sI')
+_INDEX_ENTRY = struct.Struct('<QI')
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def is_enabled():
+    """Cache boyutu 0 ise cache tamamen devre dışı"""
+    return PDF_CACHE_MAX_BYTES > 0
+
+
+def file_sha256(file_path):
+    """Dosyanın SHA-256 hash'ini parça parça hesapla"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(cache_key):
+    return os.path.join(PDF_CACHE_DIR, f"{cache_key}.pages")
+
+
+def load_pages(cache_key):
+    """Cache'teki sayfaları döndür, yoksa None
+
+    Dosya mmap ile açılır; her sayfa sadece kendi blob'u okunarak çözülür.
+    """
+    if not is_enabled():
+        return None
+
+    path = _cache_path(cache_key)
+    try:
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, page_count = _HEADER.unpack_from(mapped, 0)
+                if magic != _MAGIC:
+                    return None
+
+                pages = []
+                for index in range(page_count):
+                    offset, length = _INDEX_ENTRY.unpack_from(mapped, _HEADER.size + index * _INDEX_ENTRY.size)
+                    pages.append(json.loads(mapped[offset:offset + length].decode('utf-8')))
+    except (OSError, ValueError, struct.error) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"PDF cache okuma hatası ({cache_key}): {e}")
+        return None
+
+    # LRU eviction için son kullanım zamanını güncelle
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return pages
+
+
+def store_pages(cache_key, pages):
+    """Sayfaları cache'e yaz ve boyut limitini koru"""
+    if not is_enabled():
+        return
+
+    blobs = [json.dumps(page, ensure_ascii=False, separators=(',', ':')).encode('utf-8') for page in pages]
+
+    offset = _HEADER.size + len(blobs) * _INDEX_ENTRY.size
+    index = []
+    for blob in blobs:
+        index.append(_INDEX_ENTRY.pack(offset, len(blob)))
+        offset += len(blob)
+
+    try:
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        # Önce geçici dosyaya yaz, sonra atomik olarak yerine koy (paralel worker'lar için)
+        fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, len(blobs)))
+            f.write(b''.join(index))
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp_path, _cache_path(cache_key))
+    except OSError as e:
+        print(f"PDF cache yazma hatası ({cache_key}): {e}")
+        return
+
+    evict()
+
+
+def evict(max_bytes=None):
+    """Toplam boyut limiti aşılırsa en uzun süredir kullanılmayan girdileri sil"""
+    if max_bytes is None:
+        max_bytes = PDF_CACHE_MAX_BYTES
+
+    try:
+        entries = []
+        for name in os.listdir(PDF_CACHE_DIR):
+            if not name.endswith('.pages'):
+                continue
+            path = os.path.join(PDF_CACHE_DIR, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    except OSError:
+        return
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def get_cache_stats():
+    """Disk cache istatistikleri"""
+    try:
+        sizes = [os.path.getsize(os.path.join(PDF_CACHE_DIR, name))
+                 for name in os.listdir(PDF_CACHE_DIR) if name.endswith('.pages')]
+    except OSError:
+        sizes = []
+    return {
+        'entries': len(sizes),
+        'bytes': sum(sizes),
+        'max_bytes': PDF_CACHE_MAX_BYTES
+    }
@@ -0,0 +1,496 @@
+# PDF ayrıştırma katmanı - her yükleme için PDF bir kez okunur
+# Sayfa metni, tablolar ve sayfa numaraları tek bir doküman sözlüğünde tutulur
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+
+import page_classifier
+import pdf_backends
+import pdf_cache
+import supplier_templates
+import table_layout
+
+# Sayfa-paralel ayrıştırma ayarları
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', os.cpu_count() or 1))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '8'))  # Küçük PDF'ler process içinde kalır
+
+# İlk sayfada bulunan tablo sütun düzenini sonraki sayfalarda tekrar kullan (0 = her sayfada tam algılama)
+PDF_LAYOUT_REUSE = os.getenv('PDF_LAYOUT_REUSE', '1') != '0'
+
+# Katmanlı extraction: önce sayfa metninden (extract_text) tablo kurulmaya çalışılır,
+# güven skoru eşiğin altındaysa kırpılmış extract_words, o da olmazsa tam tablo algılaması
+PDF_TEXT_FIRST = os.getenv('PDF_TEXT_FIRST', '1') != '0'
+PDF_TEXT_MIN_CONFIDENCE = float(os.getenv('PDF_TEXT_MIN_CONFIDENCE', '1.0'))
+
+# Düşük bellek modu: sayfalar tek process'te sırayla işlenir, disk cache için sayfa listesi tutulmaz
+PDF_LOW_MEMORY = os.getenv('PDF_LOW_MEMORY', '0') == '1'
+
+# Sayfa sözlüğünün formatı değiştiğinde artırılır - eski cache girdileri kullanılmaz
+# p5: p4 girdilerinde eski sınıflandırıcının yanlışlıkla atladığı line item sayfaları boş duruyordu
+PARSE_FORMAT = 'p5'
+
+_EXECUTOR = None
+_EXECUTOR_WORKERS = 0
+
+# Katman istatistikleri (bu process'te ayrıştırılan sayfalar)
+TIERS = ('text', 'words', 'tables')
+_TIER_STATS = {tier: {'attempts': 0, 'pages': 0, 'seconds': 0.0} for tier in TIERS}
+_TIER_STATS['escalations'] = 0
+_TIER_STATS['text_seconds'] = 0.0  # extract_text - her sayfada, katmandan bağımsız
+_TIER_STATS['skipped'] = {'pages': 0, 'seconds': 0.0, 'saved_seconds': 0.0}  # Sayfa sınıflandırıcı
+
+
+def parse_pdf(file_path, workers=None, file_hash=None):
+    """PDF'i bir kez aç, her sayfanın metnini ve tablolarını çıkar
+
+    Dönen doküman sözlüğü tüm extraction aşamaları tarafından paylaşılır:
+    {
+        'file_path': 'uploads/...pdf',
+        'pages': [{'page': 1, 'text': '...', 'tables': [[...], ...]}, ...]
+    }
+
+    workers > 1 ve sayfa sayısı PDF_PARALLEL_MIN_PAGES üzerindeyse sayfalar
+    process pool'a bölünür; sonuç seri ayrıştırma ile birebir aynıdır.
+    """
+    return {
+        'file_path': file_path,
+        'pages': list(iter_pdf_pages(file_path, workers=workers, file_hash=file_hash))
+    }
+
+
+def iter_pdf_pages(file_path, workers=None, file_hash=None):
+    """Sayfaları ayrıştırıldıkça sırayla üret (streaming)
+
+    Seri modda her sayfa işlenir işlenmez döner; paralel modda sayfa aralıkları
+    tamamlandıkça sayfa sırası korunarak döner. Aynı içerik daha önce
+    ayrıştırıldıysa sayfalar disk cache'ten gelir ve pdfplumber çalışmaz.
+
+    PDF_LOW_MEMORY açıkken worker process'leri açılmaz ve cache'e yazmak için
+    sayfalar biriktirilmez; bellekte aynı anda sadece işlenen sayfa bulunur.
+    """
+    if PDF_LOW_MEMORY:
+        workers = 1
+
+    if not pdf_cache.is_enabled():
+        yield from _iter_parsed_pages(file_path, workers)
+        return
+
+    if file_hash is None:
+        file_hash = pdf_cache.file_sha256(file_path)
+    cache_key = _cache_key(file_hash)
+
+    cached_pages = pdf_cache.load_pages(cache_key)
+    if cached_pages is not None:
+        print(f"PDF cache hit: {file_hash[:12]}")
+        yield from cached_pages
+        return
+
+    if PDF_LOW_MEMORY:
+        yield from _iter_parsed_pages(file_path, workers)
+        return
+
+    pages = []
+    for page_info in _iter_parsed_pages(file_path, workers):
+        pages.append(page_info)
+        yield page_info
+
+    # Sadece doküman tamamen ayrıştırıldıysa cache'e yaz
+    pdf_cache.store_pages(cache_key, pages)
+
+
+def _cache_key(file_hash):
+    """Disk cache anahtarı - backend'ler ve tablo motorları sayfaları farklı kurabilir, girdiler ayrı tutulur
+
+    Sınıflandırıcının atladığı sayfalar boş kaydedilir; sınıflandırıcı kapatılınca veya kuralları
+    değişince bu sayfaların yeniden ayrıştırılması için ayarı ve sürümü de anahtara girer.
+    """
+    classifier = f"c{page_classifier.CLASSIFIER_VERSION}" if page_classifier.PAGE_CLASSIFIER else 'c0'
+    return f"{file_hash}-{PARSE_FORMAT}-{pdf_backends.get_backend()}-{table_layout.get_table_engine()}-{classifier}"
+
+
+def load_cached_pages(file_path, file_hash=None):
+    """Doküman daha önce ayrıştırıldıysa cache'teki sayfaları döndür, yoksa None"""
+    if not pdf_cache.is_enabled():
+        return None
+    if file_hash is None:
+        file_hash = pdf_cache.file_sha256(file_path)
+    cached_pages = pdf_cache.load_pages(_cache_key(file_hash))
+    if cached_pages is not None:
+        print(f"PDF cache hit: {file_hash[:12]}")
+    return cached_pages
+
+
+def _iter_parsed_pages(file_path, workers):
+    """pdfplumber ile sayfaları seri veya paralel ayrıştır"""
+    if workers is None:
+        workers = PDF_WORKERS
+
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+        if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+            yield from _parse_pages(pdf, file_path, 0, page_count)
+            return
+
+    yield from _iter_pages_parallel(file_path, page_count, workers)
+
+
+def _parse_pages(pdf, file_path, start, end):
+    """[start, end) sayfalarını sırayla ayrıştır, tablo sütun düzenini sayfalar arasında taşı
+
+    PDF'in parmak izi için kayıtlı tedarikçi şablonu varsa düzen şablondan gelir;
+    bu durumda tam tablo algılaması ilk sayfada da çalışmaz. Sayfa sınıflandırıcı
+    line item içeremeyecek sayfaları pdfplumber'a hiç vermez (ilk sayfa hariç -
+    fatura numarası oradan okunur); atlanan sayfalar boş metin ve tabloyla döner.
+    """
+    # Parmak izindeki başlık satırı için ilk sayfa metni - PDFium ile ucuz, paralel parçalarda da aynı
+    fingerprint = supplier_templates.pdf_fingerprint(pdf, pdf_backends.first_page_text(file_path, 'pypdfium2'))
+    layout = supplier_templates.template_layout(supplier_templates.get_template(fingerprint)) if PDF_LAYOUT_REUSE else None
+    tier_counts = dict.fromkeys(TIERS, 0)
+    escalations = 0
+
+    # PDFium verisi hem sınıflandırıcıya hem de pypdfium2 backend'inde sayfa metnine gider
+    pdfium_text = pdf_backends.get_backend() == 'pypdfium2'
+    if page_classifier.PAGE_CLASSIFIER or pdfium_text:
+        pdfium_pages = pdf_backends.iter_pdfium_pages(file_path, start, end)
+    else:
+        pdfium_pages = (None for _ in range(start, end))
+    skipped = []
+    skipped_chars = 0
+    classify_seconds = 0.0
+    parsed_chars = 0
+    parse_seconds = 0.0
+
+    for index in range(start, end):
+        started = time.perf_counter()
+        page_data = next(pdfium_pages)
+        if page_classifier.PAGE_CLASSIFIER:
+            keep, features = page_classifier.classify_page(page_data)
+        else:
+            keep, features = True, None
+        if pdfium_text:
+            _TIER_STATS['text_seconds'] += time.perf_counter() - started
+        else:
+            classify_seconds += time.perf_counter() - started
+
+        if not keep and index > 0:
+            skipped.append(index + 1)
+            skipped_chars += features['chars']
+            yield {'page': index + 1, 'text': '', 'tables': [], 'skipped': True}
+            continue
+
+        started = time.perf_counter()
+        page = pdf.pages[index]
+        text = page_data['text'] if pdfium_text and page_data is not None else None
+        page_info, layout, tier, escalated = _parse_page(page, index + 1, layout, text)
+        # pdfplumber karakter/layout cache'leri doküman kapanana kadar tutulur - sayfa bitince bırak
+        page.close()
+        if features:
+            parse_seconds += time.perf_counter() - started
+            parsed_chars += features['chars']
+        if page_info.get('layout') is not None:
+            page_info['layout']['fingerprint'] = fingerprint
+        tier_counts[tier] += 1
+        escalations += escalated
+        yield page_info
+
+    if skipped:
+        # Kazanç tahmini: ayrıştırılan sayfalardaki karakter başına süre × atlanan karakter
+        saved = parse_seconds / parsed_chars * skipped_chars if parsed_chars else 0.0
+        _TIER_STATS['skipped']['pages'] += len(skipped)
+        _TIER_STATS['skipped']['saved_seconds'] += saved
+        print(f"Sayfa sınıflandırıcı: {len(skipped)}/{end - start} sayfa atlandı {skipped} - "
+              f"sınıflandırma {classify_seconds:.2f}s, tahmini kazanç {saved:.2f}s")
+    _TIER_STATS['skipped']['seconds'] += classify_seconds
+
+    if tier_counts['text'] or tier_counts['words']:
+        print(f"Sayfa katmanları: metin {tier_counts['text']}, kelime {tier_counts['words']}, "
+              f"tablo {tier_counts['tables']} (yükseltilen {escalations}/{end - start})")
+
+
+def _record_tier(tier, started, used):
+    """Katman denemesinin süresini ve sonucunu istatistiklere yaz"""
+    stats = _TIER_STATS[tier]
+    stats['attempts'] += 1
+    stats['seconds'] += time.perf_counter() - started
+    if used:
+        stats['pages'] += 1
+
+
+def _parse_page(page, page_num, layout=None, text=None):
+    """Tek bir pdfplumber sayfasından metin ve tabloları al
+
+    Önceki sayfadan gelen sütun düzeni varsa katmanlar en ucuzdan başlar:
+    1. text: item tablosu extract_text satırlarından kurulur (güven skoru eşiği)
+    2. words: tablo kırpılmış extract_words ile kurulur
+    3. tables: tam tablo algılaması yapılır ve düzen yenilenir
+    Sayfa metni backend'den (pypdfium2) verildiyse pdfplumber extract_text çalışmaz.
+    Dönen değer (sayfa sözlüğü, güncel düzen, kullanılan katman, yükseltildi mi).
+    """
+    if text is None:
+        started = time.perf_counter()
+        text = page.extract_text()
+        _TIER_STATS['text_seconds'] += time.perf_counter() - started
+
+    tables = None
+    page_layout = None
+    tier = 'tables'
+    escalated = False
+    if PDF_LAYOUT_REUSE and layout is not None:
+        if PDF_TEXT_FIRST:
+            started = time.perf_counter()
+            table, confidence = table_layout.extract_table_from_text(text, layout)
+            used = table is not None and confidence >= PDF_TEXT_MIN_CONFIDENCE
+            _record_tier('text', started, used)
+            if used:
+                tables = [table]
+                tier = 'text'
+
+        if tables is None:
+            started = time.perf_counter()
+            table = table_layout.extract_table_with_layout(page, layout)
+            _record_tier('words', started, table is not None)
+            if table is not None:
+                tables = [table]
+                tier = 'words'
+
+        if tables is not None:
+            page_layout = dict(layout, table=0, header_row=0)
+        escalated = tier != 'text' and PDF_TEXT_FIRST
+
+    if tables is None:
+        started = time.perf_counter()
+        if PDF_LAYOUT_REUSE:
+            tables, page_layout = table_layout.detect_layout(page)
+            layout = page_layout or layout
+        else:
+            tables = [table for table in page.extract_tables() if table]
+        _record_tier('tables', started, True)
+
+    page_info = {
+        'page': page_num,
+        'text': text or '',
+        'tables': tables
+    }
+    if page_layout is not None:
+        # Sayfadaki item tablosunun sütunları - extraction aşamaları sezgisel aramayı atlar
+        page_info['layout'] = {
+            'table': page_layout['table'],
+            'header_row': page_layout['header_row'],
+            'columns': [list(column) for column in page_layout['columns']],
+            'item_col': page_layout['item_col'],
+            'description_col': page_layout['description_col'],
+            'header': page_layout['header'],
+        }
+    if escalated:
+        _TIER_STATS['escalations'] += 1
+    return page_info, layout, tier, escalated
+
+
+def get_tier_stats():
+    """Katman başına deneme/kullanım/süre ve yükseltme oranı (bu process için)"""
+    stats = {tier: dict(_TIER_STATS[tier]) for tier in TIERS}
+    text_attempts = _TIER_STATS['text']['attempts']
+    stats['escalations'] = _TIER_STATS['escalations']
+    stats['text_seconds'] = _TIER_STATS['text_seconds']
+    stats['skipped'] = dict(_TIER_STATS['skipped'])
+    stats['escalation_rate'] = _TIER_STATS['escalations'] / text_attempts if text_attempts else 0.0
+    return stats
+
+
+def merge_tier_stats(stats):
+    """Başka bir process'te (watchdog child'ı, pool worker'ı) toplanan katman istatistiklerini ekle"""
+    for tier in TIERS:
+        for key in ('attempts', 'pages', 'seconds'):
+            _TIER_STATS[tier][key] += stats[tier][key]
+    _TIER_STATS['escalations'] += stats['escalations']
+    _TIER_STATS['text_seconds'] += stats['text_seconds']
+    for key in ('pages', 'seconds', 'saved_seconds'):
+        _TIER_STATS['skipped'][key] += stats['skipped'][key]
+
+
+def reset_tier_stats():
+    """Katman istatistiklerini sıfırla (pool worker'ında her aralıktan önce)"""
+    for tier in TIERS:
+        _TIER_STATS[tier].update(attempts=0, pages=0, seconds=0.0)
+    _TIER_STATS['escalations'] = 0
+    _TIER_STATS['text_seconds'] = 0.0
+    _TIER_STATS['skipped'].update(pages=0, seconds=0.0, saved_seconds=0.0)
+
+
+def _parse_page_range(file_path, start, end):
+    """PDF'i kendisi açar ve [start, end) sayfalarını ayrıştırır"""
+    with pdfplumber.open(file_path) as pdf:
+        return list(_parse_pages(pdf, file_path, start, end))
+
+
+def _parse_page_range_worker(file_path, start, end):
+    """Pool worker'ı: aralığı ayrıştır, (sayfalar, bu aralığın katman istatistikleri) döndür
+
+    Worker process'ler işler arasında tekrar kullanılır - sayaçlar her aralıktan önce
+    sıfırlanır, ana process merge_tier_stats ile kendi sayaçlarına ekler.
+    """
+    reset_tier_stats()
+    pages = _parse_page_range(file_path, start, end)
+    return pages, get_tier_stats()
+
+
+def _split_page_ranges(page_count, workers):
+    """Sayfaları worker sayısı kadar ardışık aralığa böl"""
+    chunk_count = min(workers, page_count)
+    base, extra = divmod(page_count, chunk_count)
+
+    ranges = []
+    start = 0
+    for chunk in range(chunk_count):
+        end = start + base + (1 if chunk < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _get_executor(workers):
+    """Process pool'u ilk ihtiyaçta oluştur ve sonraki yüklemelerde tekrar kullan"""
+    global _EXECUTOR, _EXECUTOR_WORKERS
+
+    if _EXECUTOR is None or _EXECUTOR_WORKERS != workers:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=False)
+        _EXECUTOR = ProcessPoolExecutor(max_workers=workers)
+        _EXECUTOR_WORKERS = workers
+    return _EXECUTOR
+
+
+def shutdown_executor():
+    """Process pool'u kapat (benchmark ve test process'lerinden çıkarken)"""
+    global _EXECUTOR, _EXECUTOR_WORKERS
+
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=True)
+        _EXECUTOR = None
+        _EXECUTOR_WORKERS = 0
+
+
+def _iter_pages_parallel(file_path, page_count, workers):
+    """Sayfa aralıklarını paralel ayrıştır ve sayfa sırasıyla üret"""
+    global _EXECUTOR
+
+    ranges = _split_page_ranges(page_count, workers)
+    starts = [start for start, _ in ranges]
+    ends = [end for _, end in ranges]
+    next_index = 0
+
+    try:
+        executor = _get_executor(workers)
+        # map sonuçları gönderim sırasıyla döndürür - sayfa sırası korunur
+        for chunk, tier_stats in executor.map(_parse_page_range_worker, [file_path] * len(ranges), starts, ends):
+            merge_tier_stats(tier_stats)
+            for page_info in chunk:
+                next_index += 1
+                yield page_info
+    except BrokenProcessPool as e:
+        # Worker çöktüyse pool'u sıfırla, kalan sayfaları seri ayrıştır
+        print(f"PDF worker hatası, seri ayrıştırmaya geçiliyor: {e}")
+        _EXECUTOR = None
+        yield from _parse_page_range(file_path, next_index, page_count)
+
+
+def iter_page_ranges(file_path, ranges, workers=None, timeout=None, page_timeout=None, job=None):
+    """Verilen [start, end) aralıklarını process pool'da aynı anda ayrıştır
+
+    Aralıklar tamamlandıkça (aralık indeksi, sayfalar) üretilir - sıra tamamlanma
+    sırasıdır. Çok faturalı PDF'lerde her alt fatura ayrı bir aralıktır; disk cache
+    kullanılmaz. Tek worker veya tek aralıkta process içinde sırayla ayrıştırılır.
+
+    timeout (saniye) verilirse aralıklar her zaman pool'da ayrıştırılır; süre dolunca
+    worker process'leri öldürülür ve TimeoutError yükseltilir - o ana kadar
+    tamamlanan aralıklar zaten üretilmiştir. page_timeout (saniye, sayfa başına) iki
+    aralığın tamamlanması arasındaki en uzun süreyi en uzun aralığın sayfa sayısıyla
+    sınırlar. job sözlüğü verilirse aşılan bütçe yazılır: {'reason': 'page'/'document'}.
+    """
+    global _EXECUTOR
+
+    if workers is None:
+        workers = PDF_WORKERS
+    if PDF_LOW_MEMORY:
+        workers = 1
+
+    if timeout is None and page_timeout is None and (workers <= 1 or len(ranges) <= 1):
+        for index, (start, end) in enumerate(ranges):
+            yield index, _parse_page_range(file_path, start, end)
+        return
+
+    done = set()
+    try:
+        executor = _get_executor(max(workers, 1))
+        futures = {executor.submit(_parse_page_range_worker, file_path, start, end): index
+                   for index, (start, end) in enumerate(ranges)}
+        # Aralıklar paralel ayrıştırılır - iki tamamlanma arası en fazla en uzun aralık kadar sürer
+        range_budget = page_timeout * max(end - start for start, end in ranges) if page_timeout else None
+        started = last_done = time.monotonic()
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            budgets = {}
+            if timeout is not None:
+                budgets['document'] = timeout - (now - started)
+            if range_budget is not None:
+                budgets['page'] = range_budget - (now - last_done)
+            reason = min(budgets, key=budgets.get) if budgets else None
+            finished, pending = wait(pending, timeout=max(budgets[reason], 0) if reason else None,
+                                     return_when=FIRST_COMPLETED)
+            if not finished:
+                if job is not None:
+                    job['reason'] = reason
+                raise FuturesTimeoutError()
+            for future in finished:
+                index = futures[future]
+                pages, tier_stats = future.result()
+                merge_tier_stats(tier_stats)
+                done.add(index)
+                yield index, pages
+            last_done = time.monotonic()
+    except FuturesTimeoutError:
+        print(f"PDF ayrıştırma süresi doldu: {len(done)}/{len(ranges)} aralık tamamlandı")
+        kill_executor()
+        raise TimeoutError(f"{len(ranges) - len(done)} sayfa aralığı süre sınırında tamamlanamadı")
+    except BrokenProcessPool as e:
+        # Worker çöktüyse pool'u sıfırla, tamamlanmayan aralıkları seri ayrıştır
+        print(f"PDF worker hatası, seri ayrıştırmaya geçiliyor: {e}")
+        _EXECUTOR = None
+        for index, (start, end) in enumerate(ranges):
+            if index not in done:
+                yield index, _parse_page_range(file_path, start, end)
+
+
+def kill_executor():
+    """Process pool'daki worker'ları öldür (süresi dolan ayrıştırma) - pool sonraki işte yeniden kurulur"""
+    global _EXECUTOR, _EXECUTOR_WORKERS
+
+    if _EXECUTOR is None:
+        return
+    # ProcessPoolExecutor çalışan işi iptal edemez - worker process'leri doğrudan sonlandırılır
+    processes = list((getattr(_EXECUTOR, '_processes', None) or {}).values())
+    for process in processes:
+        process.kill()
+    _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.join(timeout=1)
+    _EXECUTOR = None
+    _EXECUTOR_WORKERS = 0
+
+
+def iter_document_pages(file_path, document=None):
+    """Hazır doküman varsa sayfalarını, yoksa PDF'i akış halinde ayrıştırarak sayfaları üret"""
+    if document is not None:
+        return iter(document['pages'])
+    return iter_pdf_pages(file_path)
+
+
+def read_first_page_text(file_path):
+    """Doküman ayrıştırılmadan sadece ilk sayfa metnini seçili backend ile oku"""
+    return pdf_backends.first_page_text(file_path)
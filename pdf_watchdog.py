@@ -0,0 +1,291 @@
+# PDF ayrıştırma watchdog'u - bozuk veya çok büyük vektör PDF'ler pdfplumber'ı dakikalarca
+# extract_tables içinde tutabilir; bu da gunicorn sync worker'ını timeout'a kadar kilitler.
+#
+# Ayrıştırma ayrı bir child process'te çalışır, sayfalar kuyruk üzerinden gelir:
+#   - sayfa bütçesi: iki sayfa arasındaki en uzun süre (paralel modda parça boyuyla çarpılır)
+#   - doküman bütçesi: toplam süre
+#   - CPU bütçesi: child process'e RLIMIT_CPU olarak verilir
+# Bütçe aşılınca child process grubu (pool worker'ları dahil) öldürülür ve o ana kadar
+# gelen sayfalar kısmi sonuç olarak kalır. Olaylar get_watchdog_stats ile okunur.
+# Bütçeler gunicorn worker timeout'undan (Procfile: --timeout 180) kısa olmalıdır; aksi halde
+# worker watchdog'dan önce öldürülür ve kısmi sonuç hiç dönmez.
+# Çok faturalı PDF tespiti (invoice_splitter'ın PDFium ön taraması) da aynı bütçelerle child
+# process'te çalışır; ön tarama ve ayrıştırma aynı doküman bütçesini (deadline) paylaşır.
+
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+
+import invoice_splitter
+import pdf_backends
+import pdf_parser
+
+PDF_WATCHDOG = os.getenv('PDF_WATCHDOG', '1') != '0'
+PDF_PAGE_TIMEOUT = float(os.getenv('PDF_PAGE_TIMEOUT', '30'))       # Saniye, sayfa başına
+PDF_DOC_TIMEOUT = float(os.getenv('PDF_DOC_TIMEOUT', '120'))        # Saniye, doküman başına
+PDF_DOC_CPU_SECONDS = int(os.getenv('PDF_DOC_CPU_SECONDS', '120'))  # Child process CPU sınırı (0 = yok)
+
+POLL_SECONDS = 0.5   # Child process'in canlılığı bu aralıkla kontrol edilir
+MAX_EVENTS = 50      # Saklanan son watchdog olayı sayısı
+
+_LOCK = threading.Lock()
+_STATS = {
+    'jobs': 0,
+    'completed': 0,
+    'killed': 0,
+    'page_timeouts': 0,
+    'document_timeouts': 0,
+    'cpu_limits': 0,
+    'crashes': 0,
+    'errors': 0,
+    'partial_pages': 0,
+}
+_EVENTS = deque(maxlen=MAX_EVENTS)
+
+
+def _context():
+    """Child process başlatma yöntemi - çözümleme thread'leri çalışırken fork güvenli değil"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def document_deadline():
+    """Şimdi başlayan dokümanın bütçe sonu (time.monotonic) - ön tarama ve ayrıştırma paylaşır"""
+    return time.monotonic() + PDF_DOC_TIMEOUT
+
+
+def _limit_child(cpu_seconds):
+    """Child process'i kendi process grubuna al ve CPU sınırını uygula"""
+    if hasattr(os, 'setpgrp'):
+        # Kendi process grubu - watchdog pool worker'larıyla birlikte öldürebilsin
+        os.setpgrp()
+    if cpu_seconds > 0:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+        except (ImportError, ValueError, OSError):
+            pass
+
+
+def _child_main(file_path, workers, file_hash, pages_queue, cpu_seconds):
+    """Child process: sayfaları ayrıştır ve kuyruğa yaz, sonunda katman istatistiklerini gönder"""
+    _limit_child(cpu_seconds)
+    try:
+        for page_info in pdf_parser.iter_pdf_pages(file_path, workers=workers, file_hash=file_hash):
+            pages_queue.put(('page', page_info))
+        pages_queue.put(('done', pdf_parser.get_tier_stats()))
+    except Exception as e:
+        pages_queue.put(('error', str(e)))
+    finally:
+        pdf_parser.shutdown_executor()
+
+
+def _segments_child_main(file_path, page_count, pages_queue, cpu_seconds):
+    """Child process: sayfaların PDFium metnini kuyruğa yaz (fatura sınırı ön taraması)"""
+    _limit_child(cpu_seconds)
+    try:
+        for text in invoice_splitter.iter_page_texts(file_path, page_count):
+            pages_queue.put(('page', text))
+        pages_queue.put(('done', None))
+    except Exception as e:
+        pages_queue.put(('error', str(e)))
+
+
+def _pages_per_message(file_path, workers):
+    """Paralel modda sayfalar parça parça gelir - sayfa bütçesi parça boyuyla çarpılır"""
+    if workers is None:
+        workers = pdf_parser.PDF_WORKERS
+    if workers <= 1 or pdf_parser.PDF_LOW_MEMORY:
+        return 1
+    page_count = pdf_backends.page_count(file_path)
+    if page_count < pdf_parser.PDF_PARALLEL_MIN_PAGES:
+        return 1
+    return -(-page_count // min(workers, page_count))
+
+
+def _stop(process):
+    """Child process'i (ve process grubunu) temizce sonlandır"""
+    if process.is_alive():
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError, PermissionError):
+            process.kill()
+    process.join(timeout=5)
+
+
+def _record(reason, file_path, pages, elapsed):
+    """Watchdog olayını istatistiklere yaz"""
+    with _LOCK:
+        key = {
+            'page': 'page_timeouts',
+            'document': 'document_timeouts',
+            'cpu': 'cpu_limits',
+            'crash': 'crashes',
+            'error': 'errors',
+        }[reason]
+        _STATS[key] += 1
+        if reason in ('page', 'document'):
+            _STATS['killed'] += 1
+        _STATS['partial_pages'] += pages
+        _EVENTS.append({
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'file': os.path.basename(file_path),
+            'reason': reason,
+            'pages': pages,
+            'seconds': round(elapsed, 2),
+        })
+
+
+def record_timeout(file_path, pages, elapsed, reason='document'):
+    """Watchdog dışında (sayfa aralığı pool'u) süre aşımıyla durdurulan işi kaydet - reason: 'page' veya 'document'"""
+    with _LOCK:
+        _STATS['jobs'] += 1
+    _record(reason, file_path, pages, elapsed)
+
+
+def _iter_child(target, args, file_path, page_budget, deadline, outcome):
+    """Child process'i bütçeyle çalıştır ve ('page', ...) mesajlarının yükünü üret
+
+    target(*args, kuyruk, cpu_seconds) child'da çalışır. Bitince outcome sözlüğüne
+    'reason' (None = tamamlandı, yoksa 'page'/'document'/'cpu'/'crash'/'error') ve
+    'done' mesajının yükü ('result') yazılır. Üretici erken kapatılırsa child öldürülür.
+    """
+    with _LOCK:
+        _STATS['jobs'] += 1
+
+    ctx = _context()
+    pages_queue = ctx.Queue()
+    process = ctx.Process(target=target, args=args + (pages_queue, PDF_DOC_CPU_SECONDS))
+    started = time.monotonic()
+    process.start()
+
+    reason = None
+    pages = 0
+    last_page = started
+    try:
+        while True:
+            now = time.monotonic()
+            document_left = deadline - now
+            page_left = page_budget - (now - last_page)
+            if document_left <= 0:
+                reason = 'document'
+                break
+            if page_left <= 0:
+                reason = 'page'
+                break
+
+            try:
+                message = pages_queue.get(timeout=min(document_left, page_left, POLL_SECONDS))
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                # Child öldü - kuyrukta kalan son mesajları al
+                try:
+                    message = pages_queue.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    cpu_signal = getattr(signal, 'SIGXCPU', None)
+                    reason = 'cpu' if cpu_signal and process.exitcode == -cpu_signal else 'crash'
+                    break
+
+            kind = message[0]
+            if kind == 'page':
+                pages += 1
+                yield message[1]
+                last_page = time.monotonic()
+            elif kind == 'done':
+                outcome['result'] = message[1]
+                break
+            else:
+                print(f"PDF ayrıştırma hatası (watchdog): {message[1]}")
+                reason = 'error'
+                break
+    finally:
+        _stop(process)
+        pages_queue.close()
+
+    elapsed = time.monotonic() - started
+    outcome['reason'] = reason
+    if reason is None:
+        with _LOCK:
+            _STATS['completed'] += 1
+        return
+
+    _record(reason, file_path, pages, elapsed)
+    print(f"⚠️ PDF watchdog: {os.path.basename(file_path)} durduruldu ({reason}), "
+          f"{pages} sayfa ile devam ediliyor ({elapsed:.1f}s)")
+
+
+def iter_supervised_pages(file_path, workers=None, file_hash=None, job=None, deadline=None):
+    """iter_pdf_pages gibi sayfaları üret, ama ayrıştırmayı child process'te bütçeyle çalıştır
+
+    job sözlüğü verilirse sonuç yazılır: {'pages': n, 'truncated': bool, 'reason': ...}.
+    deadline (time.monotonic) verilirse doküman bütçesi oraya kadardır - ön taramayla paylaşılır.
+    Bütçe aşılırsa üretim kesilir; o ana kadar üretilen sayfalar geçerlidir.
+    Watchdog kapalıysa veya doküman disk cache'teyse child process açılmaz.
+    """
+    if job is None:
+        job = {}
+    job.update(pages=0, truncated=False, reason=None)
+
+    if not PDF_WATCHDOG:
+        for page_info in pdf_parser.iter_pdf_pages(file_path, workers=workers, file_hash=file_hash):
+            job['pages'] += 1
+            yield page_info
+        return
+
+    cached_pages = pdf_parser.load_cached_pages(file_path, file_hash)
+    if cached_pages is not None:
+        job['pages'] = len(cached_pages)
+        yield from cached_pages
+        return
+
+    outcome = {}
+    page_budget = PDF_PAGE_TIMEOUT * _pages_per_message(file_path, workers)
+    for page_info in _iter_child(_child_main, (file_path, workers, file_hash), file_path, page_budget,
+                                 deadline or document_deadline(), outcome):
+        job['pages'] += 1
+        yield page_info
+
+    if outcome['reason'] is None:
+        pdf_parser.merge_tier_stats(outcome['result'])
+        return
+    job['truncated'] = True
+    job['reason'] = outcome['reason']
+
+
+def detect_invoice_segments(file_path, deadline=None):
+    """invoice_splitter.detect_invoice_segments'in bütçeli hali - PDFium metni child process'te okunur
+
+    Sayfa ve doküman bütçesi ayrıştırmayla aynıdır; aşılırsa (veya hata olursa) PDF tek
+    fatura sayılır. Watchdog kapalıysa process içinde çalışır.
+    """
+    page_count = pdf_backends.page_count(file_path)
+    if not PDF_WATCHDOG:
+        return invoice_splitter.detect_invoice_segments(file_path, page_count)
+
+    outcome = {}
+    texts = _iter_child(_segments_child_main, (file_path, page_count), file_path, PDF_PAGE_TIMEOUT,
+                        deadline or document_deadline(), outcome)
+    segments = invoice_splitter.detect_invoice_segments(file_path, page_count, texts=texts)
+    texts.close()
+    if outcome.get('reason'):
+        return [{'invoice_number': None, 'start': 0, 'end': page_count}]
+    return segments
+
+
+def get_watchdog_stats():
+    """Watchdog sayaçları ve son olaylar"""
+    with _LOCK:
+        stats = dict(_STATS)
+        stats['events'] = list(_EVENTS)
+    stats['enabled'] = PDF_WATCHDOG
+    stats['budgets'] = {
+        'page_seconds': PDF_PAGE_TIMEOUT,
+        'document_seconds': PDF_DOC_TIMEOUT,
+        'cpu_seconds': PDF_DOC_CPU_SECONDS,
+    }
+    return stats
@@ -0,0 +1,247 @@
+# Ürün aramaları için kalıcı, process'ler arası paylaşılan cache (SQLite, WAL modu)
+# _WEB_CACHE her gunicorn worker'ında ayrı tutulur ve her deploy/restart'ta kaybolur; burada
+# OpenAI ve trekbikes.com sonuçları tek dosyada saklanır, tüm worker'lar ve hem
+# trek_sku_database hem trek_sku_database_fixed aynı kayıtları okur.
+#
+# Tablo: products(key, value JSON, source, created, expires)
+#   source: sonucu üreten katman ('openai', 'web', 'pattern', 'fallback')
+#   expires: kayıt bu zamandan sonra okunmaz; compact() süresi dolanları siler
+#   (tazelik - stale-while-revalidate - created üzerinden çağıran modülde değerlendirilir)
+# Tablo: leases(key, owner, expires) - worker'lar arası single-flight: anahtarı çözen worker
+#   kaydı tutar, diğerleri sonucun products'a yazılmasını bekler (single_flight modülü)
+# WAL modunda okuyucular yazıcıyı beklemez; bağlantılar thread başınadır.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+PRODUCT_CACHE_PATH = os.getenv('PRODUCT_CACHE_PATH', 'product_cache.sqlite3')   # Boş = kapalı
+PRODUCT_CACHE_TTL = int(os.getenv('PRODUCT_CACHE_TTL', str(7 * 24 * 3600)))     # Saniye
+COMPACT_INTERVAL = int(os.getenv('PRODUCT_CACHE_COMPACT_INTERVAL', '3600'))     # Saniye
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    source TEXT NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_expires ON products (expires);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+_LOCAL = threading.local()
+_LOCK = threading.Lock()
+_STATS = {'hits': 0, 'misses': 0, 'expired': 0, 'writes': 0, 'errors': 0, 'compactions': 0, 'compacted_rows': 0}
+_LAST_COMPACT = [time.time()]
+
+
+def is_enabled():
+    """Yol boşsa kalıcı cache tamamen devre dışı"""
+    return bool(PRODUCT_CACHE_PATH)
+
+
+def _count(name, amount=1):
+    with _LOCK:
+        _STATS[name] += amount
+
+
+def _connection():
+    """Thread'e ait SQLite bağlantısı (ilk kullanımda açılır, şema ve WAL ayarlanır)"""
+    connection = getattr(_LOCAL, 'connection', None)
+    if connection is not None and _LOCAL.path == PRODUCT_CACHE_PATH:
+        return connection
+
+    directory = os.path.dirname(PRODUCT_CACHE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(PRODUCT_CACHE_PATH, timeout=5, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(_SCHEMA)
+    _LOCAL.connection = connection
+    _LOCAL.path = PRODUCT_CACHE_PATH
+    return connection
+
+
+def get(key):
+    """Süresi dolmamış kaydı (value, source) olarak döndür, yoksa None"""
+    entry = get_entry(key)
+    if entry is None:
+        return None
+    return entry['value'], entry['source']
+
+
+def get_entry(key):
+    """Süresi dolmamış kayıt {'value', 'source', 'created', 'expires'}, yoksa None"""
+    if not is_enabled():
+        return None
+    try:
+        row = _connection().execute('SELECT value, source, created, expires FROM products WHERE key = ?',
+                                    (key,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"Ürün cache okuma hatası ({key}): {e}")
+        _count('errors')
+        return None
+
+    if row is None:
+        _count('misses')
+        return None
+    value, source, created, expires = row
+    if expires <= time.time():
+        # Süresi dolan kayıt compact() ile silinir
+        _count('expired')
+        _count('misses')
+        return None
+    _count('hits')
+    return {'value': json.loads(value), 'source': source, 'created': created, 'expires': expires}
+
+
+def put(key, value, source, ttl=None):
+    """Kaydı yaz (varsa üzerine) - ttl verilmezse PRODUCT_CACHE_TTL"""
+    if not is_enabled():
+        return
+    now = time.time()
+    expires = now + (PRODUCT_CACHE_TTL if ttl is None else ttl)
+    try:
+        _connection().execute(
+            'INSERT OR REPLACE INTO products (key, value, source, created, expires) VALUES (?, ?, ?, ?, ?)',
+            (key, json.dumps(value, ensure_ascii=False), source, now, expires))
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"Ürün cache yazma hatası ({key}): {e}")
+        _count('errors')
+        return
+    _count('writes')
+
+    # Periyodik sıkıştırma - birden fazla worker aynı anda çalıştırsa da sonuç aynıdır
+    if now - _LAST_COMPACT[0] >= COMPACT_INTERVAL:
+        _LAST_COMPACT[0] = now
+        compact()
+
+
+def delete(key):
+    """Tek kaydı sil"""
+    if not is_enabled():
+        return
+    try:
+        _connection().execute('DELETE FROM products WHERE key = ?', (key,))
+    except sqlite3.Error as e:
+        print(f"Ürün cache silme hatası ({key}): {e}")
+        _count('errors')
+
+
+def delete_prefix(prefix):
+    """Anahtarı verilen önekle başlayan kayıtları sil (ör. bir SKU'nun isim seviyesi kayıtları)"""
+    if not is_enabled():
+        return
+    try:
+        _connection().execute('DELETE FROM products WHERE substr(key, 1, ?) = ?', (len(prefix), prefix))
+    except sqlite3.Error as e:
+        print(f"Ürün cache silme hatası ({prefix}*): {e}")
+        _count('errors')
+
+
+def compact():
+    """Süresi dolan kayıtları (ve kilitleri) sil, WAL dosyasını veritabanına aktarıp küçült"""
+    if not is_enabled():
+        return 0
+    try:
+        connection = _connection()
+        removed = connection.execute('DELETE FROM products WHERE expires <= ?', (time.time(),)).rowcount
+        connection.execute('DELETE FROM leases WHERE expires <= ?', (time.time(),))
+        connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    except sqlite3.Error as e:
+        print(f"Ürün cache sıkıştırma hatası: {e}")
+        _count('errors')
+        return 0
+    _count('compactions')
+    _count('compacted_rows', removed)
+    if removed:
+        print(f"Ürün cache: {removed} süresi dolan kayıt silindi")
+    return removed
+
+
+def clear():
+    """Tüm kayıtları sil"""
+    if not is_enabled():
+        return
+    try:
+        _connection().execute('DELETE FROM products')
+    except sqlite3.Error as e:
+        print(f"Ürün cache temizleme hatası: {e}")
+        _count('errors')
+
+
+def acquire_lease(key, owner, ttl):
+    """Anahtar için worker'lar arası kilit al - başka sahibin süresi dolmamış kilidi varsa False"""
+    if not is_enabled():
+        return True
+    now = time.time()
+    try:
+        connection = _connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM leases WHERE key = ? AND expires <= ?', (key, now))
+            connection.execute('INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)',
+                               (key, owner, now + ttl))
+            row = connection.execute('SELECT owner FROM leases WHERE key = ?', (key,)).fetchone()
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+    except sqlite3.Error as e:
+        # Kilit alınamazsa beklemek yerine çözümlemeye devam et
+        print(f"Ürün cache kilit hatası ({key}): {e}")
+        _count('errors')
+        return True
+    return row is not None and row[0] == owner
+
+
+def release_lease(key, owner):
+    """Kilidi bırak (sadece sahibi)"""
+    if not is_enabled():
+        return
+    try:
+        _connection().execute('DELETE FROM leases WHERE key = ? AND owner = ?', (key, owner))
+    except sqlite3.Error as e:
+        print(f"Ürün cache kilit bırakma hatası ({key}): {e}")
+        _count('errors')
+
+
+def lease_active(key):
+    """Anahtar için süresi dolmamış kilit var mı"""
+    if not is_enabled():
+        return False
+    try:
+        row = _connection().execute('SELECT expires FROM leases WHERE key = ?', (key,)).fetchone()
+    except sqlite3.Error:
+        return False
+    return row is not None and row[0] > time.time()
+
+
+def get_stats():
+    """Bu process'in hit/miss sayaçları ve veritabanındaki kayıtların katman dağılımı"""
+    with _LOCK:
+        stats = dict(_STATS)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else None
+    stats['enabled'] = is_enabled()
+    if not is_enabled():
+        return stats
+    stats['path'] = PRODUCT_CACHE_PATH
+    try:
+        rows = _connection().execute(
+            'SELECT source, COUNT(*), SUM(expires <= ?) FROM products GROUP BY source', (time.time(),)).fetchall()
+    except sqlite3.Error as e:
+        print(f"Ürün cache istatistik hatası: {e}")
+        return stats
+    stats['entries'] = {source: count for source, count, _ in rows}
+    stats['expired_entries'] = sum(expired or 0 for _, _, expired in rows)
+    return stats
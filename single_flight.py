@@ -0,0 +1,142 @@
+# Aynı SKU için eşzamanlı aramaların tek çözümlemede birleştirilmesi (single-flight)
+# Aynı sevkiyattan iki fatura aynı anda yüklenince her thread aynı SKU için OpenAI ve
+# web aramasını ayrı ayrı çalıştırıyordu. Burada:
+#   - process içi: anahtarı ilk isteyen lider olur, sonrakiler liderin sonucunu bekler
+#   - worker'lar arası (SINGLE_FLIGHT_SHARED=1): lider product_cache'te kilit (lease) alır;
+#     başka worker'ın kilidi varsa sonucun kalıcı cache'e yazılması beklenir
+# Kazanılan (yapılmayan) upstream çağrı sayısı get_stats ile okunur.
+
+import os
+import socket
+import threading
+import time
+
+import product_cache
+
+SINGLE_FLIGHT_SHARED = os.getenv('SINGLE_FLIGHT_SHARED', '0') == '1'
+LEASE_SECONDS = float(os.getenv('SINGLE_FLIGHT_LEASE_SECONDS', '60'))  # Diğer worker en fazla bu kadar beklenir
+POLL_SECONDS = 0.2
+
+_LOCK = threading.Lock()
+_FLIGHTS = {}
+_STATS = {'leaders': 0, 'coalesced': 0, 'remote_coalesced': 0, 'remote_timeouts': 0}
+
+
+def _count(name, amount=1):
+    with _LOCK:
+        _STATS[name] += amount
+
+
+def acquire(key):
+    """Anahtar için uçuşu al - (flight, lider mi)
+
+    Lider işi yapıp complete() çağırmalıdır; lider olmayan wait() ile sonucu bekler.
+    """
+    with _LOCK:
+        flight = _FLIGHTS.get(key)
+        if flight is not None:
+            _STATS['coalesced'] += 1
+            return flight, False
+        flight = {'event': threading.Event(), 'result': None, 'error': None}
+        _FLIGHTS[key] = flight
+        _STATS['leaders'] += 1
+        return flight, True
+
+
+def complete(key, flight, result=None, error=None):
+    """Lider: sonucu (veya hatayı) bekleyenlere ilet ve uçuşu kapat"""
+    flight['result'] = result
+    flight['error'] = error
+    with _LOCK:
+        if _FLIGHTS.get(key) is flight:
+            del _FLIGHTS[key]
+    flight['event'].set()
+
+
+def wait(flight):
+    """Liderin sonucunu bekle - lider hata aldıysa aynı hata yükselir"""
+    flight['event'].wait()
+    if flight['error'] is not None:
+        raise flight['error']
+    return flight['result']
+
+
+def _owner():
+    """Kilit sahibi - fork sonrası pid değiştiği için her çağrıda hesaplanır"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_shared(key):
+    """Worker'lar arası kilit - kapalıysa veya alındıysa True, başka worker tutuyorsa False"""
+    if not SINGLE_FLIGHT_SHARED:
+        return True
+    return product_cache.acquire_lease(key, _owner(), LEASE_SECONDS)
+
+
+def release_shared(key):
+    """Worker'lar arası kilidi bırak"""
+    if SINGLE_FLIGHT_SHARED:
+        product_cache.release_lease(key, _owner())
+
+
+def wait_shared(key, check):
+    """Kilidi tutan worker'ın sonucunu bekle - check() sonucu cache'ten okur
+
+    Sonuç gelirse döner; kilit bırakıldıysa veya LEASE_SECONDS dolduysa None
+    (çağıran kendisi çözümler).
+    """
+    deadline = time.monotonic() + LEASE_SECONDS
+    while True:
+        result = check()
+        if result is not None:
+            _count('remote_coalesced')
+            return result
+        if not product_cache.lease_active(key):
+            # Kilit bırakıldı - sonuç tam o arada yazılmış olabilir
+            result = check()
+            if result is not None:
+                _count('remote_coalesced')
+            return result
+        if time.monotonic() >= deadline:
+            _count('remote_timeouts')
+            return None
+        time.sleep(POLL_SECONDS)
+
+
+def do(key, fn, check=None):
+    """fn()'i anahtar başına tek çalıştır - eşzamanlı çağıranlar aynı sonucu alır
+
+    check verilirse (cache'ten sonucu okuyan fonksiyon) ve SINGLE_FLIGHT_SHARED açıksa
+    başka worker'ın yürüttüğü çözümleme de beklenir.
+    """
+    flight, leader = acquire(key)
+    if not leader:
+        return wait(flight)
+
+    leased = False
+    try:
+        result = None
+        if check is not None:
+            leased = acquire_shared(key)
+            if not leased:
+                result = wait_shared(key, check)
+        if result is None:
+            result = fn()
+    except BaseException as e:
+        complete(key, flight, error=e)
+        raise
+    finally:
+        if leased:
+            release_shared(key)
+    complete(key, flight, result)
+    return result
+
+
+def get_stats():
+    """Lider/bekleyen sayaçları - saved_calls: yapılmayan upstream çözümleme sayısı"""
+    with _LOCK:
+        stats = dict(_STATS)
+        stats['in_flight'] = len(_FLIGHTS)
+    stats['saved_calls'] = stats['coalesced'] + stats['remote_coalesced']
+    stats['shared'] = SINGLE_FLIGHT_SHARED
+    return stats
@@ -0,0 +1,86 @@
+# SKU adaylarının güven skoru - yavaş çözümleme katmanlarına (OpenAI, trekbikes.com)
+# sadece gerçek item olma ihtimali yüksek adaylar gönderilir
+#
+# Skor 0-1 arası özelliklerin toplamıdır:
+#   - kaynak: item sütunu > etiketli metin (Item:/SKU:/Code:) > başlıksız tablo hücresi > düz metin
+#   - komşu açıklama: aynı satırda ürün adı bulunduysa
+#   - Trek SKU biçimi: W-önekli ve extract_category_from_sku_pattern'deki 5/6/7 haneli aileler
+#   - tekrar: aynı aday birden fazla satırda geçiyorsa
+# Düz metinden gelen adayda açıklama puanı ve genel 6 haneli biçimin Trek puanı sadece satır
+# bir fatura kalemine benziyorsa (miktar/fiyat sütunları) verilir; "612345 shipped via DHL"
+# gibi düz cümleler açıklama sayılmaz. Posta kodu, vergi numarası, sipariş referansı gibi
+# düz metinden gelen adaylar eşiğin altında kalır.
+
+import os
+import re
+
+SKU_MIN_CONFIDENCE = float(os.getenv('SKU_MIN_CONFIDENCE', '0.5'))
+
+SOURCE_SCORES = {
+    'column': 0.5,        # Başlıklı tablonun item sütunu
+    'labeled_text': 0.3,  # Metinde Item/SKU/Code etiketinden sonra
+    'cell': 0.2,          # Başlıksız tablo hücresi
+    'text': 0.0,          # Düz metinde 5-7 karakterlik kelime
+}
+DESCRIPTION_SCORE = 0.2
+TREK_SHAPE_SCORE = 0.3     # Bilinen Trek SKU aileleri
+NUMERIC_SHAPE_SCORE = 0.1  # Diğer 5-7 haneli sayılar
+REPEAT_SCORE = 0.1
+
+# trek_sku_database.extract_category_from_sku_pattern'in tanıdığı aileler
+_GENERIC_SHAPE_RE = re.compile(r'^\d{6}$')     # 6 haneli parçalar (601257, 581633) - her 6 haneli sayı
+TREK_SKU_SHAPES = (
+    re.compile(r'^W\d{5,7}$'),                 # W5xxxxx, W3xxxxx ... Bontrager/Trek parçaları
+    re.compile(r'^5(?:2[678]|3[123])\d{4}$'),  # 526-528, 531-533 serileri (7 hane)
+    _GENERIC_SHAPE_RE,
+    re.compile(r'^4[17]\d{3}$'),               # 41xxx, 47xxx elektrikli bisikletler
+)
+_NUMERIC_SHAPE_RE = re.compile(r'^\d{5,7}$')
+_AMOUNT_RE = re.compile(r'^\d+(?:[.,]\d+)*$')
+MIN_ROW_NUMBERS = 2  # Kalem satırında SKU'dan sonra en az bu kadar sayı (miktar, fiyat, tutar)
+
+
+def sku_shape_score(sku, generic=True):
+    """Adayın biçimi bilinen bir Trek SKU ailesine uyuyor mu
+
+    generic=False ise genel 6 haneli biçim Trek ailesi sayılmaz (diğer sayılar gibi puanlanır).
+    """
+    sku = str(sku).upper()
+    if any(shape.match(sku) for shape in TREK_SKU_SHAPES if generic or shape is not _GENERIC_SHAPE_RE):
+        return TREK_SHAPE_SCORE
+    if _NUMERIC_SHAPE_RE.match(sku):
+        return NUMERIC_SHAPE_SCORE
+    return 0.0
+
+
+def is_item_row(line, sku):
+    """Metin satırı SKU'lu bir fatura kalemine benziyor mu - SKU'dan sonra kelime ve sayı sütunları"""
+    if not line:
+        return False
+    parts = line.split()
+    if sku not in parts:
+        return False
+    after = parts[parts.index(sku) + 1:]
+    numbers = sum(1 for part in after if _AMOUNT_RE.match(part))
+    words = sum(1 for part in after if any(char.isalpha() for char in part))
+    return numbers >= MIN_ROW_NUMBERS and words > 0
+
+
+def score_candidate(sku, source, description='', frequency=1, line=None):
+    """Adayın 0-1 arası güven skoru
+
+    Düz metin ('text') adaylarında line adayın geçtiği metin satırıdır; satır kalem
+    satırı değilse açıklama sayılmaz ve genel 6 haneli biçim Trek puanı almaz.
+    """
+    row = source != 'text' or is_item_row(line, sku)
+    score = SOURCE_SCORES.get(source, 0.0) + sku_shape_score(sku, generic=row)
+    if description and row:
+        score += DESCRIPTION_SCORE
+    if frequency > 1:
+        score += REPEAT_SCORE
+    return round(min(score, 1.0), 2)
+
+
+def is_confident(score):
+    """Skor yavaş çözümleme katmanları için yeterli mi (skor yoksa her zaman evet)"""
+    return score is None or score >= SKU_MIN_CONFIDENCE
@@ -0,0 +1,148 @@
+# SKU tarama yardımcıları - tüm app giriş noktaları tarafından paylaşılır
+# - Aday doğrulama: önceden derlenmiş regex'ler + frozenset stop-list
+# - Metin tarama: pattern'ler modül yüklenirken bir kez derlenir
+# - Bilinen SKU'lar: Aho-Corasick otomatı, satır/hücre uzunluğunda çalışır
+
+import re
+from collections import deque
+
+# Item number olamayacak yaygın kelimeler
+INVALID_ITEM_WORDS = frozenset([
+    'SEARCH', 'ITEM', 'TOTAL', 'DISCOUNT', 'TAX', 'SHIPPING', 'INVOICE',
+    'DATE', 'CUSTOMER', 'ADDRESS', 'PHONE', 'EMAIL', 'QUANTITY', 'PRICE',
+    'AMOUNT', 'SUBTOTAL', 'PAYMENT', 'DESCRIPTION', 'UNIT', 'QTY',
+    'AUTHORIZED', 'REGULATIONS', 'CONTROLLED', 'PERCENTAGE', 'BISIKLET',
+    'ISTANBUL', 'TREKBIKES', 'AQUAMARINE', 'COMPANY', 'STREET', 'CITY',
+    'STATE', 'ORDER', 'BILL', 'SHIP', 'FROM', 'NAME', 'LINE'
+])
+
+# Tablo başlığında item sütununu işaret eden anahtar kelimeler
+ITEM_HEADER_KEYWORDS = (
+    'item number', 'item #', 'item#', 'item no', 'item code',
+    'product code', 'sku', 'code', 'model', 'part number'
+)
+
+ITEM_SHAPE_RE = re.compile(r'^[A-Z0-9]+$', re.IGNORECASE)
+_SHORT_NUMBER_RE = re.compile(r'^\d{1,3}$')  # 1-3 rakam (muhtemelen miktar)
+_FOUR_DIGIT_RE = re.compile(r'^\d{4}$')      # Yıl olabilir
+
+# Düz metin fallback pattern'leri - öncelik sırasıyla
+TEXT_ITEM_PATTERNS = [
+    r'(?:Item\s*(?:Number|#|No\.?)?[:]?\s*)([A-Z0-9]{4,8})',
+    r'(?:SKU[:]?\s*)([A-Z0-9]{4,8})',
+    r'(?:Code[:]?\s*)([A-Z0-9]{4,8})',
+    r'\b([A-Z0-9]{5,7})\b',  # 5-7 karakter alfanümerik
+]
+
+
+def is_valid_item_number(candidate):
+    """Geçerli bir item number olup olmadığını kontrol et"""
+    if not candidate or len(candidate) < 4 or len(candidate) > 10:
+        return False
+    
+    # Yaygın kelimeler değil
+    if candidate.upper() in INVALID_ITEM_WORDS:
+        return False
+    
+    # Sadece harf ve rakam içermeli
+    if not ITEM_SHAPE_RE.match(candidate):
+        return False
+    
+    # En az bir rakam içermeli
+    if not any(c.isdigit() for c in candidate):
+        return False
+    
+    # Çok yaygın pattern'leri filtrele
+    if _SHORT_NUMBER_RE.match(candidate):
+        return False
+    
+    if _FOUR_DIGIT_RE.match(candidate) and 2000 < int(candidate) < 2030:  # Yıl
+        return False
+    
+    return True
+
+
+def filter_valid_item_numbers(cells):
+    """Tablo hücrelerini toplu doğrula - boş hücreler atlanır, geçerli değerler sırayla döner"""
+    valid = is_valid_item_number
+    candidates = (str(cell).strip() for cell in cells if cell)
+    return [candidate for candidate in candidates if valid(candidate)]
+
+
+def build_pattern_scanner(patterns, flags=0):
+    """Pattern listesini bir kez derle, tarayıcı olarak döndür
+
+    Pattern'ler birleşik tek bir alternation'a çevrilmez: sre literal önekli
+    pattern'lerde (Item, SKU, Code) önek atlamasını kullanır, alternation bunu
+    bozar ve CPython'da ayrı geçişlerden daha yavaş çalışır.
+    """
+    return tuple(re.compile(pattern, flags) for pattern in patterns)
+
+
+def scan_patterns(scanner, text):
+    """Metni derlenmiş pattern'lerle tara, eşleşmeleri pattern öncelik sırasıyla döndür"""
+    matches = []
+    for regex in scanner:
+        matches.extend(regex.findall(text))
+    return matches
+
+
+TEXT_ITEM_SCANNER = build_pattern_scanner(TEXT_ITEM_PATTERNS, re.IGNORECASE)
+
+
+def build_sku_automaton(skus):
+    """SKU listesinden Aho-Corasick otomatı kur
+
+    Dönen yapı (goto, fail, output) listeleridir; durum 0 köktür.
+    output[durum] o durumda biten tüm SKU'ları (iç içe olanlar dahil) içerir.
+    """
+    goto = [{}]
+    fail = [0]
+    output = [()]
+
+    # 1. Trie
+    for sku in skus:
+        if not sku:
+            continue
+        state = 0
+        for char in sku:
+            next_state = goto[state].get(char)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][char] = next_state
+                goto.append({})
+                fail.append(0)
+                output.append(())
+            state = next_state
+        if sku not in output[state]:
+            output[state] = output[state] + (sku,)
+
+    # 2. Failure linkleri (BFS)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, next_state in goto[state].items():
+            queue.append(next_state)
+            fallback = fail[state]
+            while fallback and char not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[next_state] = goto[fallback].get(char, 0)
+            output[next_state] = output[next_state] + output[fail[next_state]]
+
+    return goto, fail, output
+
+
+def find_skus(automaton, text):
+    """Metinde geçen tüm SKU'ları (alt dize olarak, çakışanlar dahil) bul"""
+    goto, fail, output = automaton
+    found = set()
+    state = 0
+
+    for char in text:
+        while state and char not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(char, 0)
+        if output[state]:
+            found.update(output[state])
+
+    return found
@@ -9,7 +9,7 @@ if not os.environ.get('OPENAI_API_KEY'):
     st.stop()
 
 # Import functions
-from trek_sku_database import get_trek_product_info
+from trek_sku_database import get_trek_product_info_many
 
 st.set_page_config(page_title="Trek Invoice Analyzer", page_icon="🚲", layout="wide")
 
@@ -27,6 +27,7 @@ if uploaded_file is not None:
             try:
                 # Import PDF processing functions
                 from app_final import extract_item_numbers_from_pdf, extract_product_names_from_pdf
+                from pdf_parser import parse_pdf
                 
                 # Save uploaded file temporarily
                 import tempfile
@@ -36,24 +37,26 @@ if uploaded_file is not None:
                 
                 # Extract data
                 st.info("📄 PDF'den SKU'lar çıkarılıyor...")
-                item_numbers = extract_item_numbers_from_pdf(temp_path)
+                document = parse_pdf(temp_path)
+                item_numbers = extract_item_numbers_from_pdf(temp_path, document=document)
                 
                 st.info("📝 Ürün isimleri çıkarılıyor...")  
-                product_names = extract_product_names_from_pdf(temp_path, item_numbers)
+                product_names = extract_product_names_from_pdf(temp_path, item_numbers, document=document)
                 
                 st.success(f"✅ {len(item_numbers)} SKU bulundu!")
                 
-                # Process each SKU
+                # Tüm SKU'ları tek toplu aramada çözümle
                 results = []
                 progress_bar = st.progress(0)
                 
+                st.info(f"🔍 {len(item_numbers)} SKU analiz ediliyor...")
+                found = get_trek_product_info_many([(sku, product_names.get(sku, '')) for sku in item_numbers])
+                
                 for i, sku in enumerate(item_numbers):
                     progress_bar.progress((i + 1) / len(item_numbers))
                     
-                    st.info(f"🔍 Analiz ediliyor: {sku}")
-                    
                     invoice_name = product_names.get(sku, '')
-                    product_info = get_trek_product_info(sku, invoice_name)
+                    product_info = found[(sku, invoice_name)]['info']
                     
                     result = {
                         "Fatura Numarası": "INV-001",  # Default
@@ -0,0 +1,176 @@
+# Tedarikçi bazlı extraction şablonları - PDF parmak iziyle saklanır
+# Parmak izi: producer/creator metadata + sayfa boyutu + ilk sayfadaki item tablosu başlık
+# satırı (normalize) - aynı PDF üreticisini ve kağıt boyunu kullanan tedarikçiler başlıkları
+# farklıysa ayrı şablon alır. Şablon ayrıca başlık hücrelerini saklar ve sayfada aynı başlık
+# görülmeden kullanılmaz.
+#
+# Şablon içeriği:
+#   layout: item tablosunun sütun x aralıkları, item/açıklama sütunları, başlık satırı
+#   invoice_label: ilk sayfada fatura numarasından hemen önce gelen etiket (örn. 'Invoice')
+# Bilinmeyen parmak izleri başarılı bir sezgisel ayrıştırmadan sonra otomatik öğrenilir.
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime
+
+from sku_scanner import ITEM_HEADER_KEYWORDS
+
+SUPPLIER_TEMPLATES_PATH = os.getenv('SUPPLIER_TEMPLATES_PATH', 'supplier_templates.json')
+
+_LOCK = threading.Lock()
+_TEMPLATES = None
+_TEMPLATES_MTIME = None
+
+
+def item_header_signature(first_page_text):
+    """İlk sayfadaki item tablosu başlık satırı - küçük harf, tek boşluk; bulunamazsa ''
+
+    Başlık satırı item anahtar kelimesi içeren ve rakamlı kelimesi olmayan ilk satırdır.
+    """
+    for line in (first_page_text or '').split('\n'):
+        lower_line = ' '.join(line.lower().split())
+        if not lower_line or any(char.isdigit() for char in lower_line):
+            continue
+        if any(keyword in lower_line for keyword in ITEM_HEADER_KEYWORDS):
+            return lower_line
+    return ''
+
+
+def pdf_fingerprint(pdf, first_page_text=None):
+    """pdfplumber PDF nesnesinden producer/creator, sayfa boyutu ve item başlık satırına göre parmak izi
+
+    first_page_text verilmezse ilk sayfa metni pdfplumber ile okunur.
+    """
+    metadata = pdf.metadata or {}
+    size = ''
+    if pdf.pages:
+        first_page = pdf.pages[0]
+        size = f"{round(float(first_page.width))}x{round(float(first_page.height))}"
+        if first_page_text is None:
+            first_page_text = first_page.extract_text() or ''
+    parts = [str(metadata.get('Producer', '')), str(metadata.get('Creator', '')), size,
+             item_header_signature(first_page_text)]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def _load_templates():
+    """Şablon dosyasını oku - dosya değişmediyse bellekteki kopya kullanılır"""
+    global _TEMPLATES, _TEMPLATES_MTIME
+
+    try:
+        mtime = os.path.getmtime(SUPPLIER_TEMPLATES_PATH)
+    except OSError:
+        mtime = None
+
+    if _TEMPLATES is None or mtime != _TEMPLATES_MTIME:
+        templates = {}
+        if mtime is not None:
+            try:
+                with open(SUPPLIER_TEMPLATES_PATH, 'r', encoding='utf-8') as f:
+                    templates = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Şablon dosyası okunamadı: {e}")
+        _TEMPLATES = templates
+        _TEMPLATES_MTIME = mtime
+    return _TEMPLATES
+
+
+def get_template(fingerprint):
+    """Parmak izine ait şablonu döndür, yoksa None"""
+    if not fingerprint:
+        return None
+    with _LOCK:
+        return _load_templates().get(fingerprint)
+
+
+def save_template(fingerprint, template):
+    """Şablonu kaydet - dosya geçici dosya üzerinden atomik olarak yazılır"""
+    global _TEMPLATES_MTIME
+
+    with _LOCK:
+        templates = dict(_load_templates())
+        templates[fingerprint] = template
+        try:
+            directory = os.path.dirname(os.path.abspath(SUPPLIER_TEMPLATES_PATH))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(templates, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, SUPPLIER_TEMPLATES_PATH)
+        except OSError as e:
+            print(f"Şablon kaydedilemedi: {e}")
+            return
+        _TEMPLATES.clear()
+        _TEMPLATES.update(templates)
+        _TEMPLATES_MTIME = os.path.getmtime(SUPPLIER_TEMPLATES_PATH)
+
+
+def template_layout(template):
+    """Şablondaki sütun düzenini pdf_parser'ın kullandığı forma çevir"""
+    if not template or not template.get('layout'):
+        return None
+    layout = dict(template['layout'])
+    layout['columns'] = [tuple(column) for column in layout['columns']]
+    return layout
+
+
+def find_invoice_label(first_page_text, invoice_number):
+    """İlk sayfada fatura numarasından hemen önce gelen etiketi bul
+
+    Numara kısa ise veya sayfada birden fazla kez geçiyorsa (örn. dosya adından
+    gelen ve tesadüfen miktar sütununa denk gelen numara) etiket öğrenilmez.
+    """
+    if not first_page_text or not invoice_number or len(invoice_number) < 4:
+        return None
+    labels = []
+    for line in first_page_text.split('\n'):
+        parts = line.split()
+        for index, part in enumerate(parts):
+            if part.strip('#:') == invoice_number:
+                labels.append(parts[index - 1].strip('#:.-') if index else '')
+    if len(labels) == 1 and labels[0].isalpha():
+        return labels[0]
+    return None
+
+
+def extract_invoice_number_with_template(first_page_text, template):
+    """Şablondaki etiketle ilk sayfadan fatura numarasını al"""
+    label = template.get('invoice_label') if template else None
+    if not label or not first_page_text:
+        return None
+    match = re.search(rf'\b{re.escape(label)}[\s#:.-]*([A-Z0-9][A-Z0-9-]*)', first_page_text)
+    return match.group(1) if match else None
+
+
+def learn_template(pages, invoice_number=None):
+    """Başarılı sezgisel ayrıştırmadan sonra bilinmeyen parmak izi için şablon kaydet
+
+    Sütun düzeni ayrıştırma sırasında item tablosunda bulunan düzenden alınır.
+    Şablon zaten varsa ve aynı başlığı taşıyorsa tekrar yazılmaz.
+    """
+    layout = next((page_info['layout'] for page_info in pages if page_info.get('layout')), None)
+    if not layout or not layout.get('fingerprint'):
+        return False
+
+    fingerprint = layout['fingerprint']
+    existing = get_template(fingerprint)
+    if existing and existing['layout']['header'] == layout['header']:
+        return False
+
+    first_page_text = pages[0]['text'] if pages else ''
+    template = {
+        'layout': {
+            'columns': [list(column) for column in layout['columns']],
+            'item_col': layout['item_col'],
+            'description_col': layout['description_col'],
+            'header': layout['header'],
+        },
+        'invoice_label': find_invoice_label(first_page_text, invoice_number),
+        'learned_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    save_template(fingerprint, template)
+    print(f"Yeni tedarikçi şablonu öğrenildi: {fingerprint}")
+    return True
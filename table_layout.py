@@ -0,0 +1,262 @@
+# Çok sayfalı faturalarda tablo sütun geometrisinin tekrar kullanımı
+# Tedarikçi faturaları her sayfada aynı tablo düzenini kullanır:
+# - Başlığın göründüğü ilk sayfada pdfplumber table finder çalışır, sütun sınırları kaydedilir
+# - Sonraki sayfalarda tablo, sütun sınırlarına kırpılmış extract_words ile yeniden kurulur
+# - Başlık bulunamazsa veya kelimeler sütun sınırlarını aşarsa tam algılamaya dönülür
+# Tam algılama PDF_TABLE_ENGINE=numpy ile önce numpy_table (karakter koordinatlarından
+# vektörel kurma) ile denenir; item tablosu kurulamazsa pdfplumber find_tables çalışır.
+
+import os
+
+import numpy_table
+from sku_scanner import ITEM_HEADER_KEYWORDS, is_valid_item_number
+
+TABLE_ENGINES = ('pdfplumber', 'numpy')
+PDF_TABLE_ENGINE = os.getenv('PDF_TABLE_ENGINE', 'pdfplumber')
+
+LINE_TOLERANCE = 3      # Aynı satır sayılan kelimeler arası en fazla dikey fark (pt)
+BOUNDARY_TOLERANCE = 1  # Sütun sınırını bu kadar aşan kelime düzeni bozar (pt)
+MAX_ROW_GAP = 3.0       # Satır aralığının bu katından büyük boşluk tabloyu bitirir
+
+# Açıklama sütununu işaret eden başlık kelimeleri
+DESCRIPTION_HEADER_KEYWORDS = ('desc', 'name', 'açıklama', 'tanım')
+
+
+def _find_item_header(rows):
+    """Tablo satırlarında item sütunu başlığını bul - (satır, sütun) veya None"""
+    for row_idx, row in enumerate(rows):
+        if not row:
+            continue
+        for col_idx, cell in enumerate(row):
+            if cell and any(keyword in str(cell).lower() for keyword in ITEM_HEADER_KEYWORDS):
+                return row_idx, col_idx
+    return None
+
+
+def get_table_engine():
+    """Geçerli tam algılama motoru - bilinmeyen değerde pdfplumber"""
+    if PDF_TABLE_ENGINE in TABLE_ENGINES:
+        return PDF_TABLE_ENGINE
+    print(f"Bilinmeyen PDF_TABLE_ENGINE '{PDF_TABLE_ENGINE}', pdfplumber kullanılıyor")
+    return 'pdfplumber'
+
+
+def detect_layout_numpy(page):
+    """Item tablosunu numpy_table ile kur - (tablolar, düzen) veya None
+
+    Sadece başlıklı item tablosu döner; sayfadaki diğer tablolar kurulmaz.
+    """
+    result = numpy_table.extract_item_table(page.chars)
+    if result is None:
+        return None
+    rows, columns = result
+    header = _find_item_header(rows[:1])
+    if header is None:
+        return None
+    header_cells = rows[0]
+    layout = {
+        'table': 0,
+        'header_row': 0,
+        'columns': columns,
+        'item_col': header[1],
+        'description_col': _find_description_col(header_cells, header[1]),
+        'header': header_cells,
+    }
+    return [rows], layout
+
+
+def detect_layout(page):
+    """Tam tablo algılaması yap, item başlıklı tablodan sütun düzenini çıkar
+
+    Dönen değer (tablolar, düzen). Düzen bulunamazsa None döner:
+    {'table': 0, 'header_row': 0, 'columns': [[x0, x1], ...], 'item_col': 0,
+     'description_col': 1, 'header': ['Item Number', ...]}
+    """
+    if get_table_engine() == 'numpy':
+        detected = detect_layout_numpy(page)
+        if detected is not None:
+            return detected
+
+    tables = []
+    layout = None
+    for table in page.find_tables():
+        rows = table.extract()
+        if not rows:
+            continue
+        tables.append(rows)
+
+        if layout is not None:
+            continue
+        header = _find_item_header(rows)
+        if header is None:
+            continue
+        row_idx, col_idx = header
+        cells = table.rows[row_idx].cells
+        # Birleştirilmiş hücre varsa sütun sınırları güvenilir değil
+        if any(cell is None for cell in cells):
+            continue
+        header_cells = [str(cell).strip() if cell else '' for cell in rows[row_idx]]
+        layout = {
+            'table': len(tables) - 1,
+            'header_row': row_idx,
+            'columns': [[cell[0], cell[2]] for cell in cells],
+            'item_col': col_idx,
+            'description_col': _find_description_col(header_cells, col_idx),
+            'header': header_cells,
+        }
+    return tables, layout
+
+
+def _find_description_col(header_cells, item_col):
+    """Başlıkta açıklama sütununu bul, yoksa item sütunundan sonraki sütun"""
+    for col_idx, cell in enumerate(header_cells):
+        if col_idx != item_col and any(keyword in cell.lower() for keyword in DESCRIPTION_HEADER_KEYWORDS):
+            return col_idx
+    return item_col + 1 if item_col + 1 < len(header_cells) else None
+
+
+def _group_lines(words):
+    """Kelimeleri dikey konumlarına göre satırlara grupla"""
+    lines = []
+    for word in sorted(words, key=lambda w: (w['top'], w['x0'])):
+        if lines and abs(word['top'] - lines[-1]['top']) <= LINE_TOLERANCE:
+            lines[-1]['words'].append(word)
+        else:
+            lines.append({'top': word['top'], 'words': [word]})
+    return lines
+
+
+def _line_cells(line, columns):
+    """Satırdaki kelimeleri sütunlara dağıt - bir kelime sütun sınırını aşarsa None"""
+    boundaries = [x1 for _, x1 in columns[:-1]]
+    cells = [[] for _ in columns]
+    for word in sorted(line['words'], key=lambda w: w['x0']):
+        if any(word['x0'] < edge - BOUNDARY_TOLERANCE and word['x1'] > edge + BOUNDARY_TOLERANCE
+               for edge in boundaries):
+            return None
+        center = (word['x0'] + word['x1']) / 2
+        for col_idx, (x0, x1) in enumerate(columns):
+            if x0 <= center < x1:
+                cells[col_idx].append(word['text'])
+                break
+    return [' '.join(parts) for parts in cells]
+
+
+def extract_table_with_layout(page, layout):
+    """Kaydedilmiş sütun düzeniyle sayfadaki item tablosunu kur, düzen tutmazsa None
+
+    Sayfa tablo genişliğine kırpılır ve sadece extract_words çalışır. Başlık satırı
+    aynı sütunlarda bulunmalı; başlıktan sonra item sütunu geçerli olan satırlar
+    alınır, item sütunu boş satırlar önceki satırın devamı sayılır (sarılmış açıklama).
+    """
+    columns = layout['columns']
+    item_col = layout['item_col']
+    header = [cell.lower() for cell in layout['header']]
+
+    bbox = (columns[0][0], 0, columns[-1][1], page.height)
+    try:
+        words = page.within_bbox(bbox).extract_words()
+    except ValueError:
+        return None
+
+    rows = []
+    header_found = False
+    last_top = None
+    row_pitch = None
+
+    for line in _group_lines(words):
+        if not header_found:
+            cells = _line_cells(line, columns)
+            if cells is not None and [cell.lower() for cell in cells] == header:
+                rows.append(cells)
+                header_found = True
+                last_top = line['top']
+            continue
+
+        if row_pitch and line['top'] - last_top > row_pitch * MAX_ROW_GAP:
+            break
+
+        cells = _line_cells(line, columns)
+        if cells is None:
+            # Tablo içinde sütun sınırı aşıldı - düzen bu sayfada geçerli değil
+            if len(rows) == 1:
+                return None
+            break
+
+        item = cells[item_col]
+        if item:
+            if not is_valid_item_number(item):
+                break  # Toplam/alt bilgi satırı - tablo bitti
+            rows.append(cells)
+        elif len(rows) > 1:
+            # Sarılmış hücre: önceki satıra yeni satır olarak ekle
+            previous = rows[-1]
+            for col_idx, cell in enumerate(cells):
+                if cell:
+                    previous[col_idx] = f"{previous[col_idx]}\n{cell}" if previous[col_idx] else cell
+        else:
+            break
+
+        if row_pitch is None:
+            row_pitch = line['top'] - last_top
+        last_top = line['top']
+
+    if not header_found or len(rows) < 2:
+        return None
+    return rows
+
+
+def _is_number(token):
+    """Miktar/fiyat sütunu değeri mi (1,234.56 gibi)"""
+    return token.replace('.', '').replace(',', '').isdigit()
+
+
+def extract_table_from_text(text, layout):
+    """Sayfa metninden item tablosunu kur - (satırlar, güven skoru)
+
+    En ucuz katman: sadece extract_text çıktısı kullanılır. Başlık satırı kayıtlı
+    düzenin başlığıyla aynı olmalı; sonraki her satır "SKU açıklama sayı..." şeklinde
+    ve düzendeki sütun sayısına uymalı. Güven skoru, tablo bölgesindeki (başlık ile
+    son SKU satırı arası) satırların ne kadarının bu şekle uyduğudur. Başlık yoksa
+    veya düzen metinle kurulamıyorsa (None, 0.0) döner.
+    """
+    if not text or layout['item_col'] != 0 or layout['description_col'] != 1:
+        return None, 0.0
+
+    header = layout['header']
+    numeric_columns = len(header) - 2
+    if numeric_columns < 1:
+        return None, 0.0
+
+    header_line = ' '.join(cell for cell in header if cell).lower()
+    lines = [line.strip() for line in text.split('\n')]
+    try:
+        start = next(index for index, line in enumerate(lines) if line.lower() == header_line)
+    except StopIteration:
+        return None, 0.0
+
+    parsed = []
+    for line in lines[start + 1:]:
+        tokens = line.split()
+        if not tokens or not is_valid_item_number(tokens[0]):
+            parsed.append(None)
+            continue
+        tail = 0
+        for token in reversed(tokens[1:]):
+            if not _is_number(token):
+                break
+            tail += 1
+        if tail < numeric_columns or len(tokens) < numeric_columns + 2:
+            parsed.append(None)
+            continue
+        parsed.append([tokens[0], ' '.join(tokens[1:-numeric_columns])] + tokens[-numeric_columns:])
+
+    # Tablo bölgesi son SKU satırında biter - sonrası toplam/alt bilgi
+    while parsed and parsed[-1] is None:
+        parsed.pop()
+    if not parsed:
+        return None, 0.0
+
+    rows = [row for row in parsed if row is not None]
+    confidence = len(rows) / len(parsed)
+    return [list(header)] + rows, confidence
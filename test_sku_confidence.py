@@ -0,0 +1,46 @@
+# SKU güven skoru eşik testleri - düz metindeki sipariş/müşteri numaraları yavaş
+# çözümleme katmanlarına (OpenAI, trekbikes.com) gönderilmemeli
+#
+#     python -m pytest -q test_sku_confidence.py
+
+from sku_confidence import is_confident, is_item_row, score_candidate
+
+
+def _confident(sku, source, description='', frequency=1, line=None):
+    return is_confident(score_candidate(sku, source, description, frequency, line))
+
+
+def test_text_order_reference_is_not_confident():
+    line = '612345 shipped via DHL'
+    assert not _confident('612345', 'text', 'shipped via DHL', line=line)
+
+
+def test_text_customer_number_is_not_confident():
+    line = 'Customer 771234 account Aquamarine Bisiklet'
+    assert not _confident('771234', 'text', 'account Aquamarine Bisiklet', line=line)
+
+
+def test_text_repeated_reference_is_not_confident():
+    line = 'Order 612345 shipped via DHL'
+    assert not _confident('612345', 'text', 'shipped via DHL', frequency=3, line=line)
+
+
+def test_text_without_line_is_not_confident():
+    assert not _confident('612345', 'text', 'shipped via DHL')
+
+
+def test_text_item_row_is_confident():
+    assert _confident('581633', 'text', 'Saddle Verse', line='581633 Saddle Verse 2 10.00 20.00')
+    assert _confident('W591644', 'text', 'Bontrager saddle', line='W591644 Bontrager saddle 3 13.50 40.50')
+
+
+def test_column_six_digit_is_confident():
+    assert _confident('612345', 'column', 'SADDLE Verse Comp')
+    assert _confident('612345', 'column')
+
+
+def test_is_item_row():
+    assert is_item_row('581633 Saddle Verse 2 10.00 20.00', '581633')
+    assert not is_item_row('612345 shipped via DHL', '612345')
+    assert not is_item_row('Invoice 612345 dated 12.03.2024', '612345')
+    assert not is_item_row('', '612345')
@@ -1,13 +1,47 @@
 # Trek SKU veritabanı - bilinen ürünler (gerçek fatura verilerinden)
 # Enhanced with caching and performance optimizations
 
+import os
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
-# Global cache for web scraping results
-_WEB_CACHE = {}
-_CACHE_EXPIRY = 3600  # 1 hour cache
+import absent_skus
+import memory_cache
+import product_cache
+import single_flight
+from host_limiter import host_slot, penalize
+
+# Global cache for web scraping results - process içi katman (LRU + TTL, bellek sınırlı),
+# kalıcı katman product_cache'te
+_WEB_CACHE = memory_cache.create('trek_sku_database')
+
+# Katmana göre tazelik süreleri (saniye): gerçek sonuç, SKU pattern tahmini, tanımlanamayan (negatif)
+CACHE_TTL_POSITIVE = int(os.getenv('CACHE_TTL_POSITIVE', str(7 * 24 * 3600)))
+CACHE_TTL_PATTERN = int(os.getenv('CACHE_TTL_PATTERN', str(24 * 3600)))
+CACHE_TTL_NEGATIVE = int(os.getenv('CACHE_TTL_NEGATIVE', '3600'))
+SOURCE_TTLS = {
+    'openai': CACHE_TTL_POSITIVE,
+    'web': CACHE_TTL_POSITIVE,
+    'pattern': CACHE_TTL_PATTERN,
+    'fallback': CACHE_TTL_NEGATIVE,
+}
+# Tazelik süresi geçen kayıt bu kadar süre daha hemen döner, arka planda yenilenir
+CACHE_STALE_SECONDS = int(os.getenv('CACHE_STALE_SECONDS', str(24 * 3600)))
+REFRESH_WORKERS = 2
+_REFRESH_LOCK = threading.Lock()
+_REFRESHING = set()
+_REFRESH_POOL = [None]
+
+# trekbikes.com arama sayfasında sonuç olmadığını gösteren ifadeler (en/de)
+NO_RESULTS_MARKERS = ('no results', '0 results', 'did not match any', 'keine ergebnisse', '0 ergebnisse')
+
+# Toplu arama (get_trek_product_info_many) ayarları
+OPENAI_BATCH_SIZE = int(os.getenv('OPENAI_BATCH_SIZE', '20'))      # Tek prompt'taki SKU sayısı
+WEB_LOOKUP_WORKERS = int(os.getenv('WEB_LOOKUP_WORKERS', '4'))     # Paralel web araması (host sınırı ayrıca)
 TREK_SKU_DATABASE = {
     # Fuel EXe Series - Elektrikli Dağ Bisikletleri
     "41476": {
@@ -398,11 +432,12 @@ def get_product_info_from_openai(sku, product_name=None):
         """
         
         client = openai.OpenAI()
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3
-        )
+        with host_slot('api.openai.com'):
+            response = client.chat.completions.create(
+                model="gpt-4o",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3
+            )
         
         # JSON parse et
         import json
@@ -422,25 +457,120 @@ def get_product_info_from_openai(sku, product_name=None):
     
     return None
 
-def get_trek_product_info_from_web(sku, username=None, password=None):
-    """SKU'yu Trek web sitesinden canlı olarak ara - B2B login destekli"""
+def get_products_info_from_openai(items):
+    """Birden fazla SKU'yu tek OpenAI isteğinde analiz et
+
+    items [(sku, product_name), ...] listesidir; dönen liste aynı sıradadır,
+    cevapta olmayan veya geçersiz kalemler için None.
+    """
+    if not items:
+        return []
+    try:
+        import openai
+        import json
+        
+        if not os.environ.get('OPENAI_API_KEY'):
+            raise ValueError("OPENAI_API_KEY environment variable gerekli!")
+        
+        lines = []
+        for index, (sku, product_name) in enumerate(items, 1):
+            lines.append(f'{index}. SKU: {sku}' + (f' | Faturadaki ürün ismi: "{product_name}"' if product_name else ''))
+        item_lines = '\n'.join(lines)
+        prompt = f"""
+        Aşağıdaki Trek bisiklet SKU'larını analiz edin:
+        {item_lines}
+        
+        ÖNEMLI: Faturadaki ürün ismi varsa, bu isme öncelik verin ve bu bilgiyi kullanarak daha doğru analiz yapın.
+        
+        Cevabı, anahtarları yukarıdaki sıra numaraları olan tek bir JSON nesnesi olarak verin:
+        {{
+            "1": {{
+                "name": "Detaylı ürün adı (fatura ismini dikkate al)",
+                "category": "Ana kategori",
+                "product_type": "Spesifik ürün tipi",
+                "subcategory": "Alt kategori",
+                "turkish": "Türkçe açıklama (fatura ismini çevir)",
+                "gtip_description": "GTİP uyumlu gümrük tanımı",
+                "series": "Trek/Bontrager"
+            }}
+        }}
+        
+        Analiz kuralları:
+        - Faturadaki ismi varsa önce onu analiz edin ve Türkçe'ye çevirin
+        - SKU pattern'ini de kullanın: W=aksesuar/parça, 5rakam=bisiklet, 532xxx=kadro
+        - Türkçe açıklama GTİP (Gümrük Tarife İstatistik) uyumlu olmalı
+        - Bisiklet parçalarını spesifik isimle tanımlayın (örn: "fren balata" değil "Shimano fren balata seti")
+        """
+        
+        client = openai.OpenAI()
+        with host_slot('api.openai.com'):
+            response = client.chat.completions.create(
+                model="gpt-4o",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3
+            )
+        
+        result_text = response.choices[0].message.content
+        json_start = result_text.find('{')
+        json_end = result_text.rfind('}') + 1
+        if json_start >= 0 and json_end > json_start:
+            answers = json.loads(result_text[json_start:json_end])
+            results = []
+            for index in range(1, len(items) + 1):
+                answer = answers.get(str(index))
+                results.append(answer if isinstance(answer, dict) and answer.get('name') else None)
+            print(f"🤖 OpenAI ile toplu analiz edildi: {sum(1 for r in results if r)}/{len(items)} SKU")
+            return results
+        
+    except Exception as e:
+        print(f"❌ OpenAI toplu analiz hatası: {e}")
+    
+    return [None] * len(items)
+
+def new_web_session():
+    """Trek web aramaları için retry stratejili requests session'ı"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    session = requests.Session()
+    retry_strategy = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["HEAD", "GET", "OPTIONS"]
+    )
+    adapter = HTTPAdapter(max_retries=retry_strategy)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_trek_product_info_from_web(sku, username=None, password=None, session=None, outcome=None):
+    """SKU'yu Trek web sitesinden canlı olarak ara - B2B login destekli
+
+    session verilirse (toplu aramalar) bağlantılar ve B2B girişi SKU'lar arasında
+    paylaşılır; giriş session başına bir kez denenir ve session kapatılmaz.
+    outcome sözlüğü verilirse 'absent' yazılır: tüm URL'ler kesin cevap verdi
+    (404 veya "sonuç yok" diyen arama sayfası) ve SKU hiçbirinde yok. Zaman aşımı,
+    401/403/429 (bot engeli), 5xx ve sonuç yok demeyen sayfalar kesin sayılmaz.
+    """
     import requests
     from bs4 import BeautifulSoup
     import time
     import re
     import getpass
     import os
-    from requests.adapters import HTTPAdapter
-    from urllib3.util.retry import Retry
     
     sku = str(sku).strip()
     
     # Session oluştur
-    session = requests.Session()
+    owns_session = session is None
+    if owns_session:
+        session = new_web_session()
     
-    # B2B LOGIN - Eğer credentials verilmişse
-    b2b_logged_in = False
-    if username and password:
+    # B2B LOGIN - Eğer credentials verilmişse (paylaşılan session'da sadece ilk seferde)
+    b2b_logged_in = getattr(session, 'trek_b2b_logged_in', False)
+    if username and password and not hasattr(session, 'trek_b2b_logged_in'):
         print(f"🔐 Trek B2B'ye giriş yapılıyor...")
         try:
             # Farklı B2B login URL'leri dene
@@ -454,7 +584,8 @@ def get_trek_product_info_from_web(sku, username=None, password=None):
             for login_url in login_urls:
                 print(f"  Denenen URL: {login_url}")
                 try:
-                    login_page = session.get(login_url, timeout=10)
+                    with host_slot(login_url):
+                        login_page = session.get(login_url, timeout=10)
                     if login_page.status_code == 200:
                         print(f"  ✅ Login sayfası bulundu: {login_url}")
                         
@@ -467,7 +598,8 @@ def get_trek_product_info_from_web(sku, username=None, password=None):
                         ]
                         
                         for login_data in login_attempts:
-                            login_response = session.post(login_url, data=login_data, timeout=10)
+                            with host_slot(login_url):
+                                login_response = session.post(login_url, data=login_data, timeout=10)
                             
                             # Başarı kontrol
                             success_indicators = ["dashboard", "welcome", "home", "profile", "b2b"]
@@ -487,6 +619,7 @@ def get_trek_product_info_from_web(sku, username=None, password=None):
                 print("❌ Tüm B2B giriş denemeleri başarısız, public siteden devam ediliyor...")
         except Exception as e:
             print(f"❌ B2B login hatası: {e}")
+        session.trek_b2b_logged_in = b2b_logged_in
     
     # SEARCH URL'LERİ - B2B dahil
     search_urls = []
@@ -548,41 +681,40 @@ def get_trek_product_info_from_web(sku, username=None, password=None):
         'DNT': '1'
     }
     
-    # Create session with retry strategy
-    session = requests.Session()
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS"]
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    
+    definitive = 0  # SKU'nun olmadığını kesin gösteren cevap sayısı
+    if outcome is not None:
+        outcome['absent'] = False
     for attempt, url in enumerate(search_urls, 1):
         try:
             print(f"Trek web sitesi aranıyor (Deneme {attempt}/3): {sku}")
             
             # Use session with retry logic (B2B login korunur)
-            response = session.get(url, headers=headers, timeout=5)  # HIZLI: 5 saniye
+            # host_slot: host başına eşzamanlılık ve istekler arası aralık sınırı
+            with host_slot(url):
+                response = session.get(url, headers=headers, timeout=5)  # HIZLI: 5 saniye
             
             if response.status_code == 429:
-                print(f"Rate limited, waiting 2 seconds...")
-                time.sleep(2)  # HIZLI: 2 saniye bekle
+                print(f"Rate limited, host 2 saniye erteleniyor...")
+                penalize(url, 2)  # Tüm thread'ler için bu host'a istekler 2 saniye bekler
                 continue
             elif response.status_code >= 500:
                 print(f"Server error {response.status_code}, trying next URL...")
                 continue
             elif response.status_code != 200:
                 print(f"HTTP {response.status_code} - trying next URL...")
+                if response.status_code == 404:
+                    definitive += 1
                 continue
                 
             soup = BeautifulSoup(response.content, 'html.parser')
             
             # Sayfanın tamamını kontrol et - SKU herhangi bir yerde olabilir
             page_text = soup.get_text().lower()
-            if sku.lower() in page_text:
+            if sku.lower() not in page_text:
+                # Sadece arama sayfası sonuç olmadığını söylüyorsa kesin (bot engeli sayfası değil)
+                if any(marker in page_text for marker in NO_RESULTS_MARKERS):
+                    definitive += 1
+            else:
                 
                 # SKU bulunan bölümü daha detaylı ara
                 all_elements = soup.find_all(text=re.compile(re.escape(sku), re.I))
@@ -629,16 +761,12 @@ def get_trek_product_info_from_web(sku, username=None, password=None):
                     print(f"Trek web sitesinde SKU pattern'i ile bulundu: {sku}")
                     return category_info
             
-            # Exponential backoff between requests
-            if attempt < len(search_urls):
-                time.sleep(0.5)  # HIZLI: 0.5 saniye bekle
-            
         except requests.exceptions.Timeout:
             print(f"Timeout on URL {url}, trying next...")
             continue
         except requests.exceptions.ConnectionError:
             print(f"Connection error on URL {url}, trying next...")
-            time.sleep(0.5)  # HIZLI: 0.5 saniye bekle
+            penalize(url, 0.5)
             continue
         except requests.exceptions.RequestException as e:
             print(f"Request exception for URL {url}: {e}")
@@ -648,8 +776,11 @@ def get_trek_product_info_from_web(sku, username=None, password=None):
             continue
     
     # Clean up session
-    session.close()
+    if owns_session:
+        session.close()
     
+    if outcome is not None:
+        outcome['absent'] = definitive == len(search_urls)
     print(f"Trek web sitesinde {sku} bulunamadı")
     return None
 
@@ -1062,6 +1193,202 @@ def get_trek_product_info_cached(sku: str, product_name: str = None) -> Optional
     """Cached version of product info lookup"""
     return _get_trek_product_info_internal(sku, product_name)
 
+# İki seviyeli cache anahtarları:
+#   sku_<kanonik SKU>            - SKU düzeyindeki sonuç (web, pattern, fallback ve ilk OpenAI cevabı)
+#   sku_<kanonik SKU>|<isim>     - fatura ismine özel OpenAI iyileştirmesi (normalize isim)
+# Aynı SKU farklı faturada beden/renk eki veya boşluk farkıyla yazılsa da aynı anahtara düşer.
+# Kanonik SKU sadece anahtardır: veritabanına, OpenAI'ye ve trekbikes.com'a faturadaki SKU gider.
+# Sadece bilinen beden/renk kodları atılır - '5255123-2024' veya '5255123/2' ayrı SKU olabilir.
+_SKU_SUFFIX_TOKENS = (
+    'XXS|XS|S|SM|M|MD|ML|L|LG|XL|XXL|XXXL|'
+    'BLK|BK|WHT|WH|RED|RD|BLU|BL|GRN|GN|GRY|GY|SLV|SL|ORG|OR|YEL|YL|PRP|PNK|NVY|NV|MAT|GLS'
+)
+_SKU_SUFFIX_RE = re.compile(rf'^(W?\d{{5,7}})[-/_ ]+(?:{_SKU_SUFFIX_TOKENS})$')  # W5240891-BLK, 581633 M
+_SKU_DIGITS_RE = re.compile(r'^(W?)(\d+)$')
+_NAME_TOKEN_RE = re.compile(r'\w+(?:[.,x/]\w+)*')
+_NAME_SIZE_TOKENS = {'xxs', 'xs', 's', 'sm', 'm', 'md', 'ml', 'l', 'lg', 'xl', 'xxl', 'xxxl', 'size', 'beden'}
+_NAME_COLOUR_TOKENS = {
+    'black', 'white', 'red', 'blue', 'green', 'grey', 'gray', 'silver', 'orange', 'yellow', 'purple',
+    'pink', 'navy', 'matte', 'gloss', 'siyah', 'beyaz', 'kırmızı', 'mavi', 'yeşil', 'gri', 'turuncu',
+    'sarı', 'mor', 'pembe', 'lacivert', 'mat', 'parlak',
+}
+_NAME_MEASURE_RE = re.compile(r'^\d+(?:[.,]\d+)?(?:cm|mm|in)$|^\d+(?:[.,]\d+)?x\d+(?:[.,]\d+)?c?$')
+_KEY_STATS = {'name_hits': 0, 'sku_hits': 0, 'misses': 0, 'stale_hits': 0, 'refreshes': 0, 'absent_skips': 0}
+
+def canonical_sku(sku: str) -> str:
+    """Kanonik SKU: boşluksuz, büyük harf, beden/renk eki ve fazladan baştaki sıfırlar atılmış
+
+    'w 5240891', 'W5240891-BLK' ve 'W5240891' aynı SKU'dur; '0581633' -> '581633'
+    (5 haneden kısa kalacaksa sıfırlar korunur). Sadece cache ve single-flight anahtarı
+    içindir, aramalarda kullanılmaz.
+    """
+    sku = ' '.join(str(sku).split()).upper()
+    sku = re.sub(r'^W\s+(?=\d)', 'W', sku)
+    match = _SKU_SUFFIX_RE.match(sku)
+    if match:
+        sku = match.group(1)
+    sku = sku.replace(' ', '')
+    match = _SKU_DIGITS_RE.match(sku)
+    if match:
+        prefix, digits = match.groups()
+        zeros = len(digits) - len(digits.lstrip('0'))
+        sku = prefix + digits[min(zeros, max(len(digits) - 5, 0)):]
+    return sku
+
+def normalize_invoice_name(product_name: str = None) -> Optional[str]:
+    """Fatura isminin cache anahtarı: küçük harf, noktalama/beden/renk/ölçü kelimeleri atılmış
+
+    Model numaraları ('9.8', '5') korunur; anlamlı kelime kalmazsa None.
+    """
+    if not product_name:
+        return None
+    tokens = [token for token in _NAME_TOKEN_RE.findall(str(product_name).casefold())
+              if token not in _NAME_SIZE_TOKENS and token not in _NAME_COLOUR_TOKENS
+              and not _NAME_MEASURE_RE.match(token)]
+    return ' '.join(tokens) or None
+
+def sku_cache_key(sku: str) -> str:
+    """SKU düzeyindeki (birinci seviye) cache anahtarı"""
+    return f"sku_{canonical_sku(sku)}"
+
+def _name_cache_key(sku: str, product_name: str = None) -> Optional[str]:
+    """Fatura ismine özel (ikinci seviye) cache anahtarı - isim yoksa None"""
+    name = normalize_invoice_name(product_name)
+    return f"{sku_cache_key(sku)}|{name}" if name else None
+
+def cache_ttl(source: str) -> int:
+    """Sonucu üreten katmana göre tazelik süresi (saniye)"""
+    return SOURCE_TTLS.get(source, CACHE_TTL_POSITIVE)
+
+def _lookup_cached(sku: str, product_name: str = None, current_time: float = None) -> Optional[Tuple[Dict, bool]]:
+    """İki seviyeli cache: önce isme özel kayıt, sonra SKU kaydı - (sonuç, taze mi) veya None
+
+    Tazelik süresi geçmiş ama CACHE_STALE_SECONDS içindeki kayıt hemen döner ve
+    arka planda yenilenir (stale-while-revalidate).
+    """
+    name_key = _name_cache_key(sku, product_name)
+    cached = _web_cache_get(name_key, current_time) if name_key else None
+    if cached is not None:
+        _KEY_STATS['name_hits'] += 1
+    else:
+        cached = _web_cache_get(sku_cache_key(sku), current_time)
+        if cached is None:
+            _KEY_STATS['misses'] += 1
+            return None
+        _KEY_STATS['sku_hits'] += 1
+    if not cached[1]:
+        _KEY_STATS['stale_hits'] += 1
+        _schedule_refresh(sku, product_name)
+    return cached
+
+def _peek_cached(sku: str, product_name: str = None) -> Optional[Dict]:
+    """Taze cache kaydı (isim, sonra SKU) - sayaç ve yenileme tetiklemeden, yoksa None"""
+    name_key = _name_cache_key(sku, product_name)
+    for cache_key in ([name_key] if name_key else []) + [sku_cache_key(sku)]:
+        cached = _web_cache_get(cache_key)
+        if cached is not None and cached[1]:
+            return cached[0]
+    return None
+
+def has_fresh_cache(sku: str, product_name: str = None) -> bool:
+    """SKU için taze cache kaydı var mı (process içi veya kalıcı) - arama yapmaz"""
+    return _peek_cached(sku, product_name) is not None
+
+def _flight_key(sku: str, product_name: str = None) -> str:
+    """Single-flight anahtarı - kanonik SKU ve normalize isim"""
+    return f"{sku_cache_key(sku)}|{normalize_invoice_name(product_name) or ''}"
+
+def _store_cached(sku: str, product_name: str, result: Dict, source: str, current_time: float = None,
+                  refresh: bool = False):
+    """Sonucu iki seviyeli cache'e yaz
+
+    İsme göre üretilen OpenAI cevabı isim kaydına yazılır, taze SKU kaydı yoksa o da
+    doldurulur; web/pattern/fallback sonuçları isimden bağımsızdır, SKU kaydına yazılır.
+    Arka plan yenilemesinde (refresh) bayat isim kaydı da yeni sonuçla değiştirilir.
+    """
+    sku_key = sku_cache_key(sku)
+    name_key = _name_cache_key(sku, product_name) if source == 'openai' or refresh else None
+    if name_key:
+        _web_cache_put(name_key, result, source, current_time)
+        existing = _web_cache_get(sku_key, current_time)
+        if source == 'openai' and existing is not None and existing[1]:
+            return
+    _web_cache_put(sku_key, result, source, current_time)
+
+def _web_cache_get(cache_key: str, current_time: float = None) -> Optional[Tuple[Dict, bool]]:
+    """Web cache kaydı - (sonuç, taze mi) veya None (bayatlık süresi de geçen kayıt silinir)
+
+    Process içi kayıt yoksa veya taze değilse diğer worker'ların da yazdığı kalıcı
+    cache'e bakılır; orada daha yeni kayıt varsa o kullanılır.
+    """
+    current_time = current_time or time.time()
+    entry = memory_cache.get(_WEB_CACHE, cache_key, current_time)
+    if entry is None or current_time - entry[1] >= cache_ttl(entry[2]):
+        persistent = product_cache.get_entry(cache_key)
+        if persistent is not None and (entry is None or persistent['created'] > entry[1]):
+            entry = (persistent['value'], persistent['created'], persistent['source'])
+            _memory_put(cache_key, entry)
+    if entry is None:
+        return None
+    
+    # Bayatlık penceresi de geçen kayıt memory_cache'te zaten düşer (TTL = tazelik + bayatlık)
+    cached_result, created, source = entry
+    age = current_time - created
+    if age < cache_ttl(source):
+        return cached_result, True
+    if age < cache_ttl(source) + CACHE_STALE_SECONDS:
+        return cached_result, False
+    return None
+
+def _memory_put(cache_key: str, entry: Tuple[Dict, float, str]):
+    """(sonuç, oluşturulma zamanı, katman) kaydını bellek cache'ine yaz - bayatlık penceresi sonuna kadar"""
+    result, created, source = entry
+    ttl = cache_ttl(source) + CACHE_STALE_SECONDS - (time.time() - created)
+    memory_cache.put(_WEB_CACHE, cache_key, entry, ttl)
+
+def _web_cache_put(cache_key: str, result: Dict, source: str, current_time: float = None):
+    """Sonucu process içi ve kalıcı cache'e yaz - source: sonucu üreten katman
+
+    Kalıcı kayıt tazelik süresi + bayatlık penceresi kadar tutulur.
+    """
+    _memory_put(cache_key, (result, current_time or time.time(), source))
+    product_cache.put(cache_key, result, source, ttl=cache_ttl(source) + CACHE_STALE_SECONDS)
+
+def _schedule_refresh(sku: str, product_name: str = None):
+    """Bayat kaydı arka planda yenile - aynı anahtar için tek yenileme çalışır"""
+    key = (canonical_sku(sku), normalize_invoice_name(product_name))
+    with _REFRESH_LOCK:
+        if key in _REFRESHING:
+            return
+        _REFRESHING.add(key)
+        if _REFRESH_POOL[0] is None:
+            _REFRESH_POOL[0] = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='sku-refresh')
+        _KEY_STATS['refreshes'] += 1
+    _REFRESH_POOL[0].submit(_refresh_entry, key, sku, product_name)
+
+def _refresh_entry(key, sku: str, product_name: str = None):
+    """Arka plan yenilemesi: yavaş katmanları çalıştır, sonucu cache'e yaz"""
+    try:
+        print(f"🔄 Bayat cache kaydı yenileniyor: {sku}")
+        _resolve_uncached(sku, product_name, time.time(), refresh=True)
+    except Exception as e:
+        print(f"Cache yenileme hatası {sku}: {e}")
+    finally:
+        with _REFRESH_LOCK:
+            _REFRESHING.discard(key)
+
+def _fallback_product_info(sku: str) -> Dict:
+    """Hiçbir katmanda tanımlanamayan SKU için genel ürün bilgisi"""
+    return {
+        "name": f"Trek Ürünü #{sku}",
+        "category": "Trek Ürünü",
+        "product_type": "Trek Ürünü", 
+        "subcategory": "Belirlenmemiş",
+        "turkish": f"Trek bisiklet ürünü (kategori belirlenemedi)",
+        "gtip_description": f"Bisiklet ile ilgili ürün",
+        "series": "Trek"
+    }
+
 def _get_trek_product_info_internal(sku: str, product_name: str = None) -> Optional[Dict]:
     """Internal product info lookup - %90 WEB SCRAPING PRIORITY"""
     sku = str(sku).strip()
@@ -1073,79 +1400,297 @@ def _get_trek_product_info_internal(sku: str, product_name: str = None) -> Optio
     
     # 2. WEB SCRAPING ÖNCE! - %90 öncelik
     print(f"🌐 Trek sitesinden AGGRESSIVE araştırma başlatılıyor: {sku}")
-    cache_key = f"web_{sku}_{product_name}" if product_name else f"web_{sku}"
     current_time = time.time()
     
-    if cache_key in _WEB_CACHE:
-        cached_result, timestamp = _WEB_CACHE[cache_key]
-        if current_time - timestamp < _CACHE_EXPIRY:
-            print(f"Web cache hit: {sku}")
-            return cached_result
-        else:
-            # Remove expired cache entry
-            del _WEB_CACHE[cache_key]
+    cached = _lookup_cached(sku, product_name, current_time)
+    if cached is not None:
+        print(f"Web cache hit: {sku}" + ("" if cached[1] else " (bayat, arka planda yenileniyor)"))
+        return cached[0]
     
+    # Aynı SKU'yu o anda çözen başka thread/worker varsa onun sonucu beklenir
+    return single_flight.do(
+        _flight_key(sku, product_name),
+        lambda: _peek_cached(sku, product_name) or _resolve_uncached(sku, product_name, current_time),
+        check=lambda: _peek_cached(sku, product_name))
+
+def _resolve_uncached(sku: str, product_name: str, current_time: float, refresh: bool = False) -> Dict:
+    """Yavaş katmanlar: OpenAI, web, pattern, genel bilgi - sonuç cache'e yazılır
+
+    trekbikes.com'da olmadığı kanıtlanmış SKU'lar (absent_skus) web aramasına
+    gönderilmez; OpenAI analizi yine yapılır.
+    """
     # 3. Try OPENAI FIRST for intelligent analysis WITH PRODUCT NAME
     print(f"🤖 OpenAI analizi: {sku} {f'(Fatura ismi: {product_name})' if product_name else ''}")
     openai_result = get_product_info_from_openai(sku, product_name)
     
     if openai_result and openai_result.get('name') != f"Trek Ürünü #{sku}":
         # Cache successful result
-        _WEB_CACHE[cache_key] = (openai_result, current_time)
+        _store_cached(sku, product_name, openai_result, 'openai', current_time, refresh)
         return openai_result
     
-    # 4. Try web scraping as backup
-    print(f"Web scraping: {sku}")
-    
-    # B2B credentials için environment variables kontrol et
-    import os
-    trek_username = os.getenv('TREK_B2B_USERNAME')
-    trek_password = os.getenv('TREK_B2B_PASSWORD')
-    
-    web_result = get_trek_product_info_from_web(sku, trek_username, trek_password)
-    
-    if web_result:
-        # Cache successful result
-        _WEB_CACHE[cache_key] = (web_result, current_time)
-        return web_result
+    if absent_skus.might_be_absent(sku):
+        _KEY_STATS['absent_skips'] += 1
+        print(f"Sitede olmadığı bilinen SKU, web araması atlandı: {sku}")
+    else:
+        # 4. Try web scraping as backup
+        print(f"Web scraping: {sku}")
+        
+        # B2B credentials için environment variables kontrol et
+        trek_username = os.getenv('TREK_B2B_USERNAME')
+        trek_password = os.getenv('TREK_B2B_PASSWORD')
+        
+        outcome = {}
+        web_result = get_trek_product_info_from_web(sku, trek_username, trek_password, outcome=outcome)
+        
+        if web_result:
+            # Cache successful result
+            _store_cached(sku, product_name, web_result, 'web', current_time, refresh)
+            return web_result
+        if outcome.get('absent'):
+            absent_skus.mark_absent(sku)
     
     # 4. Pattern-based categorization if web fails
     pattern_result = extract_category_from_sku_pattern(sku, "")
     if pattern_result:
         print(f"Pattern match after web fail: {sku}")
-        _WEB_CACHE[cache_key] = (pattern_result, current_time)
+        _store_cached(sku, product_name, pattern_result, 'pattern', current_time, refresh)
         return pattern_result
     
     # 5. Fallback - generic product info
     print(f"Unidentified SKU: {sku}")
-    fallback_result = {
-        "name": f"Trek Ürünü #{sku}",
-        "category": "Trek Ürünü",
-        "product_type": "Trek Ürünü", 
-        "subcategory": "Belirlenmemiş",
-        "turkish": f"Trek bisiklet ürünü (kategori belirlenemedi)",
-        "gtip_description": f"Bisiklet ile ilgili ürün",
-        "series": "Trek"
-    }
+    fallback_result = _fallback_product_info(sku)
     
-    # Cache the fallback result too
-    _WEB_CACHE[cache_key] = (fallback_result, current_time)
+    # Cache the fallback result too - negatif sonuç, kısa TTL
+    _store_cached(sku, product_name, fallback_result, 'fallback', current_time, refresh)
     return fallback_result
 
 def get_trek_product_info(sku: str, product_name: str = None) -> Optional[Dict]:
-    """Main entry point for Trek product info lookup - Optimized with caching"""
-    return get_trek_product_info_cached(sku, product_name)
+    """Main entry point for Trek product info lookup - Optimized with caching
+
+    lru_cache'li get_trek_product_info_cached kullanılmaz: süresiz tuttuğu sonuçlar
+    TTL ve arka plan yenilemesini atlardı; _WEB_CACHE zaten process içi katmandır.
+    """
+    return _get_trek_product_info_internal(sku, product_name)
+
+def get_trek_product_info_many(items: List[Tuple[str, str]], workers: int = None) -> Dict[Tuple[str, str], Dict]:
+    """Batch lookup for (sku, product_name) pairs - same tiers as get_trek_product_info
+
+    Kanonik SKU ve normalize fatura ismi aynı olan çiftler tek aramaya indirilir (ilk görülen
+    SKU ve isimle aranır). Veritabanı
+    ve web cache kayıtları tek geçişte cevaplanır; sadece kalanlar yavaş katmanlara gider:
+    OpenAI'ye OPENAI_BATCH_SIZE'lık toplu prompt'larla, OpenAI'nin tanımlayamadıkları
+    paylaşılan session'larla paralel web aramasına (WEB_LOOKUP_WORKERS thread).
+    Başka bir thread'in (veya SINGLE_FLIGHT_SHARED ile başka worker'ın) o anda çözdüğü
+    anahtarlar tekrar aranmaz, onun sonucu beklenir (single_flight).
+
+    Dönen sözlük verilen her çift için {'info': dict, 'source': str, 'seconds': float}
+    içerir; source 'database', 'cache', 'stale' (bayat cache, arka planda yenileniyor),
+    'coalesced' (eşzamanlı aramanın sonucu), 'openai', 'web', 'pattern' veya 'fallback',
+    seconds kalemin toplu arama başından çözümlendiği ana kadar geçen süredir.
+    Sitede olmadığı bilinen SKU'lar (absent_skus) web katmanını atlar.
+    """
+    started = time.perf_counter()
+    resolved = {}
+    misses = []
+    pending = set()
+    
+    def _done(key, info, source):
+        resolved[key] = {'info': info, 'source': source, 'seconds': round(time.perf_counter() - started, 3)}
+    
+    # 1. Tek geçiş: tekrarları ayıkla, veritabanı ve cache kayıtlarını cevapla
+    keys = {}
+    skus = {}   # Anahtar -> ilk görülen orijinal SKU (veritabanı, OpenAI ve web'e bu gönderilir)
+    names = {}  # Anahtar -> ilk görülen orijinal fatura ismi (OpenAI'ye bu gönderilir)
+    for sku, product_name in items:
+        key = (canonical_sku(sku), normalize_invoice_name(product_name))
+        keys[(sku, product_name)] = key
+        if key in resolved or key in pending:
+            continue
+        skus[key] = str(sku).strip()
+        names[key] = product_name or None
+        if skus[key] in TREK_SKU_DATABASE:
+            _done(key, TREK_SKU_DATABASE[skus[key]], 'database')
+            continue
+        cached = _lookup_cached(skus[key], product_name)
+        if cached is not None:
+            _done(key, cached[0], 'cache' if cached[1] else 'stale')
+        else:
+            misses.append(key)
+            pending.add(key)
+    
+    if misses:
+        print(f"Toplu arama: {len(keys)} çift, {len(resolved)} veritabanı/cache, {len(misses)} yavaş katmana")
+    
+    def _resolve(keys_to_resolve):
+        _resolve_batch_tiers(keys_to_resolve, skus, names, resolved, _done, workers)
+    
+    # 2. Single-flight: başkasının çözmekte olduğu anahtarlar beklenir, kalanların lideri bu çağrı
+    flights = {}
+    followers = []
+    remote = []
+    leased = []
+    for key in misses:
+        flight_key = _flight_key(skus[key], names[key])
+        flight, leader = single_flight.acquire(flight_key)
+        if not leader:
+            followers.append((key, flight))
+            continue
+        flights[key] = flight
+        if single_flight.acquire_shared(flight_key):
+            leased.append(key)
+        else:
+            remote.append(key)
+    
+    error = None
+    try:
+        _resolve(leased)
+        # Başka worker'ın kilitlediği anahtarlar: sonucu kalıcı cache'ten bekle, gelmezse kendin çöz
+        for key in remote:
+            result = single_flight.wait_shared(_flight_key(skus[key], names[key]),
+                                               lambda key=key: _peek_cached(skus[key], names[key]))
+            if result is not None:
+                _done(key, result, 'coalesced')
+        _resolve([key for key in remote if key not in resolved])
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        for key in leased:
+            single_flight.release_shared(_flight_key(skus[key], names[key]))
+        for key, flight in flights.items():
+            if key in resolved:
+                single_flight.complete(_flight_key(skus[key], names[key]), flight, resolved[key]['info'])
+            else:
+                single_flight.complete(_flight_key(skus[key], names[key]), flight,
+                                       error=error or RuntimeError(f"{skus[key]} çözümlenemedi"))
+    
+    # 3. Bekleyenler: liderin sonucunu al, lider hata aldıysa kendin çöz
+    failed = []
+    for key, flight in followers:
+        try:
+            _done(key, single_flight.wait(flight), 'coalesced')
+        except Exception as e:
+            print(f"Eşzamanlı arama hatası {skus[key]}: {e}")
+            failed.append(key)
+    _resolve(failed)
+    
+    return {pair: resolved[key] for pair, key in keys.items()}
+
+def _resolve_batch_tiers(keys, skus, names, resolved, done, workers=None):
+    """Toplu aramanın yavaş katmanları: OpenAI, web (absent filtresi), pattern, genel bilgi
+
+    Çözülen her anahtar cache'e yazılır ve done(key, info, source) ile bildirilir.
+    """
+    if not keys:
+        return
+    
+    def _store(key, info, source):
+        _store_cached(skus[key], names[key], info, source)
+        done(key, info, source)
+    
+    misses = keys
+    
+    # OpenAI - toplu prompt'lar (host sınırı host_limiter'da)
+    if misses and os.environ.get('OPENAI_API_KEY'):
+        chunks = [misses[i:i + OPENAI_BATCH_SIZE] for i in range(0, len(misses), OPENAI_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=min(len(chunks), workers or WEB_LOOKUP_WORKERS)) as pool:
+            futures = {pool.submit(get_products_info_from_openai, [(skus[key], names[key]) for key in chunk]): chunk
+                       for chunk in chunks}
+            for future in as_completed(futures):
+                for key, answer in zip(futures[future], future.result()):
+                    if answer and answer.get('name') != f"Trek Ürünü #{skus[key]}":
+                        _store(key, answer, 'openai')
+        misses = [key for key in misses if key not in resolved]
+    
+    # Sitede olmadığı kanıtlanmış SKU'lar web araması yapılmadan pattern/genel bilgiye
+    absent = [key for key in misses if absent_skus.might_be_absent(skus[key])]
+    if absent:
+        _KEY_STATS['absent_skips'] += len(absent)
+        print(f"Sitede olmadığı bilinen {len(absent)} SKU, web araması atlandı")
+        absent_keys = set(absent)
+        misses = [key for key in misses if key not in absent_keys]
+    
+    # Web - thread başına bir session, SKU'lar arasında paylaşılır
+    if misses:
+        trek_username = os.getenv('TREK_B2B_USERNAME')
+        trek_password = os.getenv('TREK_B2B_PASSWORD')
+        local = threading.local()
+        sessions = []
+        
+        def _web_lookup(key):
+            if not hasattr(local, 'session'):
+                local.session = new_web_session()
+                sessions.append(local.session)
+            outcome = {}
+            try:
+                web_result = get_trek_product_info_from_web(skus[key], trek_username, trek_password,
+                                                            session=local.session, outcome=outcome)
+            except Exception as e:
+                print(f"Web arama hatası {skus[key]}: {e}")
+                return None
+            if not web_result and outcome.get('absent'):
+                absent_skus.mark_absent(skus[key])
+            return web_result
+        
+        try:
+            with ThreadPoolExecutor(max_workers=min(len(misses), workers or WEB_LOOKUP_WORKERS)) as pool:
+                futures = {pool.submit(_web_lookup, key): key for key in misses}
+                for future in as_completed(futures):
+                    web_result = future.result()
+                    if web_result:
+                        _store(futures[future], web_result, 'web')
+        finally:
+            for session in sessions:
+                session.close()
+    
+    # Pattern ve genel bilgi
+    for key in misses + absent:
+        if key in resolved:
+            continue
+        pattern_result = extract_category_from_sku_pattern(skus[key], "")
+        if pattern_result:
+            _store(key, pattern_result, 'pattern')
+        else:
+            print(f"Unidentified SKU: {skus[key]}")
+            _store(key, _fallback_product_info(skus[key]), 'fallback')
+
+def get_trek_product_info_local(sku: str) -> Optional[Dict]:
+    """Network-free lookup: local database, then SKU pattern - no OpenAI or web requests"""
+    sku = str(sku).strip()
+    if sku in TREK_SKU_DATABASE:
+        return TREK_SKU_DATABASE[sku]
+    return extract_category_from_sku_pattern(sku, "")
+
+def clear_cache(persistent: bool = False, sku: str = None):
+    """Clear all caches - useful for testing or memory management
 
-def clear_cache():
-    """Clear all caches - useful for testing or memory management"""
-    global _WEB_CACHE
-    _WEB_CACHE.clear()
+    persistent=True kalıcı (tüm worker'ların paylaştığı) cache'i de siler.
+    sku verilirse sadece o SKU'nun kayıtları (SKU ve isim seviyesi) silinir.
+    """
+    if sku is not None:
+        sku_key = sku_cache_key(sku)
+        memory_cache.delete(_WEB_CACHE, sku_key)
+        memory_cache.clear(_WEB_CACHE, prefix=sku_key + '|')
+        get_trek_product_info_cached.cache_clear()
+        if persistent:
+            product_cache.delete(sku_key)
+            product_cache.delete_prefix(sku_key + '|')
+        print(f"Cache cleared for {canonical_sku(sku)}")
+        return
+    memory_cache.clear(_WEB_CACHE)
     get_trek_product_info_cached.cache_clear()
+    if persistent:
+        product_cache.clear()
     print("All caches cleared")
 
 def get_cache_stats():
     """Get cache statistics"""
     return {
-        'web_cache_size': len(_WEB_CACHE),
-        'lru_cache_info': get_trek_product_info_cached.cache_info()._asdict()
+        'web_cache_size': memory_cache.get_stats(_WEB_CACHE)['entries'],
+        'web_cache': memory_cache.get_stats(_WEB_CACHE),
+        'lru_cache_info': get_trek_product_info_cached.cache_info()._asdict(),
+        'key_lookups': dict(_KEY_STATS),
+        'persistent': product_cache.get_stats(),
+        'absent_filter': absent_skus.get_stats(),
+        'single_flight': single_flight.get_stats()
     }
\ No newline at end of file
@@ -5,6 +5,9 @@ Fixed Trek SKU Database with improved web scraping
 
 # Import the existing database
 from trek_sku_database import TREK_SKU_DATABASE, extract_category_from_sku_pattern, extract_category_from_text, extract_series_from_name
+from trek_sku_database import cache_ttl, sku_cache_key
+import memory_cache
+import product_cache
 
 import requests
 from bs4 import BeautifulSoup
@@ -15,8 +18,8 @@ from urllib3.util.retry import Retry
 from functools import lru_cache
 from typing import Dict, Optional
 
-# Global cache for web scraping results
-_WEB_CACHE = {}
+# Global cache for web scraping results - kalıcı katman product_cache (trek_sku_database ile ortak)
+_WEB_CACHE = memory_cache.create('trek_sku_database_fixed')
 _CACHE_EXPIRY = 3600  # 1 hour cache
 
 def get_trek_product_info_from_web_fixed(sku):
@@ -284,17 +287,22 @@ def get_trek_product_info_fixed(sku: str) -> Optional[Dict]:
         return TREK_SKU_DATABASE[sku]
     
     # 2. Check web cache before scraping
-    cache_key = f"web_{sku}"
+    cache_key = sku_cache_key(sku)  # trek_sku_database ile aynı SKU düzeyi anahtar
     current_time = time.time()
     
-    if cache_key in _WEB_CACHE:
-        cached_result, timestamp = _WEB_CACHE[cache_key]
-        if current_time - timestamp < _CACHE_EXPIRY:
-            print(f"Web cache hit: {sku}")
-            return cached_result
-        else:
-            # Remove expired cache entry
-            del _WEB_CACHE[cache_key]
+    # Süresi dolan kayıt memory_cache'te düşer (arka planda da temizlenir)
+    cached_result = memory_cache.get(_WEB_CACHE, cache_key, current_time)
+    if cached_result is not None:
+        print(f"Web cache hit: {sku}")
+        return cached_result
+    
+    # Diğer worker'ların veya trek_sku_database'in kalıcı cache'e yazdığı sonuç
+    # Sadece taze kayıt - bayat kayıtları trek_sku_database arka planda yeniler
+    persistent = product_cache.get_entry(cache_key)
+    if persistent is not None and current_time - persistent['created'] < cache_ttl(persistent['source']):
+        print(f"Persistent cache hit: {sku}")
+        memory_cache.put(_WEB_CACHE, cache_key, persistent['value'], _CACHE_EXPIRY, current_time)
+        return persistent['value']
     
     # 3. Try web scraping FIRST for unknown SKUs
     print(f"Web scraping with fixed function: {sku}")
@@ -302,14 +310,16 @@ def get_trek_product_info_fixed(sku: str) -> Optional[Dict]:
     
     if web_result:
         # Cache successful result
-        _WEB_CACHE[cache_key] = (web_result, current_time)
+        memory_cache.put(_WEB_CACHE, cache_key, web_result, _CACHE_EXPIRY, current_time)
+        product_cache.put(cache_key, web_result, 'web', ttl=cache_ttl('web'))
         return web_result
     
     # 4. Pattern-based categorization if web fails
     pattern_result = extract_category_from_sku_pattern(sku, "")
     if pattern_result:
         print(f"Pattern match after web fail: {sku}")
-        _WEB_CACHE[cache_key] = (pattern_result, current_time)
+        memory_cache.put(_WEB_CACHE, cache_key, pattern_result, _CACHE_EXPIRY, current_time)
+        product_cache.put(cache_key, pattern_result, 'pattern', ttl=cache_ttl('pattern'))
         return pattern_result
     
     # 5. Fallback - generic product info
@@ -325,7 +335,8 @@ def get_trek_product_info_fixed(sku: str) -> Optional[Dict]:
     }
     
     # Cache the fallback result too
-    _WEB_CACHE[cache_key] = (fallback_result, current_time)
+    memory_cache.put(_WEB_CACHE, cache_key, fallback_result, _CACHE_EXPIRY, current_time)
+    product_cache.put(cache_key, fallback_result, 'fallback', ttl=cache_ttl('fallback'))
     return fallback_result
 
 